@@ -1,16 +1,292 @@
 """
 AI Tutor Module - Provides intelligent tutoring capabilities using OpenAI's API.
+
+Every generator has an async version (prefixed with "a") built on AsyncOpenAI
+and a synchronous wrapper with the original name. All upstream calls run on one
+background event loop and share a semaphore that bounds concurrency, so many
+generations can be in flight per process without a thread each.
 """
+import asyncio
+import concurrent.futures
+import contextlib
 import os
+import queue
+import random
+import threading
 import openai
 from dotenv import load_dotenv
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+from llm.cache import completion_cache
+from llm.json_stream import JSONItemStream, parse_json, repair_json
+from llm.prompts import render_prompt
+from llm.router import model_router
+from telemetry import bound, record_usage, span
 
 # Load environment variables
 load_dotenv()
 
-# Initialize OpenAI client
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Maximum number of concurrent upstream requests per process
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Retry settings for rate-limited requests
+MAX_RETRIES = 5
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+# Budgets for batched feedback requests
+BATCH_PROMPT_TOKENS = 3000
+BATCH_MAX_ITEMS = 10
+BATCH_TOKENS_PER_ITEM = 250
+# Fields a generated item needs to be usable; items truncated before them are dropped
+QUIZ_QUESTION_KEYS = ("question", "options", "correct_answer")
+PRACTICE_PROBLEM_KEYS = ("problem",)
+LEARNING_MODULE_KEYS = ("title",)
+# Fields a learning-path module gains when it is expanded from the outline
+LEARNING_MODULE_DETAILS = ("key_concepts", "resources", "estimated_time", "prerequisites")
+
+# Initialize OpenAI client; retries are handled here so they respect the semaphore
+async_client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Background event loop that owns the client's connection pool and the semaphore
+_loop = asyncio.new_event_loop()
+threading.Thread(target=_loop.run_forever, name="ai-tutor-loop", daemon=True).start()
+_semaphore = None
+# Marks the end of a bridged completion stream
+_STREAM_DONE = object()
+
+def _run_sync(coro):
+    """Run a coroutine on the background loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(bound(coro), _loop).result()
+
+def submit(coro) -> concurrent.futures.Future:
+    """
+    Start a coroutine on the background loop without waiting for it.
+
+    Args:
+        coro: The coroutine, e.g. agenerate_explanation(...)
+
+    Returns:
+        concurrent.futures.Future: Resolves to the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(bound(coro), _loop)
+
+def _retry_delay(error: openai.RateLimitError, attempt: int) -> float:
+    retry_after = error.response.headers.get("retry-after") if error.response is not None else None
+    try:
+        return min(float(retry_after), MAX_RETRY_DELAY)
+    except (TypeError, ValueError):
+        delay = min(BASE_RETRY_DELAY * 2 ** attempt, MAX_RETRY_DELAY)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily so that it belongs to the background loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _semaphore
+
+@contextlib.asynccontextmanager
+async def _upstream_call(task: str, tier: str, params: Dict, attempt: int, **attributes):
+    """
+    Hold a concurrency slot and a budget reservation for one upstream request.
+    
+    Yields the parameters to send and a dict in which the caller stores the
+    response's usage, which settles the reservation and is recorded with the
+    request's latency under the task's route, and its finish_reason.
+    """
+    async with _get_semaphore():
+        send, reserved = model_router.reserve(params)
+        call = {"usage": None, "finish_reason": None}
+        try:
+            with span("llm", task, model=params["model"], tier=tier, attempt=attempt, **attributes) as current:
+                yield send, call
+                record_usage(current, params["model"], call["usage"])
+        except openai.RateLimitError:
+            model_router.release(reserved)
+            raise
+        except BaseException:
+            model_router.settle(reserved)
+            raise
+        model_router.settle(reserved, call["usage"])
+
+def _cacheable(params: Dict, send: Dict, call: Dict) -> bool:
+    # A reply whose max_tokens the budget lowered, or that hit max_tokens, is
+    # shorter than the cache key's request promises and must not be shared
+    return send.get("max_tokens") == params.get("max_tokens") and call["finish_reason"] != "length"
+
+async def _create_completion(task: str, tier: str, params: Dict) -> Tuple[str, bool]:
+    # Always runs on the background loop; returns the text and whether it may be cached
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _upstream_call(task, tier, params, attempt) as (send, call):
+                response = await async_client.chat.completions.create(**send)
+                call["usage"] = response.usage
+                call["finish_reason"] = response.choices[0].finish_reason
+            return response.choices[0].message.content, _cacheable(params, send, call)
+        except openai.RateLimitError as e:
+            if attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt))
+
+async def _produce_stream(task: str, tier: str, params: Dict, emit: Callable[[str], None]):
+    # Always runs on the background loop; passes each content delta to emit
+    # and caches the complete text once the stream finishes, unless it was shortened
+    parts = []
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _upstream_call(task, tier, params, attempt, stream=True) as (send, call):
+                stream = await async_client.chat.completions.create(
+                    **send, stream=True, stream_options={"include_usage": True}
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        emit(delta)
+                    if chunk.choices and chunk.choices[0].finish_reason:
+                        call["finish_reason"] = chunk.choices[0].finish_reason
+                    if chunk.usage:
+                        call["usage"] = chunk.usage
+            break
+        except openai.RateLimitError as e:
+            # Only retry if nothing has been delivered yet
+            if parts or attempt == MAX_RETRIES:
+                raise
+            await asyncio.sleep(_retry_delay(e, attempt))
+    if _cacheable(params, send, call):
+        await completion_cache.astore(params, "".join(parts))
+
+def _stream_chat_completion(task: str, **params) -> Iterator[str]:
+    """
+    Stream a chat completion, yielding content chunks as they arrive.
+    
+    A cached completion is yielded in one piece; a streamed completion is
+    stored in the cache once it finishes.
+    
+    Args:
+        task (str): The task type, which selects the model (see llm.router.TASK_ROUTES)
+        **params: Keyword arguments for async_client.chat.completions.create, without model
+        
+    Yields:
+        str: Content chunks of the first completion choice
+    """
+    params, tier = model_router.select(task, params)
+    cached = completion_cache.lookup(params)
+    if cached is not None:
+        yield cached
+        return
+    
+    chunks = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(bound(_produce_stream(task, tier, params, chunks.put)), _loop)
+    future.add_done_callback(lambda _: chunks.put(_STREAM_DONE))
+    while True:
+        chunk = chunks.get()
+        if chunk is _STREAM_DONE:
+            break
+        yield chunk
+    future.result()
+
+async def _astream_chat_completion(task: str, **params) -> AsyncIterator[str]:
+    """Async version of _stream_chat_completion, usable from any event loop."""
+    params, tier = model_router.select(task, params)
+    cached = await completion_cache.alookup(params)
+    if cached is not None:
+        yield cached
+        return
+    
+    loop = asyncio.get_running_loop()
+    chunks = asyncio.Queue()
+    
+    def emit(item):
+        loop.call_soon_threadsafe(chunks.put_nowait, item)
+    
+    future = asyncio.run_coroutine_threadsafe(bound(_produce_stream(task, tier, params, emit)), _loop)
+    future.add_done_callback(lambda _: emit(_STREAM_DONE))
+    while True:
+        chunk = await chunks.get()
+        if chunk is _STREAM_DONE:
+            break
+        yield chunk
+    future.result()
+
+async def _achat_completion(task: str, **params) -> str:
+    """
+    Send a chat completion request through the model router and the shared
+    completion cache.
+    
+    The router picks the model for the task. Identical requests are answered
+    from the cache, and concurrent identical requests share a single upstream
+    call. Replies shortened by the token budget or cut off at max_tokens are
+    not cached. Can be awaited from any event loop.
+    
+    Args:
+        task (str): The task type, which selects the model (see llm.router.TASK_ROUTES)
+        **params: Keyword arguments for async_client.chat.completions.create, without model
+        
+    Returns:
+        str: The content of the first completion choice
+    """
+    params, tier = model_router.select(task, params)
+    
+    cacheable = {"value": True}
+    
+    async def create():
+        future = asyncio.run_coroutine_threadsafe(bound(_create_completion(task, tier, params)), _loop)
+        text, cacheable["value"] = await asyncio.wrap_future(future)
+        return text
+    
+    return await completion_cache.aget_or_create(params, create, should_store=lambda: cacheable["value"])
+
+def _complete_items(items: List, required: Tuple[str, ...]) -> List[Dict]:
+    # Drop items that were cut off before their required fields (e.g. by max_tokens)
+    return [item for item in items if isinstance(item, dict) and all(key in item for key in required)]
+
+def _complete_learning_path(path: Dict) -> Dict:
+    return dict(path, modules=_complete_items(path.get("modules", []), LEARNING_MODULE_KEYS))
+
+def _json_items(chunks: Iterator[str], stream: JSONItemStream, required: Tuple[str, ...]) -> Iterator[Dict]:
+    """
+    Yield the complete items of a streamed JSON array as their objects close.
+
+    Once the chunks run out, items recovered from a truncated tail are yielded too.
+
+    Args:
+        chunks (Iterator[str]): Completion chunks
+        stream (JSONItemStream): Scanner for the array; holds the whole text afterwards
+        required (Tuple[str, ...]): Keys an item needs to be yielded
+
+    Yields:
+        Dict: Complete items, in order
+    """
+    for chunk in chunks:
+        yield from _complete_items(stream.feed(chunk), required)
+    document = stream.close()
+    items = document.get(stream.key, []) if isinstance(document, dict) else document or []
+    yield from _complete_items(items[stream.emitted:], required)
+
+async def _ajson_items(chunks: AsyncIterator[str], stream: JSONItemStream,
+                       required: Tuple[str, ...]) -> AsyncIterator[Dict]:
+    """Async version of _json_items."""
+    async for chunk in chunks:
+        for item in _complete_items(stream.feed(chunk), required):
+            yield item
+    document = stream.close()
+    items = document.get(stream.key, []) if isinstance(document, dict) else document or []
+    for item in _complete_items(items[stream.emitted:], required):
+        yield item
+
+def _explanation_request(topic: str, concept: str, difficulty: str) -> Dict:
+    return dict(
+        messages=render_prompt("explanation", concept=concept, topic=topic, difficulty=difficulty),
+        temperature=0.7,
+        max_tokens=1000
+    )
+
+async def agenerate_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> str:
+    """Async version of generate_explanation."""
+    try:
+        return await _achat_completion("explanation", **_explanation_request(topic, concept, difficulty))
+    except Exception as e:
+        return f"Error generating explanation: {str(e)}"
 
 def generate_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> str:
     """
@@ -24,33 +300,55 @@ def generate_explanation(topic: str, concept: str, difficulty: str = "intermedia
     Returns:
         str: A detailed explanation of the concept
     """
-    prompt = f"""
-    Explain the concept of {concept} within the topic of {topic} at a {difficulty} level.
-    Include:
-    1. A clear definition
-    2. Key components or principles
-    3. Examples or analogies
-    4. Common misconceptions
-    5. How it relates to the broader topic
-    
-    Format the explanation in a clear, structured way that's easy to understand.
+    return _run_sync(agenerate_explanation(topic, concept, difficulty))
+
+async def astream_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> AsyncIterator[str]:
+    """Async version of stream_explanation."""
+    try:
+        async for chunk in _astream_chat_completion("explanation", **_explanation_request(topic, concept, difficulty)):
+            yield chunk
+    except Exception as e:
+        yield f"Error generating explanation: {str(e)}"
+
+def stream_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> Iterator[str]:
     """
+    Stream a detailed explanation of a concept as it is generated.
     
+    Args:
+        topic (str): The main topic
+        concept (str): The specific concept to explain
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        
+    Yields:
+        str: Successive chunks of the explanation
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert tutor with deep knowledge across many subjects."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1000
-        )
-        return response.choices[0].message.content
+        yield from _stream_chat_completion("explanation", **_explanation_request(topic, concept, difficulty))
     except Exception as e:
-        return f"Error generating explanation: {str(e)}"
+        yield f"Error generating explanation: {str(e)}"
+
+def _quiz_request(topic: str, num_questions: int, difficulty: str, exclude: Optional[List[str]] = None) -> Dict:
+    avoid = ""
+    if exclude:
+        avoid = "Write new questions, different from these:\n" + "\n".join(f"- {question}" for question in exclude)
+    return dict(
+        messages=render_prompt("quiz", topic=topic, difficulty=difficulty, num_questions=num_questions, avoid=avoid),
+        temperature=0.7,
+        max_tokens=1500,
+        response_format={"type": "json_object"}
+    )
+
+async def agenerate_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate",
+                                   exclude: Optional[List[str]] = None) -> List[Dict]:
+    """Async version of generate_quiz_questions."""
+    try:
+        content = await _achat_completion("quiz", **_quiz_request(topic, num_questions, difficulty, exclude))
+        return _complete_items(parse_json(content).get("questions", []), QUIZ_QUESTION_KEYS)
+    except Exception as e:
+        return [{"error": f"Error generating quiz questions: {str(e)}"}]
 
-def generate_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate") -> List[Dict]:
+def generate_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate",
+                            exclude: Optional[List[str]] = None) -> List[Dict]:
     """
     Generate quiz questions on a specific topic using OpenAI's API.
     
@@ -58,50 +356,66 @@ def generate_quiz_questions(topic: str, num_questions: int = 5, difficulty: str
         topic (str): The topic to generate questions about
         num_questions (int): Number of questions to generate
         difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Question texts the new questions must differ from
         
     Returns:
         List[Dict]: List of quiz questions with answers and explanations
     """
-    prompt = f"""
-    Generate {num_questions} quiz questions about {topic} at a {difficulty} difficulty level.
-    For each question, provide:
-    1. The question text
-    2. 4 multiple choice options (A, B, C, D)
-    3. The correct answer (A, B, C, or D)
-    4. A brief explanation of why the answer is correct
-    
-    Format the response as a JSON array of objects with the following structure:
-    [
-        {{
-            "question": "Question text",
-            "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correct_answer": "A",
-            "explanation": "Explanation of the correct answer"
-        }},
-        ...
-    ]
+    return _run_sync(agenerate_quiz_questions(topic, num_questions, difficulty, exclude))
+
+async def astream_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate",
+                                 exclude: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+    """Async version of stream_quiz_questions."""
+    try:
+        chunks = _astream_chat_completion("quiz", **_quiz_request(topic, num_questions, difficulty, exclude))
+        async for question in _ajson_items(chunks, JSONItemStream("questions"), QUIZ_QUESTION_KEYS):
+            yield question
+    except Exception as e:
+        yield {"error": f"Error generating quiz questions: {str(e)}"}
+
+def stream_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate",
+                          exclude: Optional[List[str]] = None) -> Iterator[Dict]:
     """
+    Stream quiz questions on a specific topic, yielding each one as soon as it
+    has been generated.
     
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert quiz creator with deep knowledge across many subjects."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500,
-            response_format={"type": "json_object"}
-        )
+    Args:
+        topic (str): The topic to generate questions about
+        num_questions (int): Number of questions to generate
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Question texts the new questions must differ from
         
-        # Parse the JSON response
-        import json
-        result = json.loads(response.choices[0].message.content)
-        return result.get("questions", [])
+    Yields:
+        Dict: Quiz questions with answers and explanations, or a single error item
+    """
+    try:
+        chunks = _stream_chat_completion("quiz", **_quiz_request(topic, num_questions, difficulty, exclude))
+        yield from _json_items(chunks, JSONItemStream("questions"), QUIZ_QUESTION_KEYS)
     except Exception as e:
-        return [{"error": f"Error generating quiz questions: {str(e)}"}]
+        yield {"error": f"Error generating quiz questions: {str(e)}"}
+
+def _practice_request(topic: str, num_problems: int, difficulty: str, exclude: Optional[List[str]] = None) -> Dict:
+    avoid = ""
+    if exclude:
+        avoid = "Write new problems, different from these:\n" + "\n".join(f"- {problem}" for problem in exclude)
+    return dict(
+        messages=render_prompt("practice", topic=topic, difficulty=difficulty, num_problems=num_problems, avoid=avoid),
+        temperature=0.7,
+        max_tokens=1500,
+        response_format={"type": "json_object"}
+    )
 
-def generate_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate") -> List[Dict]:
+async def agenerate_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate",
+                                      exclude: Optional[List[str]] = None) -> List[Dict]:
+    """Async version of generate_practice_problems."""
+    try:
+        content = await _achat_completion("practice", **_practice_request(topic, num_problems, difficulty, exclude))
+        return _complete_items(parse_json(content).get("problems", []), PRACTICE_PROBLEM_KEYS)
+    except Exception as e:
+        return [{"error": f"Error generating practice problems: {str(e)}"}]
+
+def generate_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate",
+                               exclude: Optional[List[str]] = None) -> List[Dict]:
     """
     Generate practice problems on a specific topic using OpenAI's API.
     
@@ -109,48 +423,60 @@ def generate_practice_problems(topic: str, num_problems: int = 3, difficulty: st
         topic (str): The topic to generate problems about
         num_problems (int): Number of problems to generate
         difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Problem statements the new problems must differ from
         
     Returns:
         List[Dict]: List of practice problems with solutions and explanations
     """
-    prompt = f"""
-    Generate {num_problems} practice problems about {topic} at a {difficulty} difficulty level.
-    For each problem, provide:
-    1. The problem statement
-    2. A step-by-step solution
-    3. The final answer
-    4. Key concepts tested by this problem
-    
-    Format the response as a JSON array of objects with the following structure:
-    [
-        {{
-            "problem": "Problem statement",
-            "solution_steps": ["Step 1", "Step 2", ...],
-            "answer": "Final answer",
-            "key_concepts": ["Concept 1", "Concept 2", ...]
-        }},
-        ...
-    ]
+    return _run_sync(agenerate_practice_problems(topic, num_problems, difficulty, exclude))
+
+async def astream_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate",
+                                   exclude: Optional[List[str]] = None) -> AsyncIterator[Dict]:
+    """Async version of stream_practice_problems."""
+    try:
+        chunks = _astream_chat_completion("practice", **_practice_request(topic, num_problems, difficulty, exclude))
+        async for problem in _ajson_items(chunks, JSONItemStream("problems"), PRACTICE_PROBLEM_KEYS):
+            yield problem
+    except Exception as e:
+        yield {"error": f"Error generating practice problems: {str(e)}"}
+
+def stream_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate",
+                             exclude: Optional[List[str]] = None) -> Iterator[Dict]:
     """
+    Stream practice problems on a specific topic, yielding each one as soon as
+    it has been generated.
     
+    Args:
+        topic (str): The topic to generate problems about
+        num_problems (int): Number of problems to generate
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Problem statements the new problems must differ from
+        
+    Yields:
+        Dict: Practice problems with solutions, or a single error item
+    """
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert problem creator with deep knowledge across many subjects."},
-                {"role": "user", "content": prompt}
-            ],
+        chunks = _stream_chat_completion("practice", **_practice_request(topic, num_problems, difficulty, exclude))
+        yield from _json_items(chunks, JSONItemStream("problems"), PRACTICE_PROBLEM_KEYS)
+    except Exception as e:
+        yield {"error": f"Error generating practice problems: {str(e)}"}
+
+async def aprovide_feedback(user_answer: str, correct_answer: str, question: str) -> Dict:
+    """Async version of provide_feedback."""
+    messages = render_prompt("feedback", question=question, correct_answer=correct_answer, user_answer=user_answer)
+    
+    try:
+        content = await _achat_completion(
+            "feedback",
+            messages=messages,
             temperature=0.7,
-            max_tokens=1500,
+            max_tokens=1000,
             response_format={"type": "json_object"}
         )
         
-        # Parse the JSON response
-        import json
-        result = json.loads(response.choices[0].message.content)
-        return result.get("problems", [])
+        return parse_json(content)
     except Exception as e:
-        return [{"error": f"Error generating practice problems: {str(e)}"}]
+        return {"error": f"Error providing feedback: {str(e)}"}
 
 def provide_feedback(user_answer: str, correct_answer: str, question: str) -> Dict:
     """
@@ -164,49 +490,174 @@ def provide_feedback(user_answer: str, correct_answer: str, question: str) -> Di
     Returns:
         Dict: Feedback on the user's answer
     """
-    prompt = f"""
-    Question: {question}
-    Correct Answer: {correct_answer}
-    User's Answer: {user_answer}
+    return _run_sync(aprovide_feedback(user_answer, correct_answer, question))
+
+async def aexplain_answers(items: List[Dict]) -> List[str]:
+    """Async version of explain_answers."""
+    if not items:
+        return []
     
-    Provide detailed feedback on the user's answer. Include:
-    1. Whether the answer is correct, partially correct, or incorrect
-    2. Specific feedback on what was good about their answer
-    3. Specific feedback on what could be improved
-    4. A brief explanation of the correct answer
-    5. Suggestions for further study
+    numbered = "\n".join(_format_feedback_item(i + 1, item) for i, item in enumerate(items))
+    messages = render_prompt("explain_answers", numbered=numbered)
     
-    Format the response as a JSON object with the following structure:
-    {{
-        "is_correct": true/false,
-        "feedback": "Detailed feedback text",
-        "improvement_suggestions": "Suggestions for improvement",
-        "correct_answer_explanation": "Explanation of the correct answer",
-        "further_study": "Suggestions for further study"
-    }}
+    try:
+        content = await _achat_completion(
+            "explain_answers",
+            messages=messages,
+            temperature=0.7,
+            max_tokens=300 * len(items),
+            response_format={"type": "json_object"}
+        )
+        
+        explanations = parse_json(content).get("explanations", [])
+        return [str(e) for e in explanations[:len(items)]] + [""] * (len(items) - len(explanations))
+    except Exception as e:
+        return [f"Error explaining answer: {str(e)}"] * len(items)
+
+def explain_answers(items: List[Dict]) -> List[str]:
     """
+    Explain several graded answers with a single OpenAI API call.
+    
+    Args:
+        items (List[Dict]): Dictionaries with question, correct_answer and user_answer
+        
+    Returns:
+        List[str]: One explanation per item, in the same order
+    """
+    return _run_sync(aexplain_answers(items))
+
+def _estimate_tokens(text: str) -> int:
+    # Rough token estimate (about four characters per token for English text)
+    return len(text) // 4 + 1
+
+def _format_feedback_item(number: int, item: Dict) -> str:
+    return (f"{number}. Question: {item['question']}\n"
+            f"Correct Answer: {item['correct_answer']}\n"
+            f"User's Answer: {item['user_answer']}")
+
+def chunk_feedback_items(items: List[Dict], max_prompt_tokens: int = BATCH_PROMPT_TOKENS,
+                         max_items: int = BATCH_MAX_ITEMS) -> List[List[Dict]]:
+    """
+    Split feedback items into batches that fit the prompt and completion budgets.
+    
+    Args:
+        items (List[Dict]): Dictionaries with question, correct_answer and user_answer
+        max_prompt_tokens (int): Estimated prompt tokens allowed per batch
+        max_items (int): Maximum items per batch, bounding the completion size
+        
+    Returns:
+        List[List[Dict]]: Batches of items, in their original order
+    """
+    chunks, current, current_tokens = [], [], 0
+    for item in items:
+        tokens = _estimate_tokens(_format_feedback_item(len(current) + 1, item))
+        if current and (current_tokens + tokens > max_prompt_tokens or len(current) >= max_items):
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def _afeedback_batch(items: List[Dict]) -> List[Dict]:
+    numbered = "\n".join(_format_feedback_item(i + 1, item) for i, item in enumerate(items))
+    messages = render_prompt("batch_feedback", numbered=numbered)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert tutor providing constructive feedback."},
-                {"role": "user", "content": prompt}
-            ],
+        content = await _achat_completion(
+            "batch_feedback",
+            messages=messages,
             temperature=0.7,
-            max_tokens=1000,
+            max_tokens=BATCH_TOKENS_PER_ITEM * len(items),
             response_format={"type": "json_object"}
         )
         
-        # Parse the JSON response
-        import json
-        return json.loads(response.choices[0].message.content)
+        # Line the entries up with the items
+        entries = parse_json(content).get("feedback", [])
+        by_number = {entry.get("number"): entry for entry in entries if isinstance(entry, dict)}
+        results = []
+        for i in range(len(items)):
+            entry = by_number.get(i + 1) or (entries[i] if i < len(entries) and isinstance(entries[i], dict) else None)
+            results.append(entry or {"error": "No feedback returned for this question"})
+        return results
     except Exception as e:
-        return {"error": f"Error providing feedback: {str(e)}"}
+        return [{"error": f"Error providing feedback: {str(e)}"} for _ in items]
 
-def generate_learning_path(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+async def aprovide_batch_feedback(items: List[Dict], max_prompt_tokens: int = BATCH_PROMPT_TOKENS) -> List[Dict]:
+    """Async version of provide_batch_feedback."""
+    chunks = chunk_feedback_items(items, max_prompt_tokens)
+    results = await asyncio.gather(*(_afeedback_batch(chunk) for chunk in chunks))
+    return [feedback for chunk_results in results for feedback in chunk_results]
+
+def provide_batch_feedback(items: List[Dict], max_prompt_tokens: int = BATCH_PROMPT_TOKENS) -> List[Dict]:
     """
-    Generate a personalized learning path using OpenAI's API.
+    Provide feedback on a whole set of answers in as few OpenAI API calls as possible.
+    
+    Large sets are split into batches that fit the token budget, and the
+    batches are requested concurrently.
+    
+    Args:
+        items (List[Dict]): Dictionaries with question, correct_answer and user_answer
+        max_prompt_tokens (int): Estimated prompt tokens allowed per request
+        
+    Returns:
+        List[Dict]: Feedback for each item, in the same order, shaped like provide_feedback
+    """
+    return _run_sync(aprovide_batch_feedback(items, max_prompt_tokens))
+
+def _learning_path_inputs(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    # Normalized so that every spelling of the same request shares cached completions
+    return {"topic": " ".join(topic.split()), "user_knowledge": " ".join(user_knowledge.split()),
+            "learning_goals": " ".join(learning_goals.split())}
+
+def _outline_request(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    return dict(
+        messages=render_prompt("learning_path_outline", **_learning_path_inputs(topic, user_knowledge, learning_goals)),
+        temperature=0.7,
+        max_tokens=600,
+        response_format={"type": "json_object"}
+    )
+
+def _module_request(topic: str, user_knowledge: str, learning_goals: str, outline: Dict, index: int) -> Dict:
+    modules = outline.get("modules", [])
+    listing = "\n".join(f"{i + 1}. {m.get('title', '')}: {m.get('summary', '')}" for i, m in enumerate(modules))
+    return dict(
+        messages=render_prompt("learning_module", **_learning_path_inputs(topic, user_knowledge, learning_goals),
+                               outline=listing, number=index + 1, title=modules[index].get("title", "")),
+        temperature=0.7,
+        max_tokens=600,
+        response_format={"type": "json_object"}
+    )
+
+def _learning_path_snapshot(stream: JSONItemStream) -> Dict:
+    # The path so far, with only the modules whose objects have closed
+    path = repair_json(stream.text)
+    path = path if isinstance(path, dict) else {}
+    return _complete_learning_path(dict(path, modules=path.get("modules", [])[:stream.emitted]))
+
+def _final_learning_path(stream: JSONItemStream) -> Dict:
+    path = stream.close()
+    if not isinstance(path, dict):
+        raise ValueError("The learning path could not be parsed")
+    return _complete_learning_path(path)
+
+async def agenerate_learning_path_outline(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    """Async version of generate_learning_path_outline."""
+    try:
+        content = await _achat_completion(
+            "learning_path_outline", **_outline_request(topic, user_knowledge, learning_goals)
+        )
+        return _complete_learning_path(parse_json(content))
+    except Exception as e:
+        return {"error": f"Error generating learning path: {str(e)}"}
+
+def generate_learning_path_outline(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    """
+    Generate the outline of a personalized learning path with one small request.
+    
+    Modules only have a title, summary and estimated time; fill them in with
+    expand_learning_module.
     
     Args:
         topic (str): The topic to learn about
@@ -214,59 +665,165 @@ def generate_learning_path(topic: str, user_knowledge: str, learning_goals: str)
         learning_goals (str): The user's learning goals
         
     Returns:
-        Dict: A structured learning path
+        Dict: The outline, with overview, modules, milestones and assessment methods
     """
-    prompt = f"""
-    Topic: {topic}
-    User's Current Knowledge: {user_knowledge}
-    Learning Goals: {learning_goals}
-    
-    Create a personalized learning path that will help the user achieve their learning goals.
-    Include:
-    1. A list of modules or sections to cover
-    2. For each module:
-       - Key concepts to learn
-       - Learning resources (articles, videos, exercises)
-       - Estimated time to complete
-       - Prerequisites (if any)
-    3. Milestones to track progress
-    4. Assessment methods
-    
-    Format the response as a JSON object with the following structure:
-    {{
-        "overview": "Brief overview of the learning path",
-        "modules": [
-            {{
-                "title": "Module title",
-                "key_concepts": ["Concept 1", "Concept 2", ...],
-                "resources": ["Resource 1", "Resource 2", ...],
-                "estimated_time": "Estimated time to complete",
-                "prerequisites": ["Prerequisite 1", "Prerequisite 2", ...]
-            }},
-            ...
-        ],
-        "milestones": ["Milestone 1", "Milestone 2", ...],
-        "assessment_methods": ["Method 1", "Method 2", ...]
-    }}
+    return _run_sync(agenerate_learning_path_outline(topic, user_knowledge, learning_goals))
+
+async def astream_learning_path_outline(topic: str, user_knowledge: str, learning_goals: str) -> AsyncIterator[Dict]:
+    """Async version of stream_learning_path_outline."""
+    stream = JSONItemStream("modules")
+    try:
+        async for chunk in _astream_chat_completion(
+            "learning_path_outline", **_outline_request(topic, user_knowledge, learning_goals)
+        ):
+            if stream.feed(chunk):
+                yield _learning_path_snapshot(stream)
+        yield _final_learning_path(stream)
+    except Exception as e:
+        yield {"error": f"Error generating learning path: {str(e)}"}
+
+def stream_learning_path_outline(topic: str, user_knowledge: str, learning_goals: str) -> Iterator[Dict]:
     """
+    Stream the outline of a personalized learning path, yielding it again each
+    time another module title has been generated.
     
+    Args:
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+        
+    Yields:
+        Dict: The outline so far; the last value is the whole outline (or an error)
+    """
+    stream = JSONItemStream("modules")
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert curriculum designer with deep knowledge across many subjects."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000,
-            response_format={"type": "json_object"}
+        for chunk in _stream_chat_completion(
+            "learning_path_outline", **_outline_request(topic, user_knowledge, learning_goals)
+        ):
+            if stream.feed(chunk):
+                yield _learning_path_snapshot(stream)
+        yield _final_learning_path(stream)
+    except Exception as e:
+        yield {"error": f"Error generating learning path: {str(e)}"}
+
+async def aexpand_learning_module(topic: str, user_knowledge: str, learning_goals: str,
+                                  outline: Dict, index: int) -> Dict:
+    """Async version of expand_learning_module."""
+    module = outline["modules"][index]
+    try:
+        content = await _achat_completion(
+            "learning_module", **_module_request(topic, user_knowledge, learning_goals, outline, index)
         )
+        details = parse_json(content)
+        return dict(module, **{key: details[key] for key in LEARNING_MODULE_DETAILS if key in details})
+    except Exception as e:
+        return dict(module, error=f"Error generating module details: {str(e)}")
+
+def expand_learning_module(topic: str, user_knowledge: str, learning_goals: str, outline: Dict, index: int) -> Dict:
+    """
+    Generate the details of one module of a learning path outline.
+    
+    Args:
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+        outline (Dict): The outline from generate_learning_path_outline
+        index (int): Index of the module in the outline
         
-        # Parse the JSON response
-        import json
-        return json.loads(response.choices[0].message.content)
+    Returns:
+        Dict: The module with key concepts, resources, estimated time and
+        prerequisites added, or with an error
+    """
+    return _run_sync(aexpand_learning_module(topic, user_knowledge, learning_goals, outline, index))
+
+async def agenerate_learning_path(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    """Async version of generate_learning_path."""
+    outline = await agenerate_learning_path_outline(topic, user_knowledge, learning_goals)
+    if "error" in outline:
+        return outline
+    modules = await asyncio.gather(*(
+        aexpand_learning_module(topic, user_knowledge, learning_goals, outline, i)
+        for i in range(len(outline["modules"]))
+    ))
+    return dict(outline, modules=list(modules))
+
+def generate_learning_path(topic: str, user_knowledge: str, learning_goals: str) -> Dict:
+    """
+    Generate a complete personalized learning path using OpenAI's API.
+    
+    The outline is generated first and all of its modules are then detailed
+    concurrently.
+    
+    Args:
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+        
+    Returns:
+        Dict: A structured learning path
+    """
+    return _run_sync(agenerate_learning_path(topic, user_knowledge, learning_goals))
+
+async def astream_learning_path(topic: str, user_knowledge: str, learning_goals: str) -> AsyncIterator[Dict]:
+    """Async version of stream_learning_path."""
+    outline = {}
+    async for outline in astream_learning_path_outline(topic, user_knowledge, learning_goals):
+        yield outline
+    if "error" in outline:
+        return
+    
+    async def expand(index: int) -> Tuple[int, Dict]:
+        return index, await aexpand_learning_module(topic, user_knowledge, learning_goals, outline, index)
+    
+    modules = list(outline["modules"])
+    for next_done in asyncio.as_completed([expand(i) for i in range(len(modules))]):
+        index, module = await next_done
+        modules[index] = module
+        yield dict(outline, modules=list(modules))
+
+def stream_learning_path(topic: str, user_knowledge: str, learning_goals: str) -> Iterator[Dict]:
+    """
+    Stream a personalized learning path: the outline as it is generated, then
+    the path again each time another module has been detailed. Modules are
+    detailed concurrently.
+    
+    Args:
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+        
+    Yields:
+        Dict: The learning path so far; the last value is the whole path (or an error)
+    """
+    outline = {}
+    for outline in stream_learning_path_outline(topic, user_knowledge, learning_goals):
+        yield outline
+    if "error" in outline:
+        return
+    
+    modules = list(outline["modules"])
+    futures = {
+        submit(aexpand_learning_module(topic, user_knowledge, learning_goals, outline, i)): i
+        for i in range(len(modules))
+    }
+    for future in concurrent.futures.as_completed(futures):
+        modules[futures[future]] = future.result()
+        yield dict(outline, modules=list(modules))
+
+def _answer_request(question: str, context: Optional[str]) -> Dict:
+    return dict(
+        messages=render_prompt("answer", question=question,
+                               context=f"Additional Context: {context}" if context else ""),
+        temperature=0.7,
+        max_tokens=1000
+    )
+
+async def aanswer_user_question(question: str, context: Optional[str] = None) -> str:
+    """Async version of answer_user_question."""
+    try:
+        return await _achat_completion("answer", **_answer_request(question, context))
     except Exception as e:
-        return {"error": f"Error generating learning path: {str(e)}"}
+        return f"Error answering question: {str(e)}"
 
 def answer_user_question(question: str, context: Optional[str] = None) -> str:
     """
@@ -279,26 +836,91 @@ def answer_user_question(question: str, context: Optional[str] = None) -> str:
     Returns:
         str: Answer to the user's question
     """
-    prompt = f"""
-    User Question: {question}
+    return _run_sync(aanswer_user_question(question, context))
+
+async def astream_answer(question: str, context: Optional[str] = None) -> AsyncIterator[str]:
+    """Async version of stream_answer."""
+    try:
+        async for chunk in _astream_chat_completion("answer", **_answer_request(question, context)):
+            yield chunk
+    except Exception as e:
+        yield f"Error answering question: {str(e)}"
+
+def stream_answer(question: str, context: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream the answer to a user's question as it is generated.
     
-    {f"Additional Context: {context}" if context else ""}
+    Args:
+        question (str): The user's question
+        context (str, optional): Additional context to help answer the question
+        
+    Yields:
+        str: Successive chunks of the answer
+    """
+    try:
+        yield from _stream_chat_completion("answer", **_answer_request(question, context))
+    except Exception as e:
+        yield f"Error answering question: {str(e)}"
+
+async def aclassify_report_feedback(feedback: str, section_names: List[str]) -> List[str]:
+    """Async version of classify_report_feedback."""
+    messages = render_prompt("classify_feedback", section_names=", ".join(section_names), feedback=feedback)
     
-    Provide a clear, accurate, and helpful answer to the user's question.
-    If the question is unclear, ask for clarification.
-    If you don't know the answer, be honest about it.
+    try:
+        content = await _achat_completion(
+            "classify_feedback",
+            messages=messages,
+            temperature=0,
+            max_tokens=100,
+            response_format={"type": "json_object"}
+        )
+        
+        # Keep only known sections
+        sections = parse_json(content).get("sections", [])
+        return [name for name in section_names if name in sections]
+    except Exception as e:
+        print(f"Error classifying report feedback: {e}")
+        return []
+
+def classify_report_feedback(feedback: str, section_names: List[str]) -> List[str]:
+    """
+    Decide which report sections a piece of feedback refers to using OpenAI's API.
+    
+    Args:
+        feedback (str): The learner's feedback on the report
+        section_names (List[str]): Names of the report sections
+        
+    Returns:
+        List[str]: The affected section names, or an empty list on error
     """
+    return _run_sync(aclassify_report_feedback(feedback, section_names))
+
+async def arewrite_report_section(topic: str, section_markdown: str, feedback: str) -> Optional[str]:
+    """Async version of rewrite_report_section."""
+    messages = render_prompt("rewrite_section", topic=topic, feedback=feedback, section_markdown=section_markdown)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful and knowledgeable tutor."},
-                {"role": "user", "content": prompt}
-            ],
+        content = await _achat_completion(
+            "rewrite_section",
+            messages=messages,
             temperature=0.7,
-            max_tokens=1000
+            max_tokens=1500
         )
-        return response.choices[0].message.content
+        return "\n" + content.strip() + "\n\n"
     except Exception as e:
-        return f"Error answering question: {str(e)}" 
\ No newline at end of file
+        print(f"Error rewriting report section: {e}")
+        return None
+
+def rewrite_report_section(topic: str, section_markdown: str, feedback: str) -> Optional[str]:
+    """
+    Rewrite a single report section to address feedback using OpenAI's API.
+    
+    Args:
+        topic (str): The learning topic
+        section_markdown (str): The section's current Markdown
+        feedback (str): The learner's feedback
+        
+    Returns:
+        Optional[str]: The rewritten section, or None on error
+    """
+    return _run_sync(arewrite_report_section(topic, section_markdown, feedback))
@@ -0,0 +1,235 @@
+"""
+Headless HTTP/JSON API for Enhanced Learning Assistant.
+
+Exposes research, personalization questions, report generation and the AI
+tutor functions as JSON endpoints, sharing the same caches and connection
+pools as the Streamlit app. Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+
+from ai_tutor import (aanswer_user_question, agenerate_learning_path, aprovide_batch_feedback, aprovide_feedback,
+                      astream_answer, astream_explanation, astream_learning_path)
+from content_bank import aget_explanation, aget_practice_problems, aget_quiz_questions, aiter_quiz_questions
+from jobs import JOB_HANDLERS, job_queue, start_workers
+from llm.cache import completion_cache
+from llm.prompts import prompt_stats
+from llm.router import model_router, set_user
+from personalize.interactive_questions import ask_questions
+from research.cache import research_cache
+from research.orchestrator import RESEARCH_SOURCES, run_research
+from research.report import generate_report
+from telemetry import metrics
+
+# In-process job workers; set JOB_WORKERS=0 when running `python -m jobs worker` separately
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_workers(JOB_WORKERS)
+    yield
+
+app = FastAPI(title="Enhanced AI Tutor API", version="1.0", lifespan=lifespan)
+
+@app.middleware("http")
+async def attribute_user(request: Request, call_next):
+    # LLM usage is charged to the X-User-Id header's token budget
+    set_user(request.headers.get("x-user-id"))
+    return await call_next(request)
+
+class JobRequest(BaseModel):
+    kind: str
+    payload: Dict = Field(default_factory=dict)
+
+class ResearchRequest(BaseModel):
+    topic: str
+    sources: Optional[List[str]] = None
+
+class ReportRequest(BaseModel):
+    topic: str
+    objective: str
+    preferences: Dict = Field(default_factory=dict)
+    web_results: Optional[List[Dict]] = None
+    academic_results: Optional[List[Dict]] = None
+    video_results: Optional[List[Dict]] = None
+
+class ReportJobPayload(ReportRequest):
+    objective: str = ""
+
+# Payload schema of each job kind, checked before the job is queued
+JOB_PAYLOADS = {
+    "research": ResearchRequest,
+    "report": ReportJobPayload,
+}
+
+class ExplanationRequest(BaseModel):
+    topic: str
+    concept: str
+    difficulty: str = "intermediate"
+
+class QuizRequest(BaseModel):
+    topic: str
+    num_questions: int = Field(5, ge=1, le=20)
+    difficulty: str = "intermediate"
+
+class PracticeRequest(BaseModel):
+    topic: str
+    num_problems: int = Field(3, ge=1, le=10)
+    difficulty: str = "intermediate"
+
+class FeedbackRequest(BaseModel):
+    user_answer: str
+    correct_answer: str
+    question: str
+
+class BatchFeedbackRequest(BaseModel):
+    items: List[FeedbackRequest]
+
+class LearningPathRequest(BaseModel):
+    topic: str
+    user_knowledge: str
+    learning_goals: str
+
+class QuestionRequest(BaseModel):
+    question: str
+    context: Optional[str] = None
+
+def _check_sources(sources: Optional[List[str]]):
+    unknown = [name for name in sources or [] if name not in RESEARCH_SOURCES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown research sources: {', '.join(unknown)}")
+
+async def _ndjson(items: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for item in items:
+        yield json.dumps(item) + "\n"
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/stats")
+async def stats():
+    return {
+        "research_cache": await asyncio.to_thread(research_cache.stats),
+        "completion_cache": completion_cache.stats(),
+        "model_router": model_router.stats(),
+        "prompts": prompt_stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/research")
+async def research(request: ResearchRequest):
+    _check_sources(request.sources)
+    # The research fetchers are blocking; run_research fans them out on its own pool
+    return await asyncio.to_thread(run_research, request.topic, request.sources)
+
+@app.get("/personalization/questions")
+async def personalization_questions(topic: Optional[str] = None):
+    return ask_questions(topic)
+
+@app.post("/report")
+async def report(request: ReportRequest):
+    results = {
+        "web_results": request.web_results,
+        "academic_results": request.academic_results,
+        "video_results": request.video_results,
+    }
+    missing = [name for name, value in results.items() if value is None]
+    if missing:
+        results.update(await asyncio.to_thread(run_research, request.topic, missing))
+
+    markdown = await asyncio.to_thread(
+        generate_report, request.topic, request.objective, request.preferences,
+        results["web_results"], results["academic_results"], results["video_results"]
+    )
+    return {"report": markdown, **results}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    if request.kind not in JOB_HANDLERS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind: {request.kind}")
+    try:
+        payload = JOB_PAYLOADS[request.kind].model_validate(request.payload)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=e.errors(include_url=False))
+    if isinstance(payload, ResearchRequest):
+        _check_sources(payload.sources)
+    job_id = await asyncio.to_thread(job_queue.submit, request.kind, payload.model_dump(exclude_none=True))
+    return {"id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/tutor/explanation")
+async def explanation(request: ExplanationRequest):
+    return {"explanation": await aget_explanation(request.topic, request.concept, request.difficulty)}
+
+@app.post("/tutor/explanation/stream")
+async def explanation_stream(request: ExplanationRequest):
+    return StreamingResponse(
+        astream_explanation(request.topic, request.concept, request.difficulty),
+        media_type="text/plain; charset=utf-8"
+    )
+
+@app.post("/tutor/quiz")
+async def quiz(request: QuizRequest):
+    return {"questions": await aget_quiz_questions(request.topic, request.num_questions, request.difficulty)}
+
+@app.post("/tutor/quiz/stream")
+async def quiz_stream(request: QuizRequest):
+    # One JSON question per line, sent as soon as each has been generated
+    return StreamingResponse(
+        _ndjson(aiter_quiz_questions(request.topic, request.num_questions, request.difficulty)),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/tutor/practice")
+async def practice(request: PracticeRequest):
+    return {"problems": await aget_practice_problems(request.topic, request.num_problems, request.difficulty)}
+
+@app.post("/tutor/feedback")
+async def feedback(request: FeedbackRequest):
+    return await aprovide_feedback(request.user_answer, request.correct_answer, request.question)
+
+@app.post("/tutor/feedback/batch")
+async def batch_feedback(request: BatchFeedbackRequest):
+    items = [item.model_dump() for item in request.items]
+    return {"feedback": await aprovide_batch_feedback(items)}
+
+@app.post("/tutor/learning-path")
+async def learning_path(request: LearningPathRequest):
+    return await agenerate_learning_path(request.topic, request.user_knowledge, request.learning_goals)
+
+@app.post("/tutor/learning-path/stream")
+async def learning_path_stream(request: LearningPathRequest):
+    # The learning path so far, one JSON line per newly generated module; the last line is the whole path
+    return StreamingResponse(
+        _ndjson(astream_learning_path(request.topic, request.user_knowledge, request.learning_goals)),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/tutor/answer")
+async def answer(request: QuestionRequest):
+    return {"answer": await aanswer_user_question(request.question, request.context)}
+
+@app.post("/tutor/answer/stream")
+async def answer_stream(request: QuestionRequest):
+    return StreamingResponse(
+        astream_answer(request.question, request.context),
+        media_type="text/plain; charset=utf-8"
+    )
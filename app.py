@@ -2,15 +2,26 @@
 Main Streamlit app for Enhanced Learning Assistant.
 Handles all stages from topic input to report generation.
 """
+import os
+import uuid
 import streamlit as st
-from research.web import fetch_web_content
-from research.academic import fetch_academic_papers
-from research.video import fetch_video_transcripts
+from jobs import job_queue, start_workers, wait_for_job
+from llm.router import set_user
+from research.progress import HEADLESS
 from personalize.interactive_questions import ask_questions
-from research.report import generate_report
-import time
+from research.regenerate import regenerate_report
+from research.report import assemble_report
+from telemetry import bind_session, new_session_spans, summarize
 import json
 
+# In-process job workers; set JOB_WORKERS=0 when running `python -m jobs worker` separately
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Seconds to wait for a job to finish, and for a worker to pick it up
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "600"))
+JOB_QUEUE_TIMEOUT = float(os.getenv("JOB_QUEUE_TIMEOUT", "30"))
+# Show the timing panel in the sidebar by default
+SHOW_TIMINGS = os.getenv("TUTOR_TIMING_PANEL", "").lower() in ("1", "true", "yes")
+
 def load_custom_css():
     st.markdown("""
         <style>
@@ -216,27 +227,51 @@ def render_interactive_questions(questions_by_category, topic):
     
     return answers
 
+def run_job(kind, payload):
+    """
+    Submit a background job and poll it, showing its progress, until it finishes.
+
+    Args:
+        kind (str): The job kind
+        payload (dict): The job arguments
+
+    Returns:
+        dict: The job's result, or None if it failed or timed out
+    """
+    start_workers(JOB_WORKERS)
+    job_id = job_queue.submit(kind, payload)
+    progress_bar = st.progress(0)
+    job = wait_for_job(job_id, timeout=JOB_TIMEOUT, queue_timeout=JOB_QUEUE_TIMEOUT,
+                       on_progress=None if HEADLESS else lambda fraction, message: progress_bar.progress(fraction))
+    progress_bar.empty()
+    st.session_state.timings.extend(job["timings"])
+    
+    if job["status"] == "queued":
+        st.error("No job worker picked up the job. Start one with `python -m jobs worker` or set JOB_WORKERS above 0.")
+        return None
+    if job["status"] == "running":
+        st.error(f"The background job did not finish within {JOB_TIMEOUT:.0f} seconds.")
+        return None
+    if job["status"] != "succeeded":
+        st.error(f"Background job failed: {job['error']}")
+        return None
+    return job["result"]
+
 def collect_research(topic):
-    # Perform simulated research on topic
+    # Fetch all research sources concurrently in a background job
     with st.spinner(f"📚 Researching {topic}..."):
-        # Simulate research time
-        progress_bar = st.progress(0)
-        
-        # Fetch web content
-        progress_bar.progress(10)
-        st.session_state.web_results = fetch_web_content(topic)
-        progress_bar.progress(40)
-        
-        # Fetch academic papers
-        st.session_state.academic_results = fetch_academic_papers(topic)
-        progress_bar.progress(70)
-        
-        # Fetch video transcripts
-        st.session_state.video_results = fetch_video_transcripts(topic)
-        progress_bar.progress(100)
-        
-        time.sleep(0.5)
-        progress_bar.empty()
+        results = run_job("research", {"topic": topic})
+    
+    if results is None:
+        return None
+    
+    st.session_state.web_results = results["web_results"]
+    st.session_state.academic_results = results["academic_results"]
+    st.session_state.video_results = results["video_results"]
+    
+    skipped = [source.replace('_results', '') for source in results["skipped"]]
+    if skipped:
+        st.warning(f"Some research sources could not be reached in time and were skipped: {', '.join(skipped)}")
         
     return {
         "web_results": st.session_state.web_results,
@@ -254,10 +289,20 @@ load_custom_css()
 if 'stage' not in st.session_state:
     st.session_state.stage = 1
 
-for key in ['web_results', 'academic_results', 'video_results', 'preferences', 'topic', 'objective', 'report', 'user_feedback']:
+for key in ['web_results', 'academic_results', 'video_results', 'preferences', 'topic', 'objective', 'report', 'report_sections', 'user_feedback']:
     if key not in st.session_state:
         st.session_state[key] = None
 
+# Record research, LLM, cache and report timings for this session
+if 'timings' not in st.session_state:
+    st.session_state.timings = new_session_spans()
+bind_session(st.session_state.timings)
+
+# Charge this session's LLM usage to its own token budget
+if 'user_id' not in st.session_state:
+    st.session_state.user_id = uuid.uuid4().hex
+set_user(st.session_state.user_id)
+
 # Display title and stage indicator
 st.title("🎓 Enhanced Interactive Learning Assistant")
 display_stage_indicator(st.session_state.stage)
@@ -284,8 +329,12 @@ if st.session_state.stage == 1:
 elif st.session_state.stage == 2:
     st.header(f"Step 2: Research on {st.session_state.topic}")
     
-    if not all([st.session_state.web_results, st.session_state.academic_results, st.session_state.video_results]):
+    if any(st.session_state[key] is None for key in ['web_results', 'academic_results', 'video_results']):
         research_results = collect_research(st.session_state.topic)
+        if research_results is None:
+            if st.button("Try Again"):
+                st.rerun()
+            st.stop()
         st.success(f"✅ Research on {st.session_state.topic} completed!")
     
     tab1, tab2, tab3 = st.tabs(["📄 Web Content", "📚 Academic Papers", "🎥 Video Transcripts"])
@@ -323,21 +372,22 @@ elif st.session_state.stage == 4:
     
     if st.session_state.report is None:
         with st.spinner("🧠 Generating your personalized learning report..."):
-            # Simulate report generation time
-            progress_bar = st.progress(0)
-            for i in range(0, 101, 10):
-                progress_bar.progress(i)
-                time.sleep(0.2)
-            
-            st.session_state.report = generate_report(
-                st.session_state.topic,
-                st.session_state.objective,
-                st.session_state.preferences,
-                st.session_state.web_results,
-                st.session_state.academic_results,
-                st.session_state.video_results
-            )
-            progress_bar.empty()
+            result = run_job("report", {
+                "topic": st.session_state.topic,
+                "objective": st.session_state.objective,
+                "preferences": st.session_state.preferences,
+                "web_results": st.session_state.web_results,
+                "academic_results": st.session_state.academic_results,
+                "video_results": st.session_state.video_results
+            })
+        
+        if result is None:
+            if st.button("Try Again"):
+                st.rerun()
+            st.stop()
+        
+        st.session_state.report_sections = result["sections"]
+        st.session_state.report = result["report"]
     
     st.info("Your personalized learning report has been generated! Click 'View Full Report' to review and make adjustments if needed.")
     
@@ -349,6 +399,10 @@ elif st.session_state.stage == 4:
 elif st.session_state.stage == 5:
     st.header(f"Personalized Learning Report: {st.session_state.topic}")
     
+    # Results of the last feedback regeneration
+    for level, message in st.session_state.pop('report_notices', []):
+        getattr(st, level)(message)
+    
     # Display the full report
     st.markdown(st.session_state.report, unsafe_allow_html=True)
     
@@ -368,11 +422,27 @@ elif st.session_state.stage == 5:
             if feedback:
                 st.session_state.user_feedback = feedback
                 
-                # In a real implementation, this would analyze the feedback and modify the report
-                # For this simulation, we'll just acknowledge the feedback
-                st.session_state.report += f"\n\n## Report Modification Based on Feedback\n\n{feedback}\n\n*The report has been updated to address this feedback.*"
+                # Rewrite only the sections the feedback refers to and keep the rest
+                with st.spinner("Updating the relevant sections of your report..."):
+                    sections, updated, failed = regenerate_report(
+                        st.session_state.report_sections,
+                        st.session_state.topic,
+                        feedback
+                    )
+                st.session_state.report_sections = sections
+                st.session_state.report = assemble_report(sections)
                 
-                st.success("Report has been updated based on your feedback!")
+                # Shown after the rerun, above the updated report
+                notices = []
+                if updated:
+                    updated_titles = ', '.join(name.replace('_', ' ').title() for name in updated)
+                    notices.append(("success", f"Report has been updated based on your feedback! Updated sections: {updated_titles}"))
+                if failed:
+                    failed_titles = ', '.join(name.replace('_', ' ').title() for name in failed)
+                    notices.append(("warning", f"These sections could not be rewritten and were left unchanged: {failed_titles}. Please try again."))
+                if not updated and not failed:
+                    notices.append(("warning", "Your feedback could not be matched to a section of the report, so nothing was changed. Try naming the section you'd like to change, e.g. the introduction or the practical applications."))
+                st.session_state.report_notices = notices
                 st.rerun()
             else:
                 st.warning("Please provide feedback for report modification.")
@@ -380,7 +450,7 @@ elif st.session_state.stage == 5:
     with col2:
         if st.button("Start a New Learning Journey"):
             # Reset all state except for preferences which might be reused
-            for key in ['web_results', 'academic_results', 'video_results', 'topic', 'objective', 'report', 'user_feedback']:
+            for key in ['web_results', 'academic_results', 'video_results', 'topic', 'objective', 'report', 'report_sections', 'user_feedback']:
                 st.session_state[key] = None
             
             st.session_state.stage = 1
@@ -437,6 +507,31 @@ with st.sidebar:
     
     st.markdown("---")
     
+    if st.checkbox("Show timings", value=SHOW_TIMINGS):
+        st.header("Timings")
+        rows = summarize(list(st.session_state.timings))
+        if rows:
+            st.dataframe(
+                [{
+                    "operation": f"{row['kind']}: {row['name']}",
+                    "calls": row["count"],
+                    "total ms": round(row["total_ms"], 1),
+                    "max ms": round(row["max_ms"], 1),
+                    "tokens": row["tokens"],
+                    "cost $": round(row["cost_usd"], 4),
+                } for row in rows],
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.caption("No timings recorded yet.")
+        
+        if st.button("Clear Timings"):
+            st.session_state.timings.clear()
+            st.rerun()
+    
+    st.markdown("---")
+    
     # About section
     st.header("About")
     st.markdown("""
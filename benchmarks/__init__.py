@@ -0,0 +1,6 @@
+"""
+Benchmarks for the learning-journey pipeline.
+
+Run against local stub backends with:
+    python -m benchmarks.run --iterations 50 --concurrency 8
+"""
@@ -0,0 +1,323 @@
+"""
+Benchmark harness for the learning-journey pipeline.
+
+Runs the research fetchers, personalization questions, report generation and
+every AI tutor function against local stub backends, and reports p50/p95/p99
+latency, throughput and peak traced memory per stage. Results are saved as
+JSON, and a previous result file can be passed with --baseline to flag
+regressions.
+
+Usage:
+    python -m benchmarks.run --iterations 50 --concurrency 8 --latency 0.05
+    python -m benchmarks.run --baseline benchmarks/results/previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.stubs import StubOpenAIServer, StubWikipediaServer
+
+DEFAULT_OUTPUT_DIR = os.path.join("benchmarks", "results")
+# A stage regresses when its p95 latency grows by more than this fraction
+REGRESSION_THRESHOLD = 0.2
+
+QUIZ_ITEMS = [
+    {"question": f"Question {i}?", "correct_answer": "A", "user_answer": "B"}
+    for i in range(5)
+]
+PRACTICE_PROBLEM = {
+    "problem": "A car travels 120 km in 2 hours. What is its average speed?",
+    "solution_steps": ["Average speed is total distance divided by total time", "120 km / 2 h = 60 km/h"],
+    "answer": "60 km/h",
+    "key_concepts": ["average speed", "distance", "time"],
+}
+
+def configure_environment(openai_url: str, wikipedia_url: str, cache_dir: str):
+    """
+    Point the app at the stub backends and at empty caches.
+
+    Must run before any of the app's modules are imported, since their
+    clients and caches are created at import time.
+    """
+    os.environ["OPENAI_BASE_URL"] = openai_url
+    os.environ["OPENAI_API_KEY"] = "benchmark"
+    os.environ["WIKIPEDIA_API_URL"] = wikipedia_url
+    os.environ["RESEARCH_CACHE_PATH"] = os.path.join(cache_dir, "research.sqlite3")
+    os.environ["LLM_CACHE_BACKEND"] = "memory"
+    os.environ["TUTOR_HEADLESS"] = "1"
+
+def build_stages() -> List[Tuple[str, Callable[[int], object]]]:
+    """
+    Create the benchmarked stages.
+
+    Each stage is called as stage(i) with a distinct iteration number, which is
+    worked into the topic or prompt so that every call misses the caches.
+
+    Returns:
+        List[Tuple[str, Callable]]: (stage name, callable) pairs in pipeline order
+    """
+    import ai_tutor
+    from personalize.interactive_questions import ask_questions
+    from personalize.solution_scoring import score_solution
+    from research.academic import fetch_academic_papers
+    from research.report import generate_report
+    from research.video import fetch_video_transcripts
+    from research.web import fetch_web_content
+
+    web_results = fetch_web_content("Benchmark python programming")
+    academic_results = fetch_academic_papers("Benchmark python programming")
+    video_results = fetch_video_transcripts("Benchmark python programming")
+
+    def topic(i):
+        return f"Python programming {i}"
+
+    return [
+        ("fetch_web_content", lambda i: fetch_web_content(topic(i))),
+        ("fetch_academic_papers", lambda i: fetch_academic_papers(topic(i))),
+        ("fetch_video_transcripts", lambda i: fetch_video_transcripts(topic(i))),
+        ("ask_questions", lambda i: ask_questions(topic(i))),
+        ("generate_report", lambda i: generate_report(
+            topic(i), "Learn the basics", {"experience": "Beginner"},
+            web_results, academic_results, video_results)),
+        ("generate_explanation", lambda i: ai_tutor.generate_explanation(topic(i), "variables")),
+        ("stream_explanation", lambda i: list(ai_tutor.stream_explanation(topic(i), "functions"))),
+        ("generate_quiz_questions", lambda i: ai_tutor.generate_quiz_questions(topic(i))),
+        ("generate_practice_problems", lambda i: ai_tutor.generate_practice_problems(topic(i))),
+        ("provide_feedback", lambda i: ai_tutor.provide_feedback("B", "A", f"Question {i}?")),
+        ("explain_answers", lambda i: ai_tutor.explain_answers(
+            [dict(item, question=f"{item['question']} {i}") for item in QUIZ_ITEMS])),
+        ("provide_batch_feedback", lambda i: ai_tutor.provide_batch_feedback(
+            [dict(item, question=f"{item['question']} {i}") for item in QUIZ_ITEMS])),
+        ("score_solution", lambda i: score_solution(
+            PRACTICE_PROBLEM, f"Average speed is distance over time: 120 km / 2 h = 60 km/h ({i})")),
+        ("generate_learning_path_outline", lambda i: ai_tutor.generate_learning_path_outline(
+            topic(i), "Beginner", "Build apps")),
+        ("generate_learning_path", lambda i: ai_tutor.generate_learning_path(topic(i), "Beginner", "Build apps")),
+        ("answer_user_question", lambda i: ai_tutor.answer_user_question(f"What is {topic(i)}?")),
+        ("stream_answer", lambda i: list(ai_tutor.stream_answer(f"Why learn {topic(i)}?"))),
+        ("classify_report_feedback", lambda i: ai_tutor.classify_report_feedback(
+            f"Please change this {i}", ["executive_summary", "introduction"])),
+        ("rewrite_report_section", lambda i: ai_tutor.rewrite_report_section(
+            topic(i), "## Summary\n\nText.", "Make it shorter") or {"error": "Section was not rewritten"}),
+    ]
+
+def error_payload(result: object) -> Optional[str]:
+    """
+    Find the error the app's functions report in place of raising.
+
+    The AI tutor functions catch their own exceptions and return (or stream)
+    `{"error": ...}` payloads or "Error ..." strings instead, which would
+    otherwise be timed as successful calls.
+
+    Args:
+        result (object): A stage's return value
+
+    Returns:
+        Optional[str]: The first error message found, or None
+    """
+    if isinstance(result, str):
+        return result if result.startswith("Error ") else None
+    if isinstance(result, dict):
+        if result.get("error"):
+            return str(result["error"])
+        # Field values are generated text, so only nested payloads are checked
+        items = [value for value in result.values() if isinstance(value, (dict, list, tuple))]
+    elif isinstance(result, (list, tuple)):
+        items = result
+    else:
+        return None
+    return next((error for error in map(error_payload, items) if error), None)
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """
+    Linearly interpolated percentile of already sorted values.
+
+    Args:
+        sorted_values (List[float]): Values in ascending order
+        p (float): Percentile between 0 and 100
+
+    Returns:
+        float: The percentile value
+    """
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+def measure_stage(fn: Callable[[int], object], iterations: int, concurrency: int, offset: int) -> Dict:
+    """
+    Measure one stage's latency, throughput and peak memory.
+
+    Latency and throughput come from an untraced run of `iterations` calls on
+    `concurrency` threads; peak memory comes from a separate tracemalloc run
+    of `concurrency` calls, so tracing overhead does not skew the timings.
+    Calls that raise or return an error payload are counted as errors and
+    left out of the latency percentiles.
+
+    Args:
+        fn (Callable): The stage, called as fn(i)
+        iterations (int): Number of timed calls
+        concurrency (int): Number of calls in flight at once
+        offset (int): First iteration number, keeping cache keys unique across runs
+
+    Returns:
+        Dict: Latency percentiles in milliseconds, throughput and peak memory
+    """
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            error = error_payload(fn(i))
+        except Exception as e:
+            error = str(e)
+        if error:
+            print(f"Benchmark call failed: {error}")
+        return time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        wall_start = time.perf_counter()
+        calls = list(executor.map(timed, range(offset, offset + iterations)))
+        wall_time = time.perf_counter() - wall_start
+
+        tracemalloc.start()
+        list(executor.map(timed, range(offset + iterations, offset + iterations + concurrency)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    latencies = sorted(latency for latency, error in calls if not error)
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": iterations - len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_per_s": round(len(latencies) / wall_time, 3) if wall_time else 0.0,
+        "peak_memory_kb": round(peak / 1024, 1),
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(iterations: int = 20, concurrency: int = 4, latency: float = 0.05,
+                   wikipedia_latency: Optional[float] = None, stages: Optional[List[str]] = None) -> Dict:
+    """
+    Start the stub backends and benchmark every stage.
+
+    Args:
+        iterations (int): Timed calls per stage
+        concurrency (int): Calls in flight at once
+        latency (float): Stub OpenAI response latency in seconds
+        wikipedia_latency (float, optional): Stub Wikipedia latency; defaults to `latency`
+        stages (List[str], optional): Only run these stages
+
+    Returns:
+        Dict: Run metadata and per-stage results
+    """
+    openai_server = StubOpenAIServer(latency).start()
+    wikipedia_server = StubWikipediaServer(latency if wikipedia_latency is None else wikipedia_latency).start()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            configure_environment(openai_server.base_url, wikipedia_server.api_url, cache_dir)
+            results = {}
+            offset = 0
+            for name, fn in build_stages():
+                if stages and name not in stages:
+                    continue
+                results[name] = measure_stage(fn, iterations, concurrency, offset)
+                offset += iterations + concurrency
+                print(f"{name:32} p50 {results[name]['p50_ms']:9.2f} ms  p95 {results[name]['p95_ms']:9.2f} ms  "
+                      f"p99 {results[name]['p99_ms']:9.2f} ms  {results[name]['throughput_per_s']:8.2f}/s  "
+                      f"{results[name]['peak_memory_kb']:9.1f} KiB  {results[name]['errors']} errors")
+    finally:
+        openai_server.stop()
+        wikipedia_server.stop()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "openai_latency_s": latency,
+            "wikipedia_latency_s": latency if wikipedia_latency is None else wikipedia_latency,
+        },
+        "stages": results,
+    }
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[str]:
+    """
+    Find stages whose p95 latency regressed against a baseline run.
+
+    Args:
+        current (Dict): Results of this run
+        baseline (Dict): Results of an earlier run
+        threshold (float): Allowed relative p95 increase
+
+    Returns:
+        List[str]: A description of each regressed stage
+    """
+    regressions = []
+    for name, result in current["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            continue
+        change = result["p95_ms"] / previous["p95_ms"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: p95 {previous['p95_ms']:.2f} ms -> {result['p95_ms']:.2f} ms (+{change:.0%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the learning-journey pipeline against stub backends")
+    parser.add_argument("--iterations", type=int, default=20, help="Timed calls per stage")
+    parser.add_argument("--concurrency", type=int, default=4, help="Calls in flight at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub OpenAI latency in seconds")
+    parser.add_argument("--wikipedia-latency", type=float, default=None, help="Stub Wikipedia latency in seconds")
+    parser.add_argument("--stage", action="append", dest="stages", help="Only run this stage (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result file to check for p95 regressions")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Allowed relative p95 increase")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.concurrency, args.latency, args.wikipedia_latency, args.stages)
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved results to {output}")
+
+    failed = [name for name, result in results["stages"].items() if result["errors"] == result["iterations"]]
+    for name in failed:
+        print(f"FAILED {name}: every call returned an error")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Local stub backends for benchmarking: a fake OpenAI chat completions server
+and a fake Wikipedia API server, each with a configurable response latency.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+_QUESTION = {
+    "question": "Which statement best describes the concept?",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct_answer": "A",
+    "explanation": "Option A states the definition.",
+}
+_PROBLEM = {
+    "problem": "Apply the concept to a small example.",
+    "hints": ["Start from the definition"],
+    "solution": "Work through the definition step by step.",
+    "solution_steps": ["Step 1", "Step 2"],
+    "difficulty": "intermediate",
+    "key_concepts": ["Concept 1"],
+}
+_FEEDBACK = {
+    "is_correct": True,
+    "feedback": "Good answer.",
+    "improvement_suggestions": "Add an example.",
+    "correct_answer_explanation": "The answer follows from the definition.",
+    "further_study": "Review the core concepts.",
+}
+_MODULE = {
+    "title": "Module 1",
+    "description": "Foundations",
+    "key_concepts": ["Concept 1", "Concept 2"],
+    "resources": ["Resource 1"],
+    "estimated_time": "1 week",
+    "prerequisites": [],
+}
+
+def _json_reply(prompt: str) -> Dict:
+    """Pick a canned JSON reply with the shape the prompt asks for."""
+    count = 3
+    if '"questions"' in prompt:
+        return {"questions": [_QUESTION] * count}
+    if '"problems"' in prompt:
+        return {"problems": [_PROBLEM] * count}
+    if '"explanations"' in prompt:
+        return {"explanations": ["The correct option matches the definition."] * prompt.count("Question:")}
+    if '"feedback": [' in prompt:
+        return {"feedback": [dict(_FEEDBACK, number=i + 1) for i in range(prompt.count("Question:"))]}
+    if '"modules"' in prompt:
+        outline = [{"title": f"Module {i + 1}", "summary": "Foundations", "estimated_time": "1 week"}
+                   for i in range(count)]
+        return {"overview": "A path", "modules": outline, "milestones": ["Milestone 1"], "assessment_methods": ["Quiz"]}
+    if '"key_concepts"' in prompt:
+        return {key: _MODULE[key] for key in ("key_concepts", "resources", "estimated_time", "prerequisites")}
+    if '"sections"' in prompt:
+        return {"sections": ["executive_summary"]}
+    return _FEEDBACK
+
+class _OpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length))
+        time.sleep(self.server.latency)
+
+        prompt = "\n".join(message["content"] for message in request["messages"])
+        if request.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps(_json_reply(prompt))
+        else:
+            content = self.server.text
+
+        if request.get("stream"):
+            self._send_stream(request["model"], content)
+        else:
+            self._send_json(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+
+    def _send_json(self, status: int, body: Dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = {"content": word if i == 0 else " " + word}
+            chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+class _WikipediaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        body = json.dumps({"query": {"pages": [
+            {"index": 1, "title": "Topic (disambiguation)", "fullurl": "https://en.wikipedia.org/wiki/Topic",
+             "extract": "Topic may refer to:", "pageprops": {"disambiguation": ""}},
+            {"index": 2, "title": "Topic", "fullurl": "https://en.wikipedia.org/wiki/Topic",
+             "extract": " ".join(["The topic is a field of study with a long history."] * 40)},
+        ]}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StubServer:
+    """A threaded local HTTP server that answers after a fixed latency."""
+
+    handler = None
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self._server.daemon_threads = True
+        self._server.latency = self.latency
+        self._configure(self._server)
+        threading.Thread(target=self._server.serve_forever, name=self.__class__.__name__, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _configure(self, server):
+        pass
+
+class StubOpenAIServer(StubServer):
+    """Fake OpenAI chat completions endpoint; JSON-mode requests get replies shaped like the prompt asks."""
+
+    handler = _OpenAIHandler
+
+    def __init__(self, latency: float = 0.05, text_words: int = 200):
+        super().__init__(latency)
+        self.text_words = text_words
+
+    @property
+    def base_url(self) -> str:
+        return self.url + "/v1"
+
+    def _configure(self, server):
+        server.text = " ".join(["word"] * self.text_words)
+
+class StubWikipediaServer(StubServer):
+    """Fake MediaWiki API endpoint returning a disambiguation page and an article."""
+
+    handler = _WikipediaHandler
+
+    @property
+    def api_url(self) -> str:
+        return self.url + "/w/api.php"
@@ -0,0 +1,389 @@
+"""
+Content Bank Module - Pre-generated quiz questions, practice problems and
+explanations for popular topics.
+
+The bank is built offline and stored as a single SQLite file. Each item is a
+zlib-compressed JSON blob indexed by (version, topic, kind, difficulty, concept),
+and readers always use the version marked current, so a rebuild can be swapped
+in while the app is running.
+
+Build a bank with:
+    python -m content_bank build --topics "Python; Machine Learning: neural networks, overfitting"
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from ai_tutor import (agenerate_explanation, agenerate_practice_problems, agenerate_quiz_questions,
+                      astream_quiz_questions, generate_practice_problems,
+                      stream_practice_problems, stream_quiz_questions)
+from research.cache import normalize_topic
+
+DEFAULT_BANK_PATH = "content_bank.sqlite3"
+DIFFICULTIES = ["beginner", "intermediate", "advanced"]
+
+QUIZ_QUESTION = "quiz_question"
+PRACTICE_PROBLEM = "practice_problem"
+EXPLANATION = "explanation"
+
+class ContentBank:
+    """Reader and writer for a content bank file."""
+
+    def __init__(self, path: str = DEFAULT_BANK_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS bank_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bank_items (
+                    version TEXT NOT NULL,
+                    topic_key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    concept TEXT NOT NULL DEFAULT '',
+                    payload BLOB NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_bank_items_lookup "
+                "ON bank_items (version, topic_key, kind, difficulty, concept)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def current_version(self) -> Optional[str]:
+        """
+        Get the version readers are served from.
+
+        Returns:
+            Optional[str]: The current version, or None if the bank is empty
+        """
+        row = self._connect().execute("SELECT value FROM bank_meta WHERE key = 'current_version'").fetchone()
+        return row[0] if row else None
+
+    def add_items(self, version: str, topic: str, kind: str, difficulty: str, items: List, concept: str = ""):
+        """
+        Add items to a (not yet current) version of the bank.
+
+        Args:
+            version (str): The version being built
+            topic (str): The topic the items belong to
+            kind (str): QUIZ_QUESTION, PRACTICE_PROBLEM or EXPLANATION
+            difficulty (str): The difficulty level
+            items (List): JSON-serializable items
+            concept (str): The concept, for explanations
+        """
+        rows = [
+            (version, normalize_topic(topic), kind, difficulty, normalize_topic(concept),
+             zlib.compress(json.dumps(item, separators=(",", ":")).encode("utf-8")))
+            for item in items
+        ]
+        self._connect().executemany(
+            "INSERT INTO bank_items (version, topic_key, kind, difficulty, concept, payload) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def publish(self, version: str):
+        """
+        Make a version current and delete all older versions.
+
+        Args:
+            version (str): The version to publish
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR REPLACE INTO bank_meta (key, value) VALUES ('current_version', ?)", (version,))
+            conn.execute("DELETE FROM bank_items WHERE version != ?", (version,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("VACUUM")
+
+    def sample(self, kind: str, topic: str, difficulty: str, count: int, concept: str = "") -> Optional[List]:
+        """
+        Draw a random sample of items from the current version.
+
+        Args:
+            kind (str): QUIZ_QUESTION, PRACTICE_PROBLEM or EXPLANATION
+            topic (str): The topic
+            difficulty (str): The difficulty level
+            count (int): Number of items wanted
+            concept (str): The concept, for explanations
+
+        Returns:
+            Optional[List]: The sampled items, or None if the bank has fewer than count
+        """
+        version = self.current_version()
+        if version is None:
+            return None
+
+        rows = self._connect().execute(
+            "SELECT payload FROM bank_items WHERE version = ? AND topic_key = ? AND kind = ? "
+            "AND difficulty = ? AND concept = ? ORDER BY RANDOM() LIMIT ?",
+            (version, normalize_topic(topic), kind, difficulty, normalize_topic(concept), count)
+        ).fetchall()
+        if len(rows) < count:
+            return None
+        return [json.loads(zlib.decompress(row[0])) for row in rows]
+
+_bank = None
+
+def get_content_bank() -> Optional[ContentBank]:
+    """
+    Get the shared content bank, if a bank file has been built.
+
+    Returns:
+        Optional[ContentBank]: The bank at CONTENT_BANK_PATH, or None if it does not exist
+    """
+    global _bank
+    path = os.getenv("CONTENT_BANK_PATH", DEFAULT_BANK_PATH)
+    if not os.path.exists(path):
+        return None
+    if _bank is None or _bank.path != path:
+        _bank = ContentBank(path)
+    return _bank
+
+def _sample(kind: str, topic: str, difficulty: str, count: int, concept: str = "") -> Optional[List]:
+    bank = get_content_bank()
+    if bank is None:
+        return None
+    try:
+        return bank.sample(kind, topic, difficulty, count, concept)
+    except sqlite3.Error as e:
+        print(f"Error reading content bank: {e}")
+        return None
+
+def get_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate") -> List[Dict]:
+    """
+    Get practice problems from the content bank, generating them live on a miss.
+
+    Args:
+        topic (str): The topic to get problems about
+        num_problems (int): Number of problems
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+
+    Returns:
+        List[Dict]: List of practice problems with solutions and explanations
+    """
+    return _sample(PRACTICE_PROBLEM, topic, difficulty, num_problems) or \
+        generate_practice_problems(topic, num_problems, difficulty)
+
+def iter_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate",
+                        exclude: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Get quiz questions from the content bank, generating them live on a miss.
+    Live-generated questions are yielded one by one as soon as each has been
+    generated.
+
+    Args:
+        topic (str): The topic to get questions about
+        num_questions (int): Number of questions
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Question texts the questions must differ from;
+            a bank sample that repeats one of them is replaced by live generation
+
+    Yields:
+        Dict: Quiz questions with answers and explanations
+    """
+    banked = _sample(QUIZ_QUESTION, topic, difficulty, num_questions)
+    if banked and not (exclude and any(q.get("question") in exclude for q in banked)):
+        yield from banked
+    else:
+        yield from stream_quiz_questions(topic, num_questions, difficulty, exclude)
+
+def iter_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate",
+                           exclude: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    Like get_practice_problems, but live-generated problems are yielded one by
+    one as soon as each has been generated.
+
+    Args:
+        topic (str): The topic to get problems about
+        num_problems (int): Number of problems
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        exclude (List[str], optional): Problem statements the problems must differ from;
+            a bank sample that repeats one of them is replaced by live generation
+
+    Yields:
+        Dict: Practice problems with solutions and explanations
+    """
+    banked = _sample(PRACTICE_PROBLEM, topic, difficulty, num_problems)
+    if banked and not (exclude and any(p.get("problem") in exclude for p in banked)):
+        yield from banked
+    else:
+        yield from stream_practice_problems(topic, num_problems, difficulty, exclude)
+
+async def aget_quiz_questions(topic: str, num_questions: int = 5, difficulty: str = "intermediate") -> List[Dict]:
+    """
+    Get quiz questions from the content bank, generating them live on a miss.
+
+    The bank is read in a worker thread, so the event loop is not blocked.
+
+    Args:
+        topic (str): The topic to get questions about
+        num_questions (int): Number of questions
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+
+    Returns:
+        List[Dict]: List of quiz questions with answers and explanations
+    """
+    return await asyncio.to_thread(_sample, QUIZ_QUESTION, topic, difficulty, num_questions) or \
+        await agenerate_quiz_questions(topic, num_questions, difficulty)
+
+async def aiter_quiz_questions(topic: str, num_questions: int = 5,
+                              difficulty: str = "intermediate") -> AsyncIterator[Dict]:
+    """Async version of iter_quiz_questions."""
+    banked = await asyncio.to_thread(_sample, QUIZ_QUESTION, topic, difficulty, num_questions)
+    if banked:
+        for question in banked:
+            yield question
+    else:
+        async for question in astream_quiz_questions(topic, num_questions, difficulty):
+            yield question
+
+async def aget_practice_problems(topic: str, num_problems: int = 3, difficulty: str = "intermediate") -> List[Dict]:
+    """Async version of get_practice_problems."""
+    return await asyncio.to_thread(_sample, PRACTICE_PROBLEM, topic, difficulty, num_problems) or \
+        await agenerate_practice_problems(topic, num_problems, difficulty)
+
+def get_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> Optional[str]:
+    """
+    Get a pre-generated explanation of a concept.
+
+    Args:
+        topic (str): The main topic
+        concept (str): The concept to explain
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+
+    Returns:
+        Optional[str]: The explanation, or None if the bank does not have one
+    """
+    explanations = _sample(EXPLANATION, topic, difficulty, 1, concept)
+    return explanations[0] if explanations else None
+
+async def aget_explanation(topic: str, concept: str, difficulty: str = "intermediate") -> str:
+    """
+    Get an explanation from the content bank, generating it live on a miss.
+
+    The bank is read in a worker thread, so the event loop is not blocked.
+
+    Args:
+        topic (str): The main topic
+        concept (str): The concept to explain
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+
+    Returns:
+        str: The explanation
+    """
+    return await asyncio.to_thread(get_explanation, topic, concept, difficulty) or \
+        await agenerate_explanation(topic, concept, difficulty)
+
+async def _build_topic(bank: ContentBank, version: str, topic: str, concepts: List[str],
+                       difficulty: str, num_questions: int, num_problems: int):
+    concepts = concepts or [topic]
+    questions, problems, *explanations = await asyncio.gather(
+        agenerate_quiz_questions(topic, num_questions, difficulty),
+        agenerate_practice_problems(topic, num_problems, difficulty),
+        *(agenerate_explanation(topic, concept, difficulty) for concept in concepts)
+    )
+
+    bank.add_items(version, topic, QUIZ_QUESTION, difficulty, [q for q in questions if "error" not in q])
+    bank.add_items(version, topic, PRACTICE_PROBLEM, difficulty, [p for p in problems if "error" not in p])
+    for concept, explanation in zip(concepts, explanations):
+        if not explanation.startswith("Error generating explanation"):
+            bank.add_items(version, topic, EXPLANATION, difficulty, [explanation], concept)
+    print(f"Built {difficulty} content for {topic}")
+
+def build_content_bank(topics: Dict[str, List[str]], path: str = DEFAULT_BANK_PATH,
+                       difficulties: Optional[List[str]] = None, num_questions: int = 10,
+                       num_problems: int = 5, version: Optional[str] = None) -> str:
+    """
+    Generate content for a list of topics and publish it as a new bank version.
+
+    Args:
+        topics (Dict[str, List[str]]): Topics mapped to the concepts to pre-explain
+            (an empty list explains the topic itself)
+        path (str): Bank file to write
+        difficulties (List[str], optional): Difficulty levels to build (default: all)
+        num_questions (int): Quiz questions per topic and difficulty
+        num_problems (int): Practice problems per topic and difficulty
+        version (str, optional): Version label (default: current timestamp)
+
+    Returns:
+        str: The published version
+    """
+    bank = ContentBank(path)
+    version = version or time.strftime("%Y%m%d%H%M%S")
+
+    async def build_all():
+        await asyncio.gather(*(
+            _build_topic(bank, version, topic, concepts, difficulty, num_questions, num_problems)
+            for topic, concepts in topics.items()
+            for difficulty in (difficulties or DIFFICULTIES)
+        ))
+
+    asyncio.run(build_all())
+    bank.publish(version)
+    return version
+
+def parse_topics(spec: str) -> Dict[str, List[str]]:
+    """
+    Parse a topic list where each entry is "Topic" or "Topic: concept, concept".
+
+    Entries are separated by newlines, or by semicolons on a single line.
+
+    Args:
+        spec (str): The topic list
+
+    Returns:
+        Dict[str, List[str]]: Topics mapped to their concepts
+    """
+    topics = {}
+    for entry in spec.replace(";", "\n").splitlines():
+        topic, _, concepts = entry.partition(":")
+        if topic.strip():
+            topics[topic.strip()] = [c.strip() for c in concepts.split(",") if c.strip()]
+    return topics
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-generated content bank")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Generate content and publish a new version")
+    build.add_argument("--topics", help='Topics separated by ";", each optionally followed by ": concept, concept"')
+    build.add_argument("--topics-file", help="File with one topic entry per line")
+    build.add_argument("--output", default=os.getenv("CONTENT_BANK_PATH", DEFAULT_BANK_PATH))
+    build.add_argument("--difficulties", default=",".join(DIFFICULTIES))
+    build.add_argument("--questions", type=int, default=10)
+    build.add_argument("--problems", type=int, default=5)
+    build.add_argument("--version")
+    args = parser.parse_args()
+
+    spec = args.topics or ""
+    if args.topics_file:
+        with open(args.topics_file, encoding="utf-8") as f:
+            spec += "\n" + f.read()
+    topics = parse_topics(spec)
+    if not topics:
+        parser.error("no topics given")
+
+    version = build_content_bank(
+        topics, args.output, [d.strip() for d in args.difficulties.split(",")],
+        args.questions, args.problems, args.version
+    )
+    print(f"Published content bank version {version} to {args.output}")
+
+if __name__ == "__main__":
+    main()
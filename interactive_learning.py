@@ -5,9 +5,15 @@ import streamlit as st
 import json
 import random
 from typing import Dict, List, Optional, Tuple
-from ai_tutor import generate_explanation, generate_quiz_questions, generate_practice_problems, provide_feedback
+from ai_tutor import stream_explanation, stream_answer
+from content_bank import get_explanation, get_practice_problems
+from learning_sessions import (complete_module, complete_quiz, expand_modules, get_concept_explanation,
+                               get_learning_path_session, get_module, get_practice_session, get_quiz_feedback,
+                               get_quiz_session, grade_practice_solutions, mark_problem_used, module_requested,
+                               next_practice_set, start_module)
 
-def render_concept_explorer(topic: str, concept: str, difficulty: str = "intermediate"):
+def render_concept_explorer(topic: str, concept: str, difficulty: str = "intermediate",
+                            explanation: Optional[str] = None):
     """
     Render an interactive concept explorer.
     
@@ -15,15 +21,16 @@ def render_concept_explorer(topic: str, concept: str, difficulty: str = "interme
         topic (str): The main topic
         concept (str): The specific concept to explore
         difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        explanation (str, optional): An explanation that has already been generated
     """
     st.subheader(f"Concept Explorer: {concept}")
     
-    # Generate explanation
-    with st.spinner(f"Generating explanation for {concept}..."):
-        explanation = generate_explanation(topic, concept, difficulty)
-    
-    # Display explanation
-    st.markdown(explanation)
+    # Use a pre-generated explanation if there is one, otherwise stream it as it is generated
+    explanation = explanation or get_explanation(topic, concept, difficulty)
+    if explanation:
+        st.markdown(explanation)
+    else:
+        st.write_stream(stream_explanation(topic, concept, difficulty))
     
     # Add interactive elements
     st.markdown("### Interactive Elements")
@@ -32,7 +39,8 @@ def render_concept_explorer(topic: str, concept: str, difficulty: str = "interme
     helpful = st.radio(
         "Was this explanation helpful?",
         ["Yes", "Partially", "No"],
-        horizontal=True
+        horizontal=True,
+        key=f"helpful_explanation_{concept}"
     )
     
     if helpful == "No" or helpful == "Partially":
@@ -41,44 +49,60 @@ def render_concept_explorer(topic: str, concept: str, difficulty: str = "interme
     # Ask for questions
     question = st.text_input("Do you have any questions about this concept?", key=f"question_{concept}")
     if question:
-        with st.spinner("Generating answer..."):
-            answer = generate_explanation(topic, question, difficulty)
-            st.markdown(f"**Answer:** {answer}")
+        st.markdown("**Answer:**")
+        st.write_stream(stream_explanation(topic, question, difficulty))
     
-    # Add a "Generate Quiz" button
+    # Add a "Generate Quiz" button; the quiz stays pinned across reruns once generated
+    quiz_flag = f"concept_quiz_{concept}"
     if st.button("Generate Quiz on this Concept", key=f"quiz_{concept}"):
+        st.session_state[quiz_flag] = True
+    
+    if st.session_state.get(quiz_flag):
         with st.spinner("Generating quiz questions..."):
-            questions = generate_quiz_questions(f"{topic} - {concept}", num_questions=3, difficulty=difficulty)
+            quiz = get_quiz_session(st.session_state, f"{topic} - {concept}", num_questions=3, difficulty=difficulty)
+        
+        # Display questions
+        for i, q in enumerate(quiz["questions"]):
+            if "error" in q:
+                st.error(q["error"])
+                continue
             
-            # Display questions
-            for i, q in enumerate(questions):
-                st.markdown(f"### Question {i+1}")
-                st.markdown(f"**{q['question']}**")
+            st.markdown(f"### Question {i+1}")
+            st.markdown(f"**{q['question']}**")
+            
+            # Display options
+            options = q.get('options', [])
+            if options:
+                user_answer = st.radio(
+                    "Select your answer:",
+                    options,
+                    key=f"q_{quiz['id']}_{i}",
+                    label_visibility="collapsed"
+                )
+                
+                # Check answer
+                if st.button("Check Answer", key=f"check_{quiz['id']}_{i}"):
+                    get_quiz_feedback(quiz, i, user_answer)
                 
-                # Display options
-                options = q.get('options', [])
-                if options:
-                    user_answer = st.radio(
-                        "Select your answer:",
-                        options,
-                        key=f"q_{i}_{concept}",
-                        label_visibility="collapsed"
-                    )
+                # Display feedback for the last checked answer
+                feedback = quiz["feedback"].get(i)
+                if feedback:
+                    if feedback.get('is_correct', False):
+                        st.success("Correct! 🎉")
+                    else:
+                        st.error("Incorrect. Try again!")
                     
-                    # Check answer
-                    if st.button("Check Answer", key=f"check_{i}_{concept}"):
-                        correct_answer = q.get('correct_answer', '')
-                        feedback = provide_feedback(user_answer, correct_answer, q['question'])
-                        
-                        # Display feedback
-                        if feedback.get('is_correct', False):
-                            st.success("Correct! 🎉")
-                        else:
-                            st.error("Incorrect. Try again!")
-                        
-                        st.markdown(f"**Explanation:** {feedback.get('correct_answer_explanation', '')}")
+                    st.markdown(f"**Explanation:** {feedback.get('correct_answer_explanation', '')}")
+                    if feedback.get('further_study'):
                         st.markdown(f"**Further Study:** {feedback.get('further_study', '')}")
 
+def _preview_question(index: int, q: Dict):
+    # Read-only view of a question that arrived while the rest are still being generated
+    st.markdown(f"### Question {index+1}")
+    st.markdown(f"**{q['question']}**")
+    for option in q.get('options', []):
+        st.markdown(f"- {option}")
+
 def render_interactive_quiz(topic: str, num_questions: int = 5, difficulty: str = "intermediate"):
     """
     Render an interactive quiz.
@@ -90,17 +114,25 @@ def render_interactive_quiz(topic: str, num_questions: int = 5, difficulty: str
     """
     st.subheader(f"Interactive Quiz: {topic}")
     
-    # Generate questions
+    # Generate questions once and reuse them across reruns, previewing each
+    # question as soon as it has been generated
+    preview = st.empty()
+    arrived = []
+    
+    def on_question(index: int, q: Dict):
+        arrived.append(q)
+        with preview.container():
+            for i, question in enumerate(arrived):
+                _preview_question(i, question)
+    
     with st.spinner("Generating quiz questions..."):
-        questions = generate_quiz_questions(topic, num_questions, difficulty)
+        quiz = get_quiz_session(st.session_state, topic, num_questions, difficulty, on_question=on_question)
+    preview.empty()
+    questions = quiz["questions"]
     
-    # Initialize session state for quiz
-    if 'quiz_answers' not in st.session_state:
-        st.session_state.quiz_answers = {}
-    if 'quiz_feedback' not in st.session_state:
-        st.session_state.quiz_feedback = {}
-    if 'quiz_completed' not in st.session_state:
-        st.session_state.quiz_completed = False
+    if any("error" in q for q in questions):
+        st.error(questions[0].get("error", "Could not generate quiz questions."))
+        return
     
     # Display questions
     for i, q in enumerate(questions):
@@ -113,22 +145,20 @@ def render_interactive_quiz(topic: str, num_questions: int = 5, difficulty: str
             user_answer = st.radio(
                 "Select your answer:",
                 options,
-                key=f"q_{i}",
+                key=f"q_{quiz['id']}_{i}",
                 label_visibility="collapsed"
             )
             
             # Store answer
-            st.session_state.quiz_answers[i] = user_answer
+            quiz["answers"][i] = user_answer
             
             # Check answer
-            if st.button("Check Answer", key=f"check_{i}"):
-                correct_answer = q.get('correct_answer', '')
-                feedback = provide_feedback(user_answer, correct_answer, q['question'])
-                
-                # Store feedback
-                st.session_state.quiz_feedback[i] = feedback
-                
-                # Display feedback
+            if st.button("Check Answer", key=f"check_{quiz['id']}_{i}"):
+                get_quiz_feedback(quiz, i, user_answer)
+            
+            # Display feedback for the last checked answer
+            feedback = quiz["feedback"].get(i)
+            if feedback:
                 if feedback.get('is_correct', False):
                     st.success("Correct! 🎉")
                 else:
@@ -136,20 +166,37 @@ def render_interactive_quiz(topic: str, num_questions: int = 5, difficulty: str
                 
                 st.markdown(f"**Explanation:** {feedback.get('correct_answer_explanation', '')}")
     
+    # Add a "New Questions" button
+    if st.button("New Questions", key=f"new_quiz_{quiz['id']}"):
+        get_quiz_session(st.session_state, topic, num_questions, difficulty, regenerate=True)
+        st.rerun()
+    
     # Add a "Complete Quiz" button
     if st.button("Complete Quiz"):
-        st.session_state.quiz_completed = True
-        
-        # Calculate score
-        correct_count = sum(1 for i, feedback in st.session_state.quiz_feedback.items() 
-                           if feedback.get('is_correct', False))
-        total_questions = len(questions)
-        score_percentage = (correct_count / total_questions) * 100
+        quiz["completed"] = True
+    
+    if quiz["completed"]:
+        # Score locally and fetch detailed feedback for all answers in one request
+        with st.spinner("Grading your quiz..."):
+            results = complete_quiz(quiz)
+        correct_count = results["correct"]
+        total_questions = results["total"]
+        score_percentage = results["percentage"]
         
         # Display results
         st.markdown("### Quiz Results")
         st.markdown(f"**Score:** {correct_count}/{total_questions} ({score_percentage:.1f}%)")
         
+        for i, feedback in sorted(results["feedback"].items()):
+            with st.expander(f"Question {i+1}: {'✅' if feedback.get('is_correct', False) else '❌'}"):
+                if "error" in feedback:
+                    st.error(feedback["error"])
+                    continue
+                st.markdown(feedback.get('feedback', ''))
+                st.markdown(f"**Explanation:** {feedback.get('correct_answer_explanation', '')}")
+                if feedback.get('further_study'):
+                    st.markdown(f"**Further Study:** {feedback.get('further_study', '')}")
+        
         # Provide overall feedback
         if score_percentage >= 80:
             st.success("Excellent job! You have a strong understanding of this topic.")
@@ -161,7 +208,7 @@ def render_interactive_quiz(topic: str, num_questions: int = 5, difficulty: str
         # Add a "Generate Practice Problems" button
         if st.button("Generate Practice Problems"):
             with st.spinner("Generating practice problems..."):
-                problems = generate_practice_problems(topic, num_problems=3, difficulty=difficulty)
+                problems = get_practice_problems(topic, num_problems=3, difficulty=difficulty)
                 
                 # Display problems
                 for i, p in enumerate(problems):
@@ -188,11 +235,28 @@ def render_practice_problems(topic: str, num_problems: int = 3, difficulty: str
     """
     st.subheader(f"Practice Problems: {topic}")
     
-    # Generate problems
+    # Generate the problems once and reuse them across reruns, previewing each
+    # problem as soon as it has been generated
+    preview = st.empty()
+    arrived = []
+    
+    def on_problem(index: int, p: Dict):
+        arrived.append(p)
+        with preview.container():
+            for i, problem in enumerate(arrived):
+                st.markdown(f"### Problem {i+1}")
+                st.markdown(f"**{problem['problem']}**")
+    
     with st.spinner("Generating practice problems..."):
-        problems = generate_practice_problems(topic, num_problems, difficulty)
+        practice = get_practice_session(st.session_state, topic, num_problems, difficulty, on_problem=on_problem)
+    preview.empty()
+    problems = practice["problems"]
     
-    # Display problems
+    if any("error" in p for p in problems):
+        st.error(problems[0].get("error", "Could not generate practice problems."))
+        return
+    
+    key_prefix = f"{practice['id']}_{practice['set_number']}"
     for i, p in enumerate(problems):
         st.markdown(f"### Problem {i+1}")
         st.markdown(f"**{p['problem']}**")
@@ -200,14 +264,29 @@ def render_practice_problems(topic: str, num_problems: int = 3, difficulty: str
         # Add a text area for the user's solution
         user_solution = st.text_area(
             "Your solution:",
-            key=f"solution_{i}",
+            key=f"solution_{key_prefix}_{i}",
             height=150
         )
         
-        # Add a "Check Solution" button
-        if st.button("Check Solution", key=f"check_solution_{i}"):
-            # In a real implementation, this would compare the user's solution with the correct solution
-            # For now, we'll just show the solution
+        # Add a "Check Solution" button; checked problems count as used
+        if st.button("Check Solution", key=f"check_solution_{key_prefix}_{i}"):
+            if user_solution.strip():
+                with st.spinner("Checking your solution..."):
+                    grade_practice_solutions(practice, {i: user_solution})
+            else:
+                mark_problem_used(practice, i)
+        
+        if i in practice["used"]:
+            # Feedback on the last checked solution, graded locally when the verdict is clear
+            feedback = practice["feedback"].get(i)
+            if feedback:
+                if "error" in feedback:
+                    st.error(feedback["error"])
+                elif feedback.get('is_correct', False):
+                    st.success(f"Looks right! {feedback.get('feedback', '')}")
+                else:
+                    st.warning(feedback.get('feedback', ''))
+            
             st.markdown("**Solution:**")
             for step in p.get('solution_steps', []):
                 st.markdown(f"- {step}")
@@ -220,11 +299,40 @@ def render_practice_problems(topic: str, num_problems: int = 3, difficulty: str
                 "Was this solution helpful?",
                 ["Yes", "Partially", "No"],
                 horizontal=True,
-                key=f"helpful_{i}"
+                key=f"helpful_{key_prefix}_{i}"
             )
             
             if helpful == "No" or helpful == "Partially":
-                st.text_area("What could be improved?", key=f"improve_solution_{i}")
+                st.text_area("What could be improved?", key=f"improve_solution_{key_prefix}_{i}")
+    
+    # Grade every written solution at once; ambiguous ones share one LLM request
+    written = {
+        i: st.session_state.get(f"solution_{key_prefix}_{i}", "") for i in range(len(problems))
+    }
+    written = {i: text for i, text in written.items() if text.strip()}
+    if written and st.button("Check All Solutions", key=f"check_all_{key_prefix}"):
+        with st.spinner("Checking your solutions..."):
+            grade_practice_solutions(practice, written)
+        st.rerun()
+    
+    # Add a "Next Problems" button; the next set is usually prefetched by now
+    st.caption(f"Problems used: {len(practice['used'])}/{len(problems)}")
+    if st.button("Next Problems", key=f"next_problems_{practice['id']}"):
+        with st.spinner("Generating practice problems..."):
+            result = next_practice_set(practice)
+        if "error" in result:
+            st.error(result["error"])
+        else:
+            st.rerun()
+
+def _preview_learning_path(learning_path: Dict):
+    # Read-only view of a partially generated learning path
+    st.markdown("### Overview")
+    st.markdown(learning_path.get('overview', ''))
+    st.markdown("### Learning Modules")
+    for i, module in enumerate(learning_path.get('modules', [])):
+        st.markdown(f"**Module {i+1}: {module.get('title', '')}** ({module.get('estimated_time', '')})")
+        st.caption(module.get('summary', ''))
 
 def render_learning_path(topic: str, user_knowledge: str, learning_goals: str):
     """
@@ -237,38 +345,63 @@ def render_learning_path(topic: str, user_knowledge: str, learning_goals: str):
     """
     st.subheader(f"Personalized Learning Path: {topic}")
     
-    # Generate learning path
+    # Generate the learning path once, previewing modules as they are generated
+    preview = st.empty()
+    
+    def on_update(partial: Dict):
+        with preview.container():
+            _preview_learning_path(partial)
+    
     with st.spinner("Generating personalized learning path..."):
-        from ai_tutor import generate_learning_path
-        learning_path = generate_learning_path(topic, user_knowledge, learning_goals)
+        session = get_learning_path_session(st.session_state, topic, user_knowledge, learning_goals,
+                                            on_update=on_update)
+    preview.empty()
+    learning_path = session["path"]
+    
+    if "error" in learning_path:
+        st.error(learning_path["error"])
+        return
     
     # Display overview
     st.markdown("### Overview")
     st.markdown(learning_path.get('overview', ''))
     
-    # Display modules
+    # Display modules; details are only generated for modules the user asks about
     st.markdown("### Learning Modules")
     for i, module in enumerate(learning_path.get('modules', [])):
         with st.expander(f"Module {i+1}: {module.get('title', '')}"):
-            st.markdown(f"**Key Concepts:**")
-            for concept in module.get('key_concepts', []):
-                st.markdown(f"- {concept}")
+            st.markdown(module.get('summary', ''))
             
-            st.markdown(f"**Resources:**")
-            for resource in module.get('resources', []):
-                st.markdown(f"- {resource}")
-            
-            st.markdown(f"**Estimated Time:** {module.get('estimated_time', '')}")
-            
-            if module.get('prerequisites', []):
-                st.markdown(f"**Prerequisites:**")
-                for prereq in module.get('prerequisites', []):
-                    st.markdown(f"- {prereq}")
+            if not module_requested(session, i):
+                st.markdown(f"**Estimated Time:** {module.get('estimated_time', '')}")
+                if st.button("Show Details", key=f"module_details_{session['id']}_{i}"):
+                    expand_modules(session, [i])
+                    st.rerun()
+            else:
+                with st.spinner("Preparing module details..."):
+                    module = get_module(session, i)
+                if "error" in module:
+                    st.error(module["error"])
+                
+                st.markdown(f"**Key Concepts:**")
+                for concept in module.get('key_concepts', []):
+                    st.markdown(f"- {concept}")
+                
+                st.markdown(f"**Resources:**")
+                for resource in module.get('resources', []):
+                    st.markdown(f"- {resource}")
+                
+                st.markdown(f"**Estimated Time:** {module.get('estimated_time', '')}")
+                
+                if module.get('prerequisites', []):
+                    st.markdown(f"**Prerequisites:**")
+                    for prereq in module.get('prerequisites', []):
+                        st.markdown(f"- {prereq}")
             
-            # Add a "Start Module" button
-            if st.button("Start Module", key=f"start_module_{i}"):
-                st.session_state.current_module = i
-                st.session_state.module_started = True
+            # Add a "Start Module" button; its concepts start being explained in the background
+            if st.button("Start Module", key=f"start_module_{session['id']}_{i}"):
+                with st.spinner("Preparing module..."):
+                    start_module(session, i)
                 st.rerun()
     
     # Display milestones
@@ -281,27 +414,24 @@ def render_learning_path(topic: str, user_knowledge: str, learning_goals: str):
     for i, method in enumerate(learning_path.get('assessment_methods', [])):
         st.markdown(f"- {method}")
     
-    # Initialize session state for module tracking
-    if 'current_module' not in st.session_state:
-        st.session_state.current_module = 0
-    if 'module_started' not in st.session_state:
-        st.session_state.module_started = False
-    
     # If a module is started, display its content
-    if st.session_state.module_started:
-        current_module = learning_path.get('modules', [])[st.session_state.current_module]
+    if session["module_started"]:
+        current_module = get_module(session, session["current_module"])
         
         st.markdown(f"### Current Module: {current_module.get('title', '')}")
         
-        # Display module content
+        # Display module content; Streamlit runs the body of collapsed expanders too,
+        # so concepts are opened with a toggle and only an open concept waits for its explanation
         for i, concept in enumerate(current_module.get('key_concepts', [])):
-            with st.expander(f"Concept {i+1}: {concept}"):
-                render_concept_explorer(topic, concept)
+            if st.toggle(f"Concept {i+1}: {concept}", key=f"concept_{session['id']}_{session['current_module']}_{i}"):
+                with st.container(border=True):
+                    with st.spinner("Preparing explanation..."):
+                        explanation = get_concept_explanation(session, str(concept))
+                    render_concept_explorer(topic, str(concept), explanation=explanation)
         
         # Add a "Complete Module" button
         if st.button("Complete Module"):
-            st.session_state.module_started = False
-            st.session_state.current_module += 1
+            complete_module(session)
             st.rerun()
 
 def render_question_answer(topic: str):
@@ -319,13 +449,9 @@ def render_question_answer(topic: str):
     # Add a "Ask" button
     if st.button("Ask"):
         if question:
-            with st.spinner("Generating answer..."):
-                from ai_tutor import answer_user_question
-                answer = answer_user_question(question, context=f"Topic: {topic}")
-            
-            # Display answer
+            # Stream the answer as it is generated
             st.markdown("### Answer")
-            st.markdown(answer)
+            answer = st.write_stream(stream_answer(question, context=f"Topic: {topic}"))
             
             # Ask if the answer was helpful
             helpful = st.radio(
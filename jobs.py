@@ -0,0 +1,393 @@
+"""
+Background Jobs Module - Local job queue for research and report generation.
+
+Jobs are stored in SQLite, so the queue needs no outside broker and can be
+shared by the Streamlit app, the API and any number of worker processes.
+Callers submit a job, get its id back and poll it for status, progress and
+the stored result.
+
+Run dedicated workers with:
+    python -m jobs worker --workers 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from research.orchestrator import run_research
+from research.progress import ProgressReporter
+from research.report import assemble_report, build_report_sections, report_inputs
+from telemetry import bind_session, new_session_spans, unbind_session
+
+DEFAULT_QUEUE_PATH = os.path.join(".cache", "jobs.sqlite3")
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# Running jobs whose worker has not reported for this long are requeued
+STALE_AFTER = 600
+# Seconds between a worker's heartbeats for the job it is running; well below
+# STALE_AFTER so that slow jobs are never mistaken for abandoned ones
+HEARTBEAT_INTERVAL = 60
+# Finished jobs are deleted after this many seconds
+RETENTION = 24 * 3600
+
+def _run_research_job(payload: Dict, progress: ProgressReporter) -> Dict:
+    skipped = []
+
+    def on_progress(completed, total, source, status):
+        if status != "ok":
+            skipped.append(source)
+
+    results = run_research(payload["topic"], payload.get("sources"), on_progress=on_progress, progress=progress)
+    return {**results, "skipped": skipped}
+
+def _run_report_job(payload: Dict, progress: ProgressReporter) -> Dict:
+    results = {key: payload.get(key) for key in ("web_results", "academic_results", "video_results")}
+    missing = [key for key, value in results.items() if value is None]
+    if missing:
+        results.update(run_research(payload["topic"], missing))
+
+    inputs = report_inputs(
+        payload["topic"], payload.get("objective", ""), payload.get("preferences") or {},
+        results["web_results"], results["academic_results"], results["video_results"]
+    )
+    sections = build_report_sections(inputs, progress)
+    return {"report": assemble_report(sections), "sections": sections, "inputs": inputs, **results}
+
+# Job kinds and the functions that run them: handler(payload, progress) -> result
+JOB_HANDLERS: Dict[str, Callable[[Dict, ProgressReporter], Dict]] = {
+    "research": _run_research_job,
+    "report": _run_report_job,
+}
+
+class JobQueue:
+    """SQLite-backed job queue shared between threads and processes."""
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH):
+        self.path = path
+        self._local = threading.local()
+        # Bumped whenever a job is submitted or changes in this process, so that
+        # in-process workers and waiters wake up at once instead of polling
+        self._changed = threading.Condition()
+        self.version = 0
+
+    def notify(self):
+        """Wake every in-process worker and waiter."""
+        with self._changed:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version: int, timeout: float):
+        """
+        Block until a job is submitted or changes in this process, or for at
+        most timeout seconds (changes made by other processes are only seen
+        by polling again).
+
+        Args:
+            version (int): The value of `version` the caller last saw
+            timeout (float): Maximum seconds to wait
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress REAL NOT NULL DEFAULT 0,
+                    message TEXT NOT NULL DEFAULT '',
+                    result TEXT,
+                    error TEXT,
+                    timings TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    finished_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            self._local.conn = conn
+        return conn
+
+    def submit(self, kind: str, payload: Dict) -> str:
+        """
+        Add a job to the queue.
+
+        Args:
+            kind (str): The job kind, one of JOB_HANDLERS
+            payload (Dict): JSON-serializable job arguments
+
+        Returns:
+            str: The job id
+        """
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, QUEUED, json.dumps(payload), now, now)
+        )
+        self.notify()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Get a job's status, progress and result.
+
+        Args:
+            job_id (str): The job id
+
+        Returns:
+            Optional[Dict]: The job, or None if it does not exist
+        """
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "progress": row["progress"],
+            "message": row["message"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "timings": json.loads(row["timings"]) if row["timings"] else [],
+            "created_at": row["created_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def claim(self) -> Optional[Dict]:
+        """
+        Take the oldest queued job and mark it as running.
+
+        Returns:
+            Optional[Dict]: The claimed job's id, kind and payload, or None if the queue is empty
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Requeue jobs whose worker stopped reporting
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, now, RUNNING, now - STALE_AFTER)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (RUNNING, now, row["id"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+        return {"id": row["id"], "kind": row["kind"], "payload": json.loads(row["payload"])}
+
+    def update_progress(self, job_id: str, progress: float, message: str = ""):
+        self._connect().execute(
+            "UPDATE jobs SET progress = ?, message = ?, updated_at = ? WHERE id = ?",
+            (progress, message, time.time(), job_id)
+        )
+        self.notify()
+
+    def heartbeat(self, job_id: str):
+        """Record that a running job's worker is still alive."""
+        self._connect().execute(
+            "UPDATE jobs SET updated_at = ? WHERE id = ? AND status = ?", (time.time(), job_id, RUNNING)
+        )
+
+    def _beat(self, job_id: str, done: threading.Event):
+        while not done.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.heartbeat(job_id)
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+
+    def finish(self, job_id: str, result: Optional[Dict] = None, error: Optional[str] = None,
+               timings: Optional[List[Dict]] = None):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, progress = ?, result = ?, error = ?, timings = ?, updated_at = ?, finished_at = ? WHERE id = ?",
+            (FAILED if error else SUCCEEDED, 0.0 if error else 1.0,
+             None if error else json.dumps(result), error, json.dumps(timings or [], default=str), now, now, job_id)
+        )
+        self.notify()
+
+    def purge(self, max_age: float = RETENTION) -> int:
+        """
+        Delete finished jobs older than max_age seconds.
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+            (*FINISHED_STATUSES, time.time() - max_age)
+        )
+        return cursor.rowcount
+
+    def run_one(self) -> bool:
+        """
+        Claim and run a single job.
+
+        Returns:
+            bool: True if a job was run, False if the queue was empty
+        """
+        job = self.claim()
+        if job is None:
+            return False
+
+        progress = ProgressReporter(lambda fraction, message: self.update_progress(job["id"], fraction, message))
+        # Spans recorded while the job runs are stored with it for the submitter
+        spans = new_session_spans()
+        token = bind_session(spans)
+        # Keep the job from being requeued while it runs, however long it takes
+        done = threading.Event()
+        threading.Thread(target=self._beat, args=(job["id"], done), name="job-heartbeat", daemon=True).start()
+        try:
+            result = JOB_HANDLERS[job["kind"]](job["payload"], progress)
+            self.finish(job["id"], result=result, timings=list(spans))
+        except Exception as e:
+            traceback.print_exc()
+            self.finish(job["id"], error=str(e) or e.__class__.__name__, timings=list(spans))
+        finally:
+            done.set()
+            unbind_session(token)
+        return True
+
+job_queue = JobQueue(os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH))
+
+class WorkerPool:
+    """Threads that run queued jobs until stopped."""
+
+    def __init__(self, queue: JobQueue, workers: int = 2, poll_interval: float = 0.5):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        self.queue.purge()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self.queue.notify()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self):
+        while not self._stop.is_set():
+            version = self.queue.version
+            try:
+                ran = self.queue.run_one()
+            except sqlite3.Error as e:
+                print(f"Job queue error: {e}")
+                ran = False
+            if not ran:
+                # Woken at once by jobs submitted in this process; jobs from
+                # other processes are picked up on the next poll
+                self.queue.wait_for_change(version, self.poll_interval)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def start_workers(workers: int = 2) -> WorkerPool:
+    """
+    Start an in-process worker pool for the shared queue, once per process.
+
+    Args:
+        workers (int): Number of worker threads
+
+    Returns:
+        WorkerPool: The running pool
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WorkerPool(job_queue, workers)
+            _pool.start()
+        return _pool
+
+def wait_for_job(job_id: str, poll_interval: float = 0.25, timeout: Optional[float] = None,
+                 on_progress: Optional[Callable[[float, str], None]] = None,
+                 queue_timeout: Optional[float] = None) -> Dict:
+    """
+    Poll a job until it finishes.
+
+    Args:
+        job_id (str): The job id
+        poll_interval (float): Seconds between polls
+        timeout (float, optional): Give up after this many seconds
+        on_progress (Callable, optional): Called as on_progress(progress, message) on each poll
+        queue_timeout (float, optional): Give up if no worker has claimed the job
+            after this many seconds
+
+    Returns:
+        Dict: The job as returned by JobQueue.get (possibly still queued or running on timeout)
+    """
+    start = time.monotonic()
+    deadline = None if timeout is None else start + timeout
+    while True:
+        version = job_queue.version
+        job = job_queue.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if on_progress:
+            on_progress(job["progress"], job["message"])
+        if job["status"] in FINISHED_STATUSES:
+            return job
+        if deadline is not None and time.monotonic() >= deadline:
+            return job
+        if queue_timeout is not None and job["status"] == QUEUED and time.monotonic() - start >= queue_timeout:
+            return job
+        # In-process workers wake the waiter as soon as the job progresses or finishes
+        job_queue.wait_for_change(version, poll_interval)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser("worker", help="Run queued jobs until interrupted")
+    worker.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    pool = WorkerPool(job_queue, args.workers)
+    pool.start()
+    print(f"Running {args.workers} job workers on {job_queue.path}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+if __name__ == "__main__":
+    main()
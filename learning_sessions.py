@@ -0,0 +1,559 @@
+"""
+Learning Sessions Module - Pins generated learning content in session state so
+that Streamlit reruns reuse it instead of generating it again.
+
+Every function takes the session state mapping explicitly (st.session_state in
+the app), so sessions can also be driven outside Streamlit.
+"""
+import hashlib
+from typing import Callable, Dict, List, MutableMapping, Optional
+
+from ai_tutor import (aexpand_learning_module, agenerate_explanation, agenerate_practice_problems, explain_answers,
+                      provide_batch_feedback, provide_feedback, stream_learning_path_outline, submit)
+from content_bank import get_explanation, iter_practice_problems, iter_quiz_questions
+from personalize.interactive_questions import grade_answer
+from personalize.solution_scoring import grade_solution, reference_text, score_solution
+
+# Start generating the next practice set when this many problems of the current one are unused
+PREFETCH_REMAINING = 1
+# Most recent problem statements (or quiz questions) a new set is asked to differ from
+EXCLUDE_LIMIT = 20
+
+def quiz_id(topic: str, num_questions: int, difficulty: str) -> str:
+    """
+    Build a stable id for a quiz configuration.
+
+    Args:
+        topic (str): The quiz topic
+        num_questions (int): Number of questions in the quiz
+        difficulty (str): The difficulty level
+
+    Returns:
+        str: Short id, safe to use in widget keys
+    """
+    raw = f"{' '.join(topic.split()).casefold()}|{num_questions}|{difficulty}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def get_quiz_session(state: MutableMapping, topic: str, num_questions: int = 5,
+                     difficulty: str = "intermediate", regenerate: bool = False,
+                     on_question: Optional[Callable[[int, Dict], None]] = None) -> Dict:
+    """
+    Get the quiz pinned for a configuration, generating its questions only once.
+
+    Failed generations are returned but not pinned, so the next rerun retries.
+
+    Args:
+        state (MutableMapping): Session state to store quizzes in
+        topic (str): The quiz topic
+        num_questions (int): Number of questions to generate
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        regenerate (bool): Replace the pinned questions with a new set that differs
+            from the questions shown so far
+        on_question (Callable, optional): Called as on_question(index, question) for
+            each newly generated question as soon as it is available
+
+    Returns:
+        Dict: Quiz session with id, questions, answers, feedback and completed flag
+    """
+    sessions = state.setdefault("quiz_sessions", {})
+    qid = quiz_id(topic, num_questions, difficulty)
+    previous = sessions.get(qid)
+
+    if previous is not None and not regenerate:
+        return previous
+
+    # A regenerated quiz asks for questions unlike the ones already shown, and
+    # gets a new id so that its widgets do not keep the old answers
+    round_number = previous["round"] + 1 if previous is not None else 0
+    seen = previous["seen"] if previous is not None else []
+
+    # Served from the pre-generated content bank when it covers the topic
+    questions = []
+    for question in iter_quiz_questions(topic, num_questions, difficulty, exclude=seen[-EXCLUDE_LIMIT:] or None):
+        if on_question and "error" not in question:
+            on_question(len(questions), question)
+        questions.append(question)
+    quiz = {
+        "id": f"{qid}-{round_number}" if round_number else qid,
+        "round": round_number,
+        "topic": topic,
+        "difficulty": difficulty,
+        "num_questions": num_questions,
+        "questions": questions,
+        "answers": {},
+        "feedback": {},
+        "feedback_cache": {},
+        "completed": False,
+        "seen": seen + [q["question"] for q in questions if "question" in q],
+    }
+
+    if questions and not any("error" in q for q in questions):
+        sessions[qid] = quiz
+    return quiz
+
+def get_quiz_feedback(quiz: Dict, index: int, user_answer: str) -> Dict:
+    """
+    Get feedback for an answer, reusing earlier feedback for the same answer.
+
+    Answers are graded locally; the LLM is only used when the correct answer
+    cannot be resolved locally or the question has no explanation.
+
+    Args:
+        quiz (Dict): Quiz session from get_quiz_session
+        index (int): Index of the question in the quiz
+        user_answer (str): The answer selected by the user
+
+    Returns:
+        Dict: Feedback on the user's answer
+    """
+    key = (index, user_answer)
+    feedback = quiz["feedback_cache"].get(key)
+    if feedback is None:
+        q = quiz["questions"][index]
+        feedback = grade_answer(q, user_answer)
+        if feedback is None:
+            feedback = provide_feedback(user_answer, q.get('correct_answer', ''), q['question'])
+        if "error" not in feedback:
+            quiz["feedback_cache"][key] = feedback
+
+    quiz["answers"][index] = user_answer
+    quiz["feedback"][index] = feedback
+    if feedback.get("graded_locally") and not feedback.get("correct_answer_explanation"):
+        explain_pending_feedback(quiz)
+    return feedback
+
+def explain_pending_feedback(quiz: Dict):
+    """
+    Fill in missing explanations for locally graded answers with one batched LLM call.
+
+    Args:
+        quiz (Dict): Quiz session from get_quiz_session
+    """
+    pending = [
+        (index, feedback) for index, feedback in quiz["feedback"].items()
+        if feedback.get("graded_locally") and not feedback.get("correct_answer_explanation")
+    ]
+    if not pending:
+        return
+
+    items = [
+        {
+            "question": quiz["questions"][index]['question'],
+            "correct_answer": quiz["questions"][index].get('correct_answer', ''),
+            "user_answer": quiz["answers"].get(index, ''),
+        }
+        for index, _ in pending
+    ]
+    for (_, feedback), explanation in zip(pending, explain_answers(items)):
+        feedback["correct_answer_explanation"] = explanation
+
+def complete_quiz(quiz: Dict) -> Dict:
+    """
+    Score a quiz and get detailed feedback for every answer in one batched request.
+
+    Results are memoized on the quiz for the current set of answers.
+
+    Args:
+        quiz (Dict): Quiz session from get_quiz_session
+
+    Returns:
+        Dict: Results with correct, total, percentage and per-question feedback
+    """
+    answers = quiz["answers"]
+    results_key = tuple(sorted(answers.items()))
+    results = quiz.get("results")
+    if results and results["key"] == results_key:
+        return results
+
+    indices = sorted(answers)
+    items = [
+        {
+            "question": quiz["questions"][i]['question'],
+            "correct_answer": quiz["questions"][i].get('correct_answer', ''),
+            "user_answer": answers[i],
+        }
+        for i in indices
+    ]
+    batch_feedback = provide_batch_feedback(items) if items else []
+
+    feedback = {}
+    for i, llm_feedback in zip(indices, batch_feedback):
+        local = grade_answer(quiz["questions"][i], answers[i])
+        merged = dict(llm_feedback)
+        if local is not None:
+            # Local grading is authoritative for correctness
+            merged["is_correct"] = local["is_correct"]
+            if not merged.get("correct_answer_explanation"):
+                merged["correct_answer_explanation"] = local["correct_answer_explanation"]
+        feedback[i] = merged
+
+    correct = sum(1 for f in feedback.values() if f.get('is_correct', False))
+    total = len(quiz["questions"])
+    results = {
+        "key": results_key,
+        "correct": correct,
+        "total": total,
+        "percentage": (correct / total) * 100 if total else 0.0,
+        "feedback": feedback,
+    }
+    if not any("error" in f for f in feedback.values()):
+        quiz["results"] = results
+    return results
+
+def reset_quiz_session(state: MutableMapping, quiz: Optional[Dict] = None):
+    """
+    Drop a pinned quiz, or all quizzes if none is given.
+
+    Args:
+        state (MutableMapping): Session state holding the quizzes
+        quiz (Dict, optional): The quiz session to drop
+    """
+    sessions = state.setdefault("quiz_sessions", {})
+    if quiz is None:
+        sessions.clear()
+    else:
+        sessions.pop(quiz_id(quiz["topic"], quiz["num_questions"], quiz["difficulty"]), None)
+
+def get_practice_session(state: MutableMapping, topic: str, num_problems: int = 3,
+                         difficulty: str = "intermediate",
+                         on_problem: Optional[Callable[[int, Dict], None]] = None) -> Dict:
+    """
+    Get the practice session pinned for a configuration, generating its first
+    set of problems only once.
+
+    Failed generations are returned but not pinned, so the next rerun retries.
+
+    Args:
+        state (MutableMapping): Session state to store practice sessions in
+        topic (str): The topic to practice
+        num_problems (int): Number of problems per set
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+        on_problem (Callable, optional): Called as on_problem(index, problem) for
+            each newly generated problem as soon as it is available
+
+    Returns:
+        Dict: Practice session with id, the current set's problems, its number,
+        the indices of used problems and every problem statement seen so far
+    """
+    sessions = state.setdefault("practice_sessions", {})
+    pid = quiz_id(topic, num_problems, difficulty)
+
+    if pid in sessions:
+        return sessions[pid]
+
+    # Served from the pre-generated content bank when it covers the topic
+    problems = []
+    for problem in iter_practice_problems(topic, num_problems, difficulty):
+        if on_problem and "error" not in problem:
+            on_problem(len(problems), problem)
+        problems.append(problem)
+    session = {
+        "id": pid,
+        "topic": topic,
+        "difficulty": difficulty,
+        "num_problems": num_problems,
+        "set_number": 0,
+        "problems": problems,
+        "used": set(),
+        # Problem index -> feedback on the last checked solution, and (index, solution) -> feedback
+        "feedback": {},
+        "feedback_cache": {},
+        "seen": [p["problem"] for p in problems if "problem" in p],
+        # Future resolving to the next set, once it has been started
+        "next_set": None,
+    }
+
+    if problems and not any("error" in p for p in problems):
+        sessions[pid] = session
+    return session
+
+def _prefetch_practice_set(session: Dict):
+    if session["next_set"] is None:
+        session["next_set"] = submit(agenerate_practice_problems(
+            session["topic"], session["num_problems"], session["difficulty"], exclude=session["seen"][-EXCLUDE_LIMIT:]
+        ))
+
+def mark_problem_used(session: Dict, index: int):
+    """
+    Record that the learner has worked through a problem.
+
+    When only PREFETCH_REMAINING problems of the set are left unused, the next
+    set starts generating in the background.
+
+    Args:
+        session (Dict): Practice session from get_practice_session
+        index (int): Index of the problem in the current set
+    """
+    session["used"].add(index)
+    if len(session["problems"]) - len(session["used"]) <= PREFETCH_REMAINING:
+        _prefetch_practice_set(session)
+
+def next_practice_set(session: Dict) -> Dict:
+    """
+    Replace the current problems with the next set.
+
+    The prefetched set is used when there is one; otherwise the set is generated
+    now. Problems that were already seen are left out. On failure the current
+    set is kept.
+
+    Args:
+        session (Dict): Practice session from get_practice_session
+
+    Returns:
+        Dict: The session, or an error
+    """
+    _prefetch_practice_set(session)
+    future, session["next_set"] = session["next_set"], None
+    try:
+        problems = future.result()
+    except Exception as e:
+        problems = [{"error": f"Error generating practice problems: {str(e)}"}]
+    if any("error" in p for p in problems):
+        return problems[0]
+
+    seen = set(session["seen"])
+    problems = [p for p in problems if p["problem"] not in seen] or problems
+    session["problems"] = problems
+    session["set_number"] += 1
+    session["used"] = set()
+    session["feedback"] = {}
+    session["feedback_cache"] = {}
+    session["seen"].extend(p["problem"] for p in problems)
+    return session
+
+def grade_practice_solutions(session: Dict, solutions: Dict[int, str]) -> Dict[int, Dict]:
+    """
+    Grade free-text solutions, reusing earlier feedback for the same solution.
+
+    Solutions are scored locally first; only the ambiguous ones are sent to
+    the LLM, together in one batched request. Graded problems count as used.
+
+    Args:
+        session (Dict): Practice session from get_practice_session
+        solutions (Dict[int, str]): Solution text by problem index
+
+    Returns:
+        Dict[int, Dict]: Feedback by problem index, shaped like ai_tutor.provide_feedback
+        with the local score added
+    """
+    # Local scores of the ambiguous solutions, by problem index
+    results, ambiguous = {}, {}
+    for index, solution in solutions.items():
+        key = (index, solution)
+        feedback = session["feedback_cache"].get(key)
+        if feedback is None:
+            scored = score_solution(session["problems"][index], solution)
+            feedback = grade_solution(session["problems"][index], solution, scored)
+            if feedback is None:
+                ambiguous[index] = scored
+                continue
+        results[index] = feedback
+
+    if ambiguous:
+        items = [
+            {
+                "question": session["problems"][index]["problem"],
+                "correct_answer": reference_text(session["problems"][index]),
+                "user_answer": solutions[index],
+            }
+            for index in ambiguous
+        ]
+        for index, feedback in zip(ambiguous, provide_batch_feedback(items)):
+            results[index] = dict(feedback, score=ambiguous[index]["score"])
+
+    for index, feedback in results.items():
+        if "error" not in feedback:
+            session["feedback_cache"][(index, solutions[index])] = feedback
+        session["feedback"][index] = feedback
+        mark_problem_used(session, index)
+    return results
+
+def learning_path_id(topic: str, user_knowledge: str, learning_goals: str) -> str:
+    """
+    Build a stable id for a learning path request.
+
+    Args:
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+
+    Returns:
+        str: Short id, safe to use in widget keys
+    """
+    raw = "|".join(" ".join(part.split()).casefold() for part in (topic, user_knowledge, learning_goals))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def get_learning_path_session(state: MutableMapping, topic: str, user_knowledge: str, learning_goals: str,
+                              regenerate: bool = False,
+                              on_update: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Get the learning path pinned for a request, generating it only once.
+
+    Only the outline is generated here; modules are detailed on demand with
+    expand_modules and get_module. Failed generations are returned but not
+    pinned, so the next rerun retries.
+
+    Args:
+        state (MutableMapping): Session state to store learning paths in
+        topic (str): The topic to learn about
+        user_knowledge (str): Description of the user's current knowledge
+        learning_goals (str): The user's learning goals
+        regenerate (bool): Replace the pinned path with a new one
+        on_update (Callable, optional): Called with the partial outline each time
+            another module title has been generated
+
+    Returns:
+        Dict: Learning path session with id, the request, path, current_module,
+        module_started and the module details and explanations started for it
+    """
+    sessions = state.setdefault("learning_path_sessions", {})
+    pid = learning_path_id(topic, user_knowledge, learning_goals)
+
+    if pid in sessions and not regenerate:
+        return sessions[pid]
+
+    path = {}
+    for path in stream_learning_path_outline(topic, user_knowledge, learning_goals):
+        if on_update and "error" not in path:
+            on_update(path)
+    session = {
+        "id": pid,
+        "topic": topic,
+        "user_knowledge": user_knowledge,
+        "learning_goals": learning_goals,
+        "path": path,
+        "current_module": 0,
+        "module_started": False,
+        # Module index -> Future resolving to the detailed module
+        "module_details": {},
+        # (concept, difficulty) -> Future resolving to the explanation text
+        "explanations": {},
+    }
+
+    if path.get("modules") and "error" not in path:
+        sessions[pid] = session
+    return session
+
+def expand_modules(session: Dict, indices: List[int]):
+    """
+    Start detailing modules of the outline in the background, concurrently.
+
+    Modules that are already detailed or in progress are skipped.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+        indices (List[int]): Indices of the modules to detail
+    """
+    modules = session["path"].get("modules", [])
+    for index in indices:
+        if 0 <= index < len(modules) and not module_ready(session, index) and index not in session["module_details"]:
+            session["module_details"][index] = submit(aexpand_learning_module(
+                session["topic"], session["user_knowledge"], session["learning_goals"], session["path"], index
+            ))
+
+def module_ready(session: Dict, index: int) -> bool:
+    """Check whether a module has been detailed."""
+    return "key_concepts" in session["path"]["modules"][index]
+
+def module_requested(session: Dict, index: int) -> bool:
+    """Check whether a module has been detailed or is being detailed."""
+    return module_ready(session, index) or index in session["module_details"]
+
+def get_module(session: Dict, index: int) -> Dict:
+    """
+    Get a detailed module, waiting only for this module's request.
+
+    Failed details are not kept, so the next call retries.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+        index (int): Index of the module in the path
+
+    Returns:
+        Dict: The module with its details, or with an error
+    """
+    if module_ready(session, index):
+        return session["path"]["modules"][index]
+    expand_modules(session, [index])
+    future = session["module_details"].pop(index)
+    try:
+        module = future.result()
+    except Exception as e:
+        module = dict(session["path"]["modules"][index], error=f"Error generating module details: {str(e)}")
+    if "error" not in module:
+        session["path"]["modules"][index] = module
+    return module
+
+async def _aconcept_explanation(topic: str, concept: str, difficulty: str) -> str:
+    return get_explanation(topic, concept, difficulty) or await agenerate_explanation(topic, concept, difficulty)
+
+def prefetch_explanations(session: Dict, module_index: int, difficulty: str = "intermediate"):
+    """
+    Start generating the explanations for every key concept of a module in the
+    background. The requests run concurrently on the tutor's event loop; call
+    get_concept_explanation to wait for one of them.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+        module_index (int): Index of the module in the path
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+    """
+    modules = session["path"].get("modules", [])
+    if not 0 <= module_index < len(modules):
+        return
+    for concept in get_module(session, module_index).get("key_concepts", []):
+        key = (str(concept), difficulty)
+        if key not in session["explanations"]:
+            session["explanations"][key] = submit(_aconcept_explanation(session["topic"], str(concept), difficulty))
+
+def get_concept_explanation(session: Dict, concept: str, difficulty: str = "intermediate") -> str:
+    """
+    Get a concept's explanation, waiting only for this concept's request.
+
+    Failed explanations are not kept, so the next call retries.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+        concept (str): The concept to explain
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+
+    Returns:
+        str: The explanation, or an error message
+    """
+    key = (concept, difficulty)
+    future = session["explanations"].get(key)
+    if future is None:
+        future = session["explanations"][key] = submit(_aconcept_explanation(session["topic"], concept, difficulty))
+    try:
+        explanation = future.result()
+    except Exception as e:
+        explanation = f"Error generating explanation: {str(e)}"
+    if explanation.startswith("Error generating explanation"):
+        session["explanations"].pop(key, None)
+    return explanation
+
+def start_module(session: Dict, module_index: int, difficulty: str = "intermediate"):
+    """
+    Mark a module as started and begin explaining its concepts in the background.
+
+    Waits for the module's details if they have not been generated yet.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+        module_index (int): Index of the module in the path
+        difficulty (str): The difficulty level (beginner, intermediate, advanced)
+    """
+    session["current_module"] = module_index
+    session["module_started"] = True
+    prefetch_explanations(session, module_index, difficulty)
+
+def complete_module(session: Dict):
+    """
+    Finish the current module and move on to the next one.
+
+    Args:
+        session (Dict): Learning path session from get_learning_path_session
+    """
+    session["module_started"] = False
+    session["current_module"] = min(session["current_module"] + 1,
+                                    max(len(session["path"].get("modules", [])) - 1, 0))
@@ -0,0 +1,4 @@
+"""
+LLM infrastructure for Enhanced AI Learning Tutor
+Contains caching and request helpers shared by the AI tutor functions
+"""
@@ -0,0 +1,332 @@
+"""
+Content-addressed cache for chat completions.
+
+Completions are keyed on a hash of the full request (model, messages and
+sampling parameters). Concurrent identical requests are deduplicated so that
+only one of them reaches the API while the others wait for its result.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Optional
+
+from telemetry import record_cache, span
+
+class MemoryBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    # Calls only take an in-process lock, so they can run on an event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskBackend:
+    """SQLite store shared between processes, evicting least recently used entries."""
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS completion_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_completion_cache_accessed ON completion_cache (accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM completion_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM completion_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE completion_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def set(self, key: str, value: str, ttl: float):
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO completion_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            conn.execute(
+                "DELETE FROM completion_cache WHERE rowid IN ("
+                "SELECT rowid FROM completion_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connect().execute("DELETE FROM completion_cache")
+
+class CompletionCache:
+    """
+    Completion cache with in-flight request deduplication.
+
+    Any object with get(key), set(key, value, ttl) and clear() can be used
+    as the storage backend. Unless the backend sets `blocking = False`, the
+    async methods call it on a worker thread so that disk I/O does not stall
+    the event loop.
+    """
+
+    def __init__(self, backend, ttl: float = 24 * 3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(params: Dict) -> str:
+        """
+        Build the cache key for a completion request.
+
+        Args:
+            params (Dict): Keyword arguments of the chat completion request
+
+        Returns:
+            str: SHA-256 hex digest of the canonical JSON form of the request
+        """
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        try:
+            with span("cache", "completion") as current:
+                value = self.backend.get(key)
+                current.set(hit=value is not None)
+                return value
+        except sqlite3.Error as e:
+            print(f"Completion cache unavailable: {e}")
+            return None
+
+    async def _alookup(self, key: str) -> Optional[str]:
+        if getattr(self.backend, "blocking", True):
+            return await asyncio.to_thread(self._lookup, key)
+        return self._lookup(key)
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        record_cache("completion", hit)
+
+    def _store(self, key: str, value: str):
+        try:
+            self.backend.set(key, value, self.ttl)
+        except sqlite3.Error as e:
+            print(f"Error writing completion cache: {e}")
+
+    async def _astore(self, key: str, value: str):
+        if getattr(self.backend, "blocking", True):
+            await asyncio.to_thread(self._store, key, value)
+        else:
+            self._store(key, value)
+
+    def lookup(self, params: Dict) -> Optional[str]:
+        """
+        Look up a cached completion without creating it on a miss.
+
+        Args:
+            params (Dict): Keyword arguments of the chat completion request
+
+        Returns:
+            Optional[str]: The cached completion text, or None
+        """
+        value = self._lookup(self.make_key(params))
+        self._count(value is not None)
+        return value
+
+    def store(self, params: Dict, value: str):
+        """
+        Store a completion that was produced outside get_or_create, e.g. by streaming.
+
+        Args:
+            params (Dict): Keyword arguments of the chat completion request
+            value (str): The completion text
+        """
+        self._store(self.make_key(params), value)
+
+    async def alookup(self, params: Dict) -> Optional[str]:
+        """Async version of lookup."""
+        value = await self._alookup(self.make_key(params))
+        self._count(value is not None)
+        return value
+
+    async def astore(self, params: Dict, value: str):
+        """Async version of store."""
+        await self._astore(self.make_key(params), value)
+
+    def get_or_create(self, params: Dict, create: Callable[[], str],
+                      should_store: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Return the cached completion for a request, calling the API on a miss.
+
+        If an identical request is already in flight, wait for its result
+        instead of sending another one. Errors are not cached.
+
+        Args:
+            params (Dict): Keyword arguments of the chat completion request
+            create (Callable): Function that performs the request and returns the completion text
+            should_store (Callable, optional): Called after create; the completion is
+                only cached if it returns True (e.g. not for truncated replies)
+
+        Returns:
+            str: The completion text
+        """
+        key = self.make_key(params)
+        value = self._lookup(key)
+        if value is not None:
+            self._count(True)
+            return value
+
+        future, owner = self._claim(key)
+        if not owner:
+            self.deduplicated += 1
+            return future.result()
+
+        try:
+            # Another caller may have stored the result between the lookup and
+            # taking ownership of the request
+            value = self._lookup(key)
+            self._count(value is not None)
+            if value is None:
+                value = create()
+                if should_store is None or should_store():
+                    self._store(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    async def aget_or_create(self, params: Dict, create: Callable[[], Awaitable[str]],
+                             should_store: Optional[Callable[[], bool]] = None) -> str:
+        """
+        Async version of get_or_create, taking a coroutine function as create.
+
+        Sync and async callers share the same in-flight requests.
+        """
+        key = self.make_key(params)
+        value = await self._alookup(key)
+        if value is not None:
+            self._count(True)
+            return value
+
+        future, owner = self._claim(key)
+        if not owner:
+            self.deduplicated += 1
+            return await asyncio.wrap_future(future)
+
+        try:
+            value = await self._alookup(key)
+            self._count(value is not None)
+            if value is None:
+                value = await create()
+                if should_store is None or should_store():
+                    await self._astore(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._release(key)
+
+    def _claim(self, key: str):
+        # Returns the in-flight future for the key and whether the caller owns it
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _release(self, key: str):
+        with self._lock:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict[str, int]: Hits, misses and deduplicated in-flight requests
+        """
+        return {"hits": self.hits, "misses": self.misses, "deduplicated": self.deduplicated}
+
+    def clear(self):
+        """Remove all cached completions."""
+        self.backend.clear()
+
+def _backend_from_env():
+    max_entries = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+    if os.getenv("LLM_CACHE_BACKEND", "memory") == "disk":
+        return DiskBackend(os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "completions.sqlite3")), max_entries)
+    return MemoryBackend(max_entries)
+
+completion_cache = CompletionCache(_backend_from_env(), ttl=float(os.getenv("LLM_CACHE_TTL", str(24 * 3600))))
@@ -0,0 +1,205 @@
+"""
+Lenient and incremental JSON parsing for structured LLM output.
+
+parse_json recovers as much as possible from output that was cut off by
+max_tokens or wrapped in a code fence. JSONItemStream scans a completion as
+it streams and returns each element of a chosen array (e.g. "questions") as
+soon as its object closes.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_CLOSERS = {"{": "}", "[": "]"}
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+def _strip_wrapping(text: str) -> str:
+    text = _FENCE.sub("", text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    return text[min(starts):] if starts else text
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Parse JSON that may be truncated, keeping every complete value.
+
+    An unterminated string value is closed, an incomplete trailing key or
+    literal is dropped, and all open objects and arrays are closed.
+
+    Args:
+        text (str): The (possibly truncated) JSON text
+
+    Returns:
+        The parsed value, or None if nothing could be recovered
+    """
+    text = _strip_wrapping(text)
+    stack: List[str] = []
+    expect_key: List[bool] = []
+    in_string = escape = string_is_key = False
+    # Last position where the text can be cut and closed, with the open containers there
+    safe_end, safe_stack = 0, []
+    end = len(text)
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                if not string_is_key:
+                    safe_end, safe_stack = i + 1, list(stack)
+            continue
+
+        if char == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key[-1]
+        elif char in "{[":
+            stack.append(char)
+            expect_key.append(char == "{")
+            safe_end, safe_stack = i + 1, list(stack)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+                expect_key.pop()
+                safe_end, safe_stack = i + 1, list(stack)
+            if not stack:
+                # Ignore anything after the top-level value
+                end = i + 1
+                break
+        elif char == ",":
+            safe_end, safe_stack = i, list(stack)
+            if stack and stack[-1] == "{":
+                expect_key[-1] = True
+        elif char == ":" and stack and stack[-1] == "{":
+            expect_key[-1] = False
+
+    text = text[:end]
+    closers = "".join(_CLOSERS[c] for c in reversed(stack))
+    candidates = [text + closers]
+    if in_string and not string_is_key:
+        candidates.append(text + '"' + closers)
+    candidates.append(text[:safe_end] + "".join(_CLOSERS[c] for c in reversed(safe_stack)))
+
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+def parse_json(text: str) -> Any:
+    """
+    Parse a JSON completion, repairing it if it is truncated or wrapped.
+
+    Args:
+        text (str): The completion text
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: If no JSON could be recovered from the text
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        value = repair_json(text)
+        if value is None:
+            raise ValueError(f"Could not parse JSON from completion: {text[:100]!r}")
+        return value
+
+class JSONItemStream:
+    """
+    Incremental scanner that extracts the elements of one array from a JSON
+    document while it is still being streamed.
+
+    The array is the one stored under `key` (at any depth), or the top-level
+    array if the document is a bare array.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.text = ""
+        self.emitted = 0
+        self._pos = 0
+        # One frame per open container: [type, key it is stored under, expecting a key, last key]
+        self._frames: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._item_start: Optional[int] = None
+
+    def _in_target(self) -> bool:
+        if not self._frames or self._frames[-1][0] != "[":
+            return False
+        return self._frames[-1][1] == self.key or len(self._frames) == 1
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """
+        Add streamed text and return the items completed by it.
+
+        Args:
+            chunk (str): The next piece of the completion
+
+        Returns:
+            List[Dict]: Items whose objects closed in this chunk
+        """
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    frame = self._frames[-1] if self._frames else None
+                    if frame and frame[0] == "{" and frame[2]:
+                        try:
+                            frame[3] = json.loads(text[self._string_start:i + 1])
+                        except json.JSONDecodeError:
+                            frame[3] = None
+                        frame[2] = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if char == "{" and self._in_target():
+                    self._item_start = i
+                parent = self._frames[-1] if self._frames else None
+                key = parent[3] if parent and parent[0] == "{" else None
+                self._frames.append([char, key, char == "{", None])
+            elif char in "}]":
+                if not self._frames:
+                    continue
+                self._frames.pop()
+                if char == "}" and self._item_start is not None and self._in_target():
+                    try:
+                        items.append(json.loads(text[self._item_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._item_start = None
+            elif char == "," and self._frames and self._frames[-1][0] == "{":
+                self._frames[-1][2] = True
+
+        self._pos = len(text)
+        self.emitted += len(items)
+        return items
+
+    def close(self) -> Any:
+        """
+        Parse the whole streamed document, repairing it if it was truncated.
+
+        Returns:
+            The parsed document, or None if nothing could be recovered
+        """
+        try:
+            return parse_json(self.text)
+        except ValueError:
+            return None
@@ -0,0 +1,297 @@
+"""
+Prompt templates for the AI tutor.
+
+Templates are compiled once at import: padding whitespace is stripped and the
+variable slots are pre-parsed, so rendering is a single join. Each template
+puts its static part (role, instructions and output format) first, in a
+system message that is shared by every request, and only the request-specific
+values in the user message. That keeps the static prefix byte-identical across
+calls, which is what provider-side prompt caching matches on.
+"""
+import re
+import string
+import threading
+from typing import Dict, List, Tuple
+
+from telemetry import metrics
+
+metrics.describe("tutor_prompt_tokens_total", "counter", "Estimated rendered prompt tokens by template and part.")
+
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+def compact(text: str) -> str:
+    """
+    Strip indentation, trailing spaces and runs of blank lines from prompt text.
+
+    Args:
+        text (str): The prompt text as written in the source
+
+    Returns:
+        str: The compacted text
+    """
+    lines = [line.strip() for line in text.strip().splitlines()]
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines))
+
+def count_tokens(text: str) -> int:
+    # Rough token estimate (about four characters per token for English text)
+    return len(text) // 4 + 1
+
+class PromptTemplate:
+    """
+    A compiled prompt: a static system message and a user message template.
+
+    The user template uses str.format fields, e.g. "Topic: {topic}".
+    """
+
+    def __init__(self, name: str, system: str, request: str):
+        self.name = name
+        self.system_message = {"role": "system", "content": compact(system)}
+        self.static_tokens = count_tokens(self.system_message["content"])
+        # Pre-parse the user template into literal text and field names
+        self._parts: List[Tuple[str, str]] = [
+            (literal, field or "") for literal, field, _, _ in string.Formatter().parse(compact(request))
+        ]
+        self.fields = [field for _, field in self._parts if field]
+        self.renders = 0
+        self.dynamic_tokens = 0
+        self._lock = threading.Lock()
+
+    def render(self, **values) -> List[Dict[str, str]]:
+        """
+        Render the chat messages for a request.
+
+        Args:
+            **values: A value for every field of the user template
+
+        Returns:
+            List[Dict[str, str]]: The shared system message followed by the user message
+        """
+        content = "".join(literal + (str(values[field]) if field else "") for literal, field in self._parts).strip()
+        tokens = count_tokens(content)
+        with self._lock:
+            self.renders += 1
+            self.dynamic_tokens += tokens
+        metrics.inc("tutor_prompt_tokens_total", self.static_tokens, template=self.name, part="static")
+        metrics.inc("tutor_prompt_tokens_total", tokens, template=self.name, part="dynamic")
+        return [self.system_message, {"role": "user", "content": content}]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "renders": self.renders,
+                "static_tokens": self.static_tokens,
+                "avg_dynamic_tokens": round(self.dynamic_tokens / self.renders, 1) if self.renders else 0.0,
+            }
+
+PROMPTS: Dict[str, PromptTemplate] = {}
+
+def register_prompt(name: str, system: str, request: str) -> PromptTemplate:
+    """
+    Compile a template and add it to the registry.
+
+    Args:
+        name (str): The template name
+        system (str): Static role, instructions and output format
+        request (str): The user message template with str.format fields
+
+    Returns:
+        PromptTemplate: The compiled template
+    """
+    template = PromptTemplate(name, system, request)
+    PROMPTS[name] = template
+    return template
+
+def render_prompt(name: str, **values) -> List[Dict[str, str]]:
+    """Render the messages of a registered template."""
+    return PROMPTS[name].render(**values)
+
+def prompt_stats() -> Dict[str, Dict]:
+    """
+    Get token counts for every registered template.
+
+    Returns:
+        Dict[str, Dict]: Renders, static prefix tokens and average per-request tokens by template
+    """
+    return {name: template.stats() for name, template in PROMPTS.items()}
+
+register_prompt("explanation", system="""
+    You are an expert tutor with deep knowledge across many subjects.
+
+    Explain the given concept within the given topic at the given level.
+    Include:
+    1. A clear definition
+    2. Key components or principles
+    3. Examples or analogies
+    4. Common misconceptions
+    5. How it relates to the broader topic
+
+    Format the explanation in a clear, structured way that's easy to understand.
+""", request="""
+    Concept: {concept}
+    Topic: {topic}
+    Level: {difficulty}
+""")
+
+register_prompt("quiz", system="""
+    You are an expert quiz creator with deep knowledge across many subjects.
+
+    Generate quiz questions about the given topic at the given difficulty level.
+    For each question, provide:
+    1. The question text
+    2. 4 multiple choice options (A, B, C, D)
+    3. The correct answer (A, B, C, or D)
+    4. A brief explanation of why the answer is correct
+
+    Format the response as a JSON object with the following structure:
+    {"questions": [{"question": "Question text", "options": ["Option A", "Option B", "Option C", "Option D"], "correct_answer": "A", "explanation": "Explanation of the correct answer"}, ...]}
+""", request="""
+    Topic: {topic}
+    Difficulty: {difficulty}
+    Number of questions: {num_questions}
+    {avoid}
+""")
+
+register_prompt("practice", system="""
+    You are an expert problem creator with deep knowledge across many subjects.
+
+    Generate practice problems about the given topic at the given difficulty level.
+    For each problem, provide:
+    1. The problem statement
+    2. A step-by-step solution
+    3. The final answer
+    4. Key concepts tested by this problem
+
+    Format the response as a JSON object with the following structure:
+    {"problems": [{"problem": "Problem statement", "solution_steps": ["Step 1", "Step 2", ...], "answer": "Final answer", "key_concepts": ["Concept 1", "Concept 2", ...]}, ...]}
+""", request="""
+    Topic: {topic}
+    Difficulty: {difficulty}
+    Number of problems: {num_problems}
+    {avoid}
+""")
+
+register_prompt("feedback", system="""
+    You are an expert tutor providing constructive feedback.
+
+    Provide detailed feedback on the user's answer to the question. Include:
+    1. Whether the answer is correct, partially correct, or incorrect
+    2. Specific feedback on what was good about their answer
+    3. Specific feedback on what could be improved
+    4. A brief explanation of the correct answer
+    5. Suggestions for further study
+
+    Format the response as a JSON object with the following structure:
+    {"is_correct": true/false, "feedback": "Detailed feedback text", "improvement_suggestions": "Suggestions for improvement", "correct_answer_explanation": "Explanation of the correct answer", "further_study": "Suggestions for further study"}
+""", request="""
+    Question: {question}
+    Correct Answer: {correct_answer}
+    User's Answer: {user_answer}
+""")
+
+register_prompt("explain_answers", system="""
+    You are an expert tutor providing constructive feedback.
+
+    For each of the numbered questions, briefly explain why the correct answer is correct
+    and, if the user's answer differs, why the user's answer is wrong.
+
+    Format the response as a JSON object with the following structure, with one explanation
+    per question in the same order:
+    {"explanations": ["Explanation for question 1", "Explanation for question 2", ...]}
+""", request="""
+    {numbered}
+""")
+
+register_prompt("batch_feedback", system="""
+    You are an expert tutor providing constructive feedback.
+
+    Provide feedback on the user's answers to the numbered quiz questions.
+    For each question, include:
+    1. Whether the answer is correct
+    2. Short feedback on the user's answer
+    3. A brief explanation of the correct answer
+    4. Suggestions for further study
+
+    Format the response as a JSON object with the following structure, with one entry
+    per question in the same order:
+    {"feedback": [{"number": 1, "is_correct": true/false, "feedback": "Feedback text", "correct_answer_explanation": "Explanation of the correct answer", "further_study": "Suggestions for further study"}, ...]}
+""", request="""
+    {numbered}
+""")
+
+register_prompt("learning_path_outline", system="""
+    You are an expert curriculum designer with deep knowledge across many subjects.
+
+    Outline a personalized learning path that will help the user achieve their learning goals.
+    Keep it short: list the modules to cover in order, each with a one-sentence summary
+    and an estimated time to complete, then milestones to track progress and assessment methods.
+    Do not list concepts or resources; each module is detailed separately later.
+
+    Format the response as a JSON object with the following structure:
+    {"overview": "Brief overview of the learning path", "modules": [{"title": "Module title", "summary": "One-sentence summary", "estimated_time": "Estimated time to complete"}, ...], "milestones": ["Milestone 1", "Milestone 2", ...], "assessment_methods": ["Method 1", "Method 2", ...]}
+""", request="""
+    Topic: {topic}
+    User's Current Knowledge: {user_knowledge}
+    Learning Goals: {learning_goals}
+""")
+
+register_prompt("learning_module", system="""
+    You are an expert curriculum designer with deep knowledge across many subjects.
+
+    Detail one module of a personalized learning path. The full outline is given for context;
+    cover only the requested module and do not repeat material from the other modules.
+    Include:
+    - Key concepts to learn
+    - Learning resources (articles, videos, exercises)
+    - Estimated time to complete
+    - Prerequisites (if any)
+
+    Format the response as a JSON object with the following structure:
+    {"key_concepts": ["Concept 1", "Concept 2", ...], "resources": ["Resource 1", "Resource 2", ...], "estimated_time": "Estimated time to complete", "prerequisites": ["Prerequisite 1", "Prerequisite 2", ...]}
+""", request="""
+    Topic: {topic}
+    User's Current Knowledge: {user_knowledge}
+    Learning Goals: {learning_goals}
+    Outline:
+    {outline}
+
+    Module to detail: {number}. {title}
+""")
+
+register_prompt("answer", system="""
+    You are a helpful and knowledgeable tutor.
+
+    Provide a clear, accurate, and helpful answer to the user's question.
+    If the question is unclear, ask for clarification.
+    If you don't know the answer, be honest about it.
+""", request="""
+    User Question: {question}
+    {context}
+""")
+
+register_prompt("classify_feedback", system="""
+    You are an expert curriculum designer with deep knowledge across many subjects.
+
+    A learner left feedback on their personalized learning report. Decide which of
+    the listed report sections the feedback asks to change. Use the section names
+    exactly as given.
+
+    Format the response as a JSON object with the following structure:
+    {"sections": ["section_name", ...]}
+""", request="""
+    Report sections: {section_names}
+    Feedback: "{feedback}"
+""")
+
+register_prompt("rewrite_section", system="""
+    You are an expert tutor with deep knowledge across many subjects.
+
+    You will be given one Markdown section of a personalized learning report and
+    the learner's feedback. Rewrite the section to address the feedback.
+    Keep the first heading line exactly as it is, including any HTML anchor.
+    Return only the rewritten Markdown section.
+""", request="""
+    Topic: {topic}
+    Feedback: "{feedback}"
+
+    {section_markdown}
+""")
@@ -0,0 +1,257 @@
+"""
+Model routing and token budgets for chat completions.
+
+Each AI tutor task is routed to a model tier by task type and prompt size.
+Per-user and global token budgets are enforced before a request reaches the
+API, and requests are downgraded to a cheaper tier when the upstream is
+saturated or the global budget is running low.
+"""
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Model tiers from most to least capable
+TIER_ORDER = ["flagship", "standard", "economy"]
+
+MODEL_TIERS: Dict[str, Dict] = {
+    "flagship": {"model": os.getenv("LLM_MODEL_FLAGSHIP", "gpt-4"), "context_window": 8192},
+    "standard": {"model": os.getenv("LLM_MODEL_STANDARD", "gpt-4o"), "context_window": 128000},
+    "economy": {"model": os.getenv("LLM_MODEL_ECONOMY", "gpt-4o-mini"), "context_window": 128000},
+}
+
+# Task routes: the preferred tier, an optional cheaper tier for short prompts,
+# and the lowest tier the task may be downgraded to under load
+TASK_ROUTES: Dict[str, Dict] = {
+    "explanation": {"tier": "flagship", "min_tier": "standard"},
+    "quiz": {"tier": "flagship", "min_tier": "standard"},
+    "practice": {"tier": "flagship", "min_tier": "standard"},
+    "learning_path_outline": {"tier": "standard", "min_tier": "economy"},
+    "learning_module": {"tier": "flagship", "min_tier": "standard"},
+    "answer": {"tier": "flagship", "small_tier": "standard", "small_prompt_tokens": 150, "min_tier": "economy"},
+    "rewrite_section": {"tier": "standard", "min_tier": "economy"},
+    "feedback": {"tier": "economy"},
+    "batch_feedback": {"tier": "economy"},
+    "explain_answers": {"tier": "economy"},
+    "classify_feedback": {"tier": "economy"},
+}
+DEFAULT_ROUTE = {"tier": "flagship", "min_tier": "standard"}
+
+# Downgrade one tier when the global budget has less than this fraction left
+LOW_BUDGET_FRACTION = 0.2
+# Smallest completion worth sending when a budget forces max_tokens down
+MIN_COMPLETION_TOKENS = 64
+
+class BudgetExceededError(Exception):
+    """Raised when a request does not fit the user's or the global token budget."""
+
+_current_user: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("llm_user", default=None)
+
+def set_user(user_id: Optional[str]) -> contextvars.Token:
+    """
+    Attribute the LLM requests made in this context to a user.
+
+    Args:
+        user_id (str, optional): The user or session id, or None for anonymous use
+
+    Returns:
+        contextvars.Token: Token for restoring the previous user
+    """
+    return _current_user.set(user_id)
+
+def current_user() -> Optional[str]:
+    return _current_user.get()
+
+def estimate_tokens(messages: List[Dict]) -> int:
+    # Rough token estimate (about four characters per token for English text)
+    return sum(len(message.get("content") or "") for message in messages) // 4 + 4 * len(messages)
+
+class TokenBudget:
+    """Token allowance that resets every window; a limit of 0 means unlimited."""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self.used = 0
+        self.window_start = time.time()
+
+    def _roll(self):
+        now = time.time()
+        if now - self.window_start >= self.window:
+            self.used = 0
+            self.window_start = now
+
+    def remaining(self) -> Optional[int]:
+        if not self.limit:
+            return None
+        self._roll()
+        return max(self.limit - self.used, 0)
+
+    def charge(self, tokens: int):
+        self._roll()
+        self.used = max(self.used + tokens, 0)
+
+class ModelRouter:
+    """
+    Chooses the model for each request and enforces token budgets.
+
+    Budgets are reserved for the worst case (prompt plus max_tokens) when a
+    request is sent and settled against the reported usage when it finishes,
+    so concurrent requests cannot overshoot a budget.
+    """
+
+    def __init__(self, user_budget: int = 0, global_budget: int = 0, window: float = 3600.0,
+                 max_load: int = 8, max_users: int = 10000):
+        self.user_budget = user_budget
+        self.window = window
+        self.max_load = max_load
+        self.max_users = max_users
+        self.global_budget = TokenBudget(global_budget, window)
+        self.in_flight = 0
+        self.downgrades = 0
+        self.rejected = 0
+        self._users: "OrderedDict[str, TokenBudget]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _user_budget(self, user_id: Optional[str]) -> Optional[TokenBudget]:
+        # Called with the lock held
+        if not self.user_budget or user_id is None:
+            return None
+        budget = self._users.get(user_id)
+        if budget is None:
+            budget = self._users[user_id] = TokenBudget(self.user_budget, self.window)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return budget
+
+    def select(self, task: str, params: Dict) -> Tuple[Dict, str]:
+        """
+        Pick the model for a request.
+
+        Args:
+            task (str): The task type, a key of TASK_ROUTES
+            params (Dict): Chat completion parameters without a model
+
+        Returns:
+            Tuple[Dict, str]: The parameters with the model set, and the chosen tier
+        """
+        route = TASK_ROUTES.get(task, DEFAULT_ROUTE)
+        prompt_tokens = estimate_tokens(params["messages"])
+        tier = route["tier"]
+        if "small_tier" in route and prompt_tokens <= route["small_prompt_tokens"]:
+            tier = route["small_tier"]
+
+        # Degrade gracefully when requests would queue or the budget is nearly spent
+        with self._lock:
+            remaining = self.global_budget.remaining()
+            pressured = (self.in_flight >= self.max_load or
+                         (remaining is not None and remaining < self.global_budget.limit * LOW_BUDGET_FRACTION))
+        floor = TIER_ORDER.index(route.get("min_tier", tier))
+        if pressured and TIER_ORDER.index(tier) < floor:
+            tier = TIER_ORDER[TIER_ORDER.index(tier) + 1]
+            with self._lock:
+                self.downgrades += 1
+
+        # Move to a tier whose context window fits the request, nearest first
+        needed = prompt_tokens + params.get("max_tokens", 0)
+        if needed > MODEL_TIERS[tier]["context_window"]:
+            position = TIER_ORDER.index(tier)
+            candidates = sorted(TIER_ORDER, key=lambda name: abs(TIER_ORDER.index(name) - position))
+            tier = next((name for name in candidates if needed <= MODEL_TIERS[name]["context_window"]), tier)
+
+        return dict(params, model=MODEL_TIERS[tier]["model"]), tier
+
+    def reserve(self, params: Dict) -> Tuple[Dict, int]:
+        """
+        Reserve budget for a request that is about to be sent.
+
+        If a budget cannot cover max_tokens, max_tokens is lowered to what is
+        left; if not even MIN_COMPLETION_TOKENS fit, the request is rejected.
+
+        Args:
+            params (Dict): Chat completion parameters
+
+        Returns:
+            Tuple[Dict, int]: The parameters to send and the reserved tokens
+
+        Raises:
+            BudgetExceededError: If the user's or the global budget is spent
+        """
+        prompt_tokens = estimate_tokens(params["messages"])
+        max_tokens = params.get("max_tokens", 1000)
+        user_id = current_user()
+        with self._lock:
+            budgets = [b for b in (self._user_budget(user_id), self.global_budget) if b is not None]
+            for budget in budgets:
+                remaining = budget.remaining()
+                if remaining is None:
+                    continue
+                allowed = remaining - prompt_tokens
+                if allowed < MIN_COMPLETION_TOKENS:
+                    self.rejected += 1
+                    scope = "global" if budget is self.global_budget else "user"
+                    raise BudgetExceededError(f"The {scope} token budget is used up; try again later")
+                max_tokens = min(max_tokens, allowed)
+
+            reserved = prompt_tokens + max_tokens
+            for budget in budgets:
+                budget.charge(reserved)
+            self.in_flight += 1
+
+        if max_tokens != params.get("max_tokens", 1000):
+            params = dict(params, max_tokens=max_tokens)
+        return params, reserved
+
+    def settle(self, reserved: int, usage=None):
+        """
+        Replace a reservation with the tokens actually used.
+
+        Args:
+            reserved (int): Tokens returned by reserve
+            usage: The response's usage object, or None to keep the reservation
+                (e.g. when the request failed after being sent)
+        """
+        adjustment = 0 if usage is None else (usage.total_tokens or 0) - reserved
+        user_id = current_user()
+        with self._lock:
+            self.in_flight -= 1
+            for budget in (self._user_budget(user_id), self.global_budget):
+                if budget is not None:
+                    budget.charge(adjustment)
+
+    def release(self, reserved: int):
+        """Return a reservation for a request that was never answered (e.g. rate limited)."""
+        user_id = current_user()
+        with self._lock:
+            self.in_flight -= 1
+            for budget in (self._user_budget(user_id), self.global_budget):
+                if budget is not None:
+                    budget.charge(-reserved)
+
+    def stats(self) -> Dict:
+        """
+        Get routing counters and budget usage.
+
+        Returns:
+            Dict: In-flight requests, downgrades, rejections and global budget usage
+        """
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "downgrades": self.downgrades,
+                "rejected": self.rejected,
+                "global_budget": self.global_budget.limit,
+                "global_used": self.global_budget.used,
+                "tracked_users": len(self._users),
+            }
+
+# Budgets are in tokens per LLM_BUDGET_WINDOW seconds; 0 disables a budget
+model_router = ModelRouter(
+    user_budget=int(os.getenv("LLM_USER_TOKEN_BUDGET", "0")),
+    global_budget=int(os.getenv("LLM_GLOBAL_TOKEN_BUDGET", "0")),
+    window=float(os.getenv("LLM_BUDGET_WINDOW", "3600")),
+    max_load=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+)
@@ -1,7 +1,8 @@
 """
 Interactive questions generation module
 """
-from typing import Dict, List
+import re
+from typing import Dict, List, Optional
 
 def generate_questions(topic: str, difficulty: str) -> List[Dict]:
     """
@@ -44,31 +45,125 @@ def generate_questions(topic: str, difficulty: str) -> List[Dict]:
     
     return sample_questions
 
-def evaluate_answer(question_id: str, user_answer: str, correct_answer: str) -> Dict:
+_OPTION_LETTERS = "ABCDEFGH"
+_OPTION_PREFIX = re.compile(r"^\s*(?:option\s+)?([a-h])\s*[\).:\-]\s*", re.IGNORECASE)
+
+def normalize_answer(answer) -> str:
+    """
+    Normalize an answer for exact-match comparison.
+    
+    Args:
+        answer: The answer to normalize
+        
+    Returns:
+        str: Lower-cased answer without punctuation or repeated whitespace
+    """
+    text = re.sub(r"[^\w\s]", " ", str(answer).casefold())
+    return " ".join(text.split())
+
+def resolve_option(answer, options: List[str]) -> Optional[int]:
+    """
+    Find which multiple-choice option an answer refers to.
+    
+    Accepts the option text itself, with or without a letter prefix, a bare
+    letter ("B") or a lettered label ("B)", "Option B"). An exact option text
+    match wins over a letter, so an option whose text is "B" is never read as
+    the second option. Looser matches that ignore case and punctuation are
+    only used when they single out one option, so "C++" and "C#" stay apart.
+    
+    Args:
+        answer: The answer to resolve
+        options (List[str]): The question's options
+        
+    Returns:
+        Optional[int]: Index of the matching option, or None if it cannot be resolved
+    """
+    text = str(answer).strip()
+    letters = _OPTION_LETTERS[:len(options)]
+    
+    # Exact option text
+    stripped = [str(option).strip() for option in options]
+    if text in stripped:
+        return stripped.index(text)
+    
+    # Option text ignoring case and punctuation, if only one option matches
+    normalized = normalize_answer(text)
+    matches = [i for i, option in enumerate(options) if normalize_answer(option) == normalized]
+    if len(matches) == 1:
+        return matches[0]
+    
+    # Bare or labelled letter, e.g. "B", "b)", "Option B"
+    letter = re.fullmatch(r"(?:option\s+)?([a-h])[\).:]?", text, re.IGNORECASE)
+    if letter and letter.group(1).upper() in letters:
+        return letters.index(letter.group(1).upper())
+    
+    # Option text, ignoring a leading letter label on either side
+    target = normalize_answer(_OPTION_PREFIX.sub("", text))
+    matches = [i for i, option in enumerate(options) if normalize_answer(_OPTION_PREFIX.sub("", option)) == target]
+    return matches[0] if len(matches) == 1 else None
+
+def evaluate_answer(question_id: str, user_answer: str, correct_answer: str,
+                    options: Optional[List[str]] = None) -> Dict:
     """
     Evaluate a user's answer to a question.
     
+    Multiple-choice answers are compared by option, so a letter and the option
+    text it refers to are treated as the same answer. Other answers are compared
+    after normalizing case, punctuation and whitespace.
+    
     Args:
         question_id (str): The ID of the question
         user_answer (str): The user's answer
         correct_answer (str): The correct answer
+        options (List[str], optional): The options of a multiple-choice question
         
     Returns:
         Dict: Dictionary containing evaluation results
     """
-    # This is a placeholder implementation
-    # In a real implementation, you would:
-    # 1. Compare answers appropriately based on question type
-    # 2. Provide detailed feedback
-    # 3. Calculate score or proficiency
+    if options:
+        user_index = resolve_option(user_answer, options)
+        correct_index = resolve_option(correct_answer, options)
+        is_correct = user_index is not None and user_index == correct_index
+        if correct_index is not None:
+            correct_answer = options[correct_index]
+    else:
+        is_correct = normalize_answer(user_answer) == normalize_answer(correct_answer)
     
     return {
         "question_id": question_id,
-        "is_correct": user_answer == correct_answer,
-        "feedback": "Good job!" if user_answer == correct_answer else "Try again!",
+        "is_correct": is_correct,
+        "feedback": "Good job!" if is_correct else "Try again!",
         "explanation": f"The correct answer is: {correct_answer}"
     }
 
+def grade_answer(question: Dict, user_answer: str) -> Optional[Dict]:
+    """
+    Grade a quiz answer locally, without calling the LLM.
+    
+    Args:
+        question (Dict): Quiz question with question, correct_answer and optionally
+            options and explanation
+        user_answer (str): The user's answer
+        
+    Returns:
+        Optional[Dict]: Feedback in the same shape as ai_tutor.provide_feedback, with
+        an empty correct_answer_explanation if the question has no explanation, or
+        None if the correct answer cannot be determined locally
+    """
+    options = question.get('options') or []
+    correct_answer = question.get('correct_answer', '')
+    if not correct_answer or (options and resolve_option(correct_answer, options) is None):
+        return None
+    
+    result = evaluate_answer(question.get('id', ''), user_answer, correct_answer, options)
+    return {
+        "is_correct": result["is_correct"],
+        "feedback": "Correct!" if result["is_correct"] else result["explanation"],
+        "correct_answer_explanation": question.get('explanation', ''),
+        "further_study": "",
+        "graded_locally": True
+    }
+
 def ask_questions(topic=None):
     """
     Generates interactive questions to personalize the learning experience.
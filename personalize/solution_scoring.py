@@ -0,0 +1,258 @@
+"""
+Local scoring of free-text practice solutions.
+
+A solution is compared with the problem's reference material (solution steps,
+final answer and key concepts) using TF-IDF similarity, key-concept coverage
+and a check for the final answer. Clear fails are graded here in milliseconds.
+A solution only passes locally when its own final answer matches the expected
+one and is not negated; everything else that is not a clear fail goes to the LLM.
+"""
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from personalize.interactive_questions import normalize_answer
+
+# Weights of the similarity, concept coverage and answer signals in the score
+WEIGHTS = {"similarity": 0.45, "coverage": 0.25, "answer": 0.30}
+# Cosine similarity to the reference that counts as a full match
+FULL_SIMILARITY = 0.5
+# Scores at or above PASS_SCORE pass (if the final answer matches) and scores below
+# FAIL_SCORE fail; the rest are ambiguous
+PASS_SCORE = 0.7
+FAIL_SCORE = 0.25
+# Solutions with fewer words than this fail without further scoring, unless they reach the answer
+MIN_WORDS = 3
+# Words that negate an answer when they appear up to NEGATION_WINDOW words before it
+NEGATIONS = {"not", "no", "never", "isn't", "aren't", "wasn't", "isnt", "wrong", "incorrect", "instead", "rather"}
+NEGATION_WINDOW = 3
+
+PASS = "pass"
+FAIL = "fail"
+AMBIGUOUS = "ambiguous"
+
+_NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+_WORD = re.compile(r"-?\d+(?:[.,]\d+)?|[a-z']+")
+# Sentence ends: . ! ? not inside a number, and line breaks
+_SENTENCE_END = re.compile(r"(?<!\d)[.!?]|[.!?](?!\d)|\n")
+
+def _tokens(text: str) -> set:
+    # Lower-cased words with a plural "s" stripped, so "vectors" matches "vector"
+    return {word[:-1] if len(word) > 3 and word.endswith("s") else word for word in normalize_answer(text).split()}
+
+def _numbers(text: str) -> List[float]:
+    return [float(n.replace(",", ".")) for n in _NUMBER.findall(text)]
+
+def reference_text(problem: Dict) -> str:
+    """Join a problem's solution steps, answer and key concepts into one reference text."""
+    parts = [str(step) for step in problem.get("solution_steps", [])]
+    parts.append(str(problem.get("answer", "")))
+    parts.extend(str(concept) for concept in problem.get("key_concepts", []))
+    return "\n".join(part for part in parts if part)
+
+def similarity(solution: str, problem: Dict) -> float:
+    """
+    TF-IDF cosine similarity between a solution and a problem's reference text.
+
+    The vocabulary and IDF weights are fitted on the reference's steps, answer
+    and concepts, so terms that appear throughout the reference count less than
+    distinctive ones.
+
+    Args:
+        solution (str): The learner's solution
+        problem (Dict): Practice problem with solution_steps, answer and key_concepts
+
+    Returns:
+        float: Similarity between 0 and 1
+    """
+    documents = [str(step) for step in problem.get("solution_steps", [])]
+    documents += [str(problem.get("answer", ""))] + [str(c) for c in problem.get("key_concepts", [])]
+    documents = [doc for doc in documents if doc.strip()]
+    if not documents:
+        return 0.0
+    vectorizer = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), sublinear_tf=True)
+    try:
+        vectorizer.fit(documents)
+    except ValueError:
+        # Only stop words in the reference
+        return 0.0
+    # Rows are L2-normalized, so the dot product is the cosine similarity
+    matrix = vectorizer.transform([solution, "\n".join(documents)])
+    return float(np.clip((matrix[0] @ matrix[1].T).toarray()[0, 0], 0.0, 1.0))
+
+def concept_coverage(solution: str, problem: Dict) -> Optional[float]:
+    """
+    Fraction of the problem's key concepts that the solution mentions.
+
+    Args:
+        solution (str): The learner's solution
+        problem (Dict): Practice problem with key_concepts
+
+    Returns:
+        Optional[float]: Coverage between 0 and 1, or None if the problem has no key concepts
+    """
+    concepts = [_tokens(str(concept)) for concept in problem.get("key_concepts", [])]
+    concepts = [tokens for tokens in concepts if tokens]
+    if not concepts:
+        return None
+    words = _tokens(solution)
+    return sum(tokens <= words for tokens in concepts) / len(concepts)
+
+def answer_found(solution: str, problem: Dict) -> Optional[bool]:
+    """
+    Check whether the solution reaches the problem's final answer.
+
+    Numeric answers match when every number in the answer appears in the
+    solution; other answers match when their words appear in the solution.
+
+    Args:
+        solution (str): The learner's solution
+        problem (Dict): Practice problem with answer
+
+    Returns:
+        Optional[bool]: Whether the answer was found, or None if the problem has no answer
+    """
+    answer = str(problem.get("answer", "")).strip()
+    if not answer:
+        return None
+    expected = _numbers(answer)
+    if expected:
+        found = _numbers(solution)
+        return all(any(np.isclose(value, candidate, rtol=1e-3) for candidate in found) for value in expected)
+    answer_words = _tokens(answer)
+    return bool(answer_words) and len(answer_words & _tokens(solution)) >= 0.8 * len(answer_words)
+
+def _negated(words: List[str], position: int) -> bool:
+    return any(word in NEGATIONS for word in words[max(0, position - NEGATION_WINDOW):position])
+
+def final_answer_matches(solution: str, problem: Dict) -> Optional[bool]:
+    """
+    Check whether the solution's own final answer is the expected one.
+
+    For numeric answers, the last numbers the solution states must be the
+    answer's numbers. For other answers, the answer's words must appear in the
+    solution's last sentence. In both cases a negation just before the answer
+    ("is not 60 km/h") means it does not match.
+
+    Args:
+        solution (str): The learner's solution
+        problem (Dict): Practice problem with answer
+
+    Returns:
+        Optional[bool]: Whether the final answer matches, or None if the problem has no answer
+    """
+    answer = str(problem.get("answer", "")).strip()
+    if not answer:
+        return None
+    sentences = [sentence for sentence in _SENTENCE_END.split(solution.lower()) if sentence.strip()]
+    if not sentences:
+        return False
+
+    expected = _numbers(answer)
+    if expected:
+        # The last sentence that states a number holds the final answer
+        final = next((sentence for sentence in reversed(sentences) if _NUMBER.search(sentence)), None)
+        if final is None:
+            return False
+        words = _WORD.findall(final)
+        positions = [i for i, word in enumerate(words) if _NUMBER.fullmatch(word)]
+        stated = positions[-len(expected):]
+        if len(stated) < len(expected):
+            return False
+        values = [float(words[i].replace(",", ".")) for i in stated]
+        if not all(any(np.isclose(value, candidate, rtol=1e-3) for candidate in values) for value in expected):
+            return False
+        return not any(_negated(words, i) for i in stated)
+
+    words = _WORD.findall(sentences[-1])
+    answer_words = _tokens(answer)
+    stems = [word[:-1] if len(word) > 3 and word.endswith("s") else word for word in words]
+    positions = [i for i, stem in enumerate(stems) if stem in answer_words]
+    if not answer_words or len(answer_words & set(stems)) < 0.8 * len(answer_words):
+        return False
+    return not _negated(words, positions[0])
+
+def score_solution(problem: Dict, solution: str) -> Dict:
+    """
+    Score a free-text solution against a practice problem, without calling the LLM.
+
+    Args:
+        problem (Dict): Practice problem with problem, solution_steps, answer and key_concepts
+        solution (str): The learner's solution
+
+    Returns:
+        Dict: The score between 0 and 1, its similarity, concept_coverage and
+        answer_found signals, whether the final answer matches, the concepts
+        the solution misses, and a verdict of "pass", "fail" or "ambiguous"
+    """
+    final_answer = final_answer_matches(solution, problem)
+    found = answer_found(solution, problem)
+    # A bare answer is too short to judge the working, but if it reaches the
+    # expected answer it is scored (and at worst left to the LLM), not failed
+    if len(normalize_answer(solution).split()) < MIN_WORDS and not (final_answer or found):
+        return {"score": 0.0, "similarity": 0.0, "concept_coverage": 0.0, "answer_found": False,
+                "final_answer": False, "missing_concepts": [str(c) for c in problem.get("key_concepts", [])],
+                "verdict": FAIL}
+
+    raw_similarity = similarity(solution, problem)
+    signals = {
+        "similarity": min(raw_similarity / FULL_SIMILARITY, 1.0),
+        "coverage": concept_coverage(solution, problem),
+        "answer": found,
+    }
+    # Signals the problem has no reference for are left out of the weighting
+    weighted = {name: float(value) for name, value in signals.items() if value is not None}
+    score = sum(WEIGHTS[name] * value for name, value in weighted.items()) / sum(WEIGHTS[name] for name in weighted)
+
+    words = _tokens(solution)
+    missing = [str(c) for c in problem.get("key_concepts", []) if not _tokens(str(c)) <= words]
+    verdict = PASS if score >= PASS_SCORE else FAIL if score < FAIL_SCORE else AMBIGUOUS
+    if verdict == PASS and final_answer is not True:
+        # A high score alone can come from the right words around a wrong,
+        # negated or missing final answer; let the LLM judge it
+        verdict = AMBIGUOUS
+    return {
+        "score": round(score, 3),
+        "similarity": round(raw_similarity, 3),
+        "concept_coverage": signals["coverage"],
+        "answer_found": signals["answer"],
+        "final_answer": final_answer,
+        "missing_concepts": missing,
+        "verdict": verdict,
+    }
+
+def grade_solution(problem: Dict, solution: str, scored: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Grade a practice solution locally when the verdict is clear.
+
+    Args:
+        problem (Dict): Practice problem with problem, solution_steps, answer and key_concepts
+        solution (str): The learner's solution
+        scored (Dict, optional): The solution's score_solution result, if already computed
+
+    Returns:
+        Optional[Dict]: Feedback in the same shape as ai_tutor.provide_feedback plus
+        the local score, or None if the solution is ambiguous and needs the LLM
+    """
+    if scored is None:
+        scored = score_solution(problem, solution)
+    if scored["verdict"] == AMBIGUOUS:
+        return None
+
+    is_correct = scored["verdict"] == PASS
+    if is_correct:
+        feedback = "Your solution covers the key steps and reaches the expected answer."
+    elif scored["missing_concepts"]:
+        feedback = "Your solution misses key parts of the expected approach: " + ", ".join(scored["missing_concepts"])
+    else:
+        feedback = "Your solution does not match the expected steps or answer."
+    return {
+        "is_correct": is_correct,
+        "feedback": feedback,
+        "correct_answer_explanation": f"The expected answer is: {problem.get('answer', '')}",
+        "further_study": ", ".join(scored["missing_concepts"]),
+        "score": scored["score"],
+        "graded_locally": True,
+    }
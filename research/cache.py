@@ -0,0 +1,261 @@
+"""
+Persistent research cache shared by every session and worker process.
+
+Results are stored in SQLite, keyed by source and normalized topic, with a
+TTL per source and least-recently-used eviction once the cache is full.
+Only network-backed sources are worth caching; locally generated results are
+cheaper to rebuild than to look up.
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from telemetry import record_cache, span
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "research.sqlite3")
+
+# Time-to-live in seconds for each research source
+SOURCE_TTLS: Dict[str, float] = {
+    "wikipedia": 7 * 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+# Access times and hit/miss counts are buffered in memory and written in one
+# transaction at most this often (and before every store), so that cache hits
+# never take the database write lock
+FLUSH_INTERVAL = 30.0
+
+def normalize_topic(topic: str) -> str:
+    """
+    Normalize a topic so that trivially different spellings share a cache entry.
+
+    Args:
+        topic (str): The raw topic entered by the user
+
+    Returns:
+        str: Lower-cased topic with surrounding and repeated whitespace removed
+    """
+    return " ".join(topic.split()).casefold()
+
+class ResearchCache:
+    """
+    SQLite-backed cache for research results.
+
+    SQLite handles locking between processes; each thread keeps its own
+    connection because connections cannot be shared across threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 5000,
+                 ttls: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttls = dict(SOURCE_TTLS if ttls is None else ttls)
+        self._local = threading.local()
+        self._buffer_lock = threading.Lock()
+        # (source, topic_key) -> last access time, and (source, "hits" or "misses") -> count
+        self._accessed: Dict[Tuple[str, str], float] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._last_flush = time.monotonic()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS research_cache (
+                    source TEXT NOT NULL,
+                    topic_key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (source, topic_key)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_research_cache_accessed ON research_cache (accessed_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS research_cache_stats (
+                    source TEXT PRIMARY KEY,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def _count(self, source: str, column: str, key: Optional[str] = None, now: Optional[float] = None):
+        with self._buffer_lock:
+            self._counts[(source, column)] = self._counts.get((source, column), 0) + 1
+            if key is not None:
+                self._accessed[(source, key)] = now
+            due = time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+        if due:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"Error writing research cache stats: {e}")
+
+    def flush(self):
+        """Write the buffered access times and hit/miss counts to the database."""
+        with self._buffer_lock:
+            accessed, self._accessed = self._accessed, {}
+            counts, self._counts = self._counts, {}
+            self._last_flush = time.monotonic()
+        if not accessed and not counts:
+            return
+
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for (source, column), count in counts.items():
+                conn.execute(
+                    f"INSERT INTO research_cache_stats (source, {column}) VALUES (?, ?) "
+                    f"ON CONFLICT(source) DO UPDATE SET {column} = {column} + excluded.{column}",
+                    (source, count)
+                )
+            conn.executemany(
+                "UPDATE research_cache SET accessed_at = MAX(accessed_at, ?) WHERE source = ? AND topic_key = ?",
+                [(when, source, key) for (source, key), when in accessed.items()]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, source: str, topic: str):
+        """
+        Look up a cached result.
+
+        Args:
+            source (str): The research source name
+            topic (str): The topic that was researched
+
+        Returns:
+            The cached result, or None on a miss or expired entry
+        """
+        conn = self._connect()
+        key = normalize_topic(topic)
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at FROM research_cache WHERE source = ? AND topic_key = ?",
+            (source, key)
+        ).fetchone()
+
+        if row is None or now - row[1] > self.ttls.get(source, DEFAULT_TTL):
+            self._count(source, "misses")
+            return None
+
+        self._count(source, "hits", key, now)
+        return json.loads(row[0])
+
+    def set(self, source: str, topic: str, value):
+        """
+        Store a result and evict the least recently used entries if the cache is full.
+
+        Args:
+            source (str): The research source name
+            topic (str): The topic that was researched
+            value: JSON-serializable result to store
+        """
+        # Eviction below needs the buffered access times
+        self.flush()
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO research_cache (source, topic_key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source, normalize_topic(topic), json.dumps(value), now, now)
+            )
+            conn.execute(
+                "DELETE FROM research_cache WHERE rowid IN ("
+                "SELECT rowid FROM research_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_fetch(self, source: str, topic: str, fetch: Callable):
+        """
+        Return the cached result for a topic, fetching and storing it on a miss.
+
+        Cache errors never break research: if the database is unavailable the
+        result is fetched directly.
+
+        Args:
+            source (str): The research source name
+            topic (str): The topic to research
+            fetch (Callable): Function that fetches the result for the topic
+
+        Returns:
+            The research result
+        """
+        try:
+            with span("cache", f"research.{source}") as current:
+                cached_value = self.get(source, topic)
+                current.set(hit=cached_value is not None)
+        except sqlite3.Error as e:
+            print(f"Research cache unavailable: {e}")
+            return fetch(topic)
+
+        record_cache("research", cached_value is not None)
+        if cached_value is not None:
+            return cached_value
+
+        value = fetch(topic)
+        if value is not None:
+            try:
+                self.set(source, topic, value)
+            except sqlite3.Error as e:
+                print(f"Error writing research cache: {e}")
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Get hit and miss counters for every source.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Counters keyed by source name
+        """
+        self.flush()
+        conn = self._connect()
+        rows = conn.execute("SELECT source, hits, misses FROM research_cache_stats").fetchall()
+        return {source: {"hits": hits, "misses": misses} for source, hits, misses in rows}
+
+    def clear(self):
+        """Remove all cached results and reset the counters."""
+        with self._buffer_lock:
+            self._accessed.clear()
+            self._counts.clear()
+        conn = self._connect()
+        conn.execute("DELETE FROM research_cache")
+        conn.execute("DELETE FROM research_cache_stats")
+
+research_cache = ResearchCache(
+    path=os.getenv("RESEARCH_CACHE_PATH", DEFAULT_CACHE_PATH),
+    max_entries=int(os.getenv("RESEARCH_CACHE_MAX_ENTRIES", "5000"))
+)
+
+def cached_research(source: str):
+    """
+    Decorator that serves a research function from the shared research cache.
+
+    Args:
+        source (str): Name of the research source, used for its TTL and counters
+    """
+    def decorator(fetch):
+        @functools.wraps(fetch)
+        def wrapper(topic):
+            return research_cache.get_or_fetch(source, topic, fetch)
+        return wrapper
+    return decorator
@@ -0,0 +1,128 @@
+"""
+Research orchestrator - runs every research source concurrently with a
+deadline per source and returns whatever finished in time.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+from research.progress import ProgressReporter
+from telemetry import span
+from research.web import fetch_web_content
+from research.academic import fetch_academic_papers
+from research.video import fetch_video_transcripts
+
+# Registered research sources, keyed by the name their results are stored under
+RESEARCH_SOURCES: Dict[str, Callable[[str], List[Dict]]] = {
+    "web_results": fetch_web_content,
+    "academic_results": fetch_academic_papers,
+    "video_results": fetch_video_transcripts,
+}
+
+# Deadline in seconds for each source; sources not listed use DEFAULT_TIMEOUT
+SOURCE_TIMEOUTS: Dict[str, float] = {
+    "web_results": 8.0,
+    "academic_results": 5.0,
+    "video_results": 5.0,
+}
+DEFAULT_TIMEOUT = 10.0
+
+# Shared pool so a source that overruns its deadline keeps running in the
+# background instead of blocking the caller on executor shutdown
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="research")
+
+def register_source(name: str, fetch: Callable[[str], List[Dict]], timeout: Optional[float] = None):
+    """
+    Register an additional research source.
+
+    Args:
+        name (str): Key the source's results are returned under
+        fetch (Callable): Function taking a topic and returning a list of results
+        timeout (float, optional): Deadline in seconds for this source
+    """
+    RESEARCH_SOURCES[name] = fetch
+    if timeout is not None:
+        SOURCE_TIMEOUTS[name] = timeout
+
+def _traced_fetch(name: str, fetch: Callable[[str], List[Dict]], topic: str) -> List[Dict]:
+    with span("research", name, topic=topic) as current:
+        results = fetch(topic) or []
+        current.set(results=len(results))
+        return results
+
+def run_research(topic: str,
+                 sources: Optional[List[str]] = None,
+                 timeouts: Optional[Dict[str, float]] = None,
+                 on_progress: Optional[Callable[[int, int, str, str], None]] = None,
+                 progress: Optional[ProgressReporter] = None) -> Dict[str, List[Dict]]:
+    """
+    Fetch research from all sources at the same time.
+
+    Sources that fail or miss their deadline contribute an empty list, so the
+    caller always gets a result for every requested source.
+
+    Args:
+        topic (str): The topic to research
+        sources (List[str], optional): Names of the sources to run (default: all registered)
+        timeouts (Dict[str, float], optional): Per-source deadline overrides in seconds
+        on_progress (Callable, optional): Called as on_progress(completed, total, source, status)
+            from the calling thread each time a source finishes, where status is
+            "ok", "error" or "timeout"
+        progress (ProgressReporter, optional): Advanced by one unit per finished source
+
+    Returns:
+        Dict[str, List[Dict]]: Results keyed by source name
+
+    Raises:
+        ValueError: If a requested source is not registered
+    """
+    names = list(sources) if sources is not None else list(RESEARCH_SOURCES)
+    unknown = [name for name in names if name not in RESEARCH_SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown research sources: {', '.join(unknown)}")
+    deadlines = dict(SOURCE_TIMEOUTS)
+    deadlines.update(timeouts or {})
+
+    start = time.monotonic()
+    pending = {}
+    for name in names:
+        # Run in a copy of the caller's context so spans reach the caller's session
+        future = _executor.submit(contextvars.copy_context().run, _traced_fetch, name, RESEARCH_SOURCES[name], topic)
+        pending[future] = (name, start + deadlines.get(name, DEFAULT_TIMEOUT))
+
+    results = {name: [] for name in names}
+    completed = 0
+    if progress:
+        progress.start(len(names), f"Researching {topic}")
+
+    def finish(name, status):
+        nonlocal completed
+        completed += 1
+        if on_progress:
+            on_progress(completed, len(names), name, status)
+        if progress:
+            progress.advance(f"{name}: {status}")
+
+    while pending:
+        next_deadline = min(deadline for _, deadline in pending.values())
+        done, _ = wait(list(pending), timeout=max(0.0, next_deadline - time.monotonic()),
+                       return_when=FIRST_COMPLETED)
+
+        for future in done:
+            name, _ = pending.pop(future)
+            try:
+                results[name] = future.result() or []
+                finish(name, "ok")
+            except Exception as e:
+                print(f"Error fetching {name} for {topic}: {e}")
+                finish(name, "error")
+
+        # Give up on sources that have run past their deadline
+        now = time.monotonic()
+        for future, (name, deadline) in list(pending.items()):
+            if deadline <= now and not future.done():
+                del pending[future]
+                finish(name, "timeout")
+
+    return results
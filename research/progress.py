@@ -0,0 +1,56 @@
+"""
+Progress reporting driven by real units of work.
+
+Long-running steps (the research orchestrator, report generation) take an
+optional ProgressReporter and advance it as each unit finishes. Passing None
+skips progress reporting entirely, which is what headless callers do.
+"""
+import os
+from typing import Callable, Optional
+
+# Set TUTOR_HEADLESS=1 to disable UI progress reporting (e.g. when serving the API)
+HEADLESS = os.getenv("TUTOR_HEADLESS", "").lower() in ("1", "true", "yes")
+
+class ProgressReporter:
+    """
+    Tracks completed work units and reports the completed fraction.
+
+    The callback is called as callback(fraction, message) from the thread that
+    advances the reporter.
+    """
+
+    def __init__(self, callback: Optional[Callable[[float, str], None]] = None):
+        self.callback = callback
+        self.total = 0
+        self.completed = 0
+
+    @property
+    def fraction(self) -> float:
+        return min(self.completed / self.total, 1.0) if self.total else 0.0
+
+    def start(self, total: int, message: str = ""):
+        """
+        Begin a task made of a known number of work units.
+
+        Args:
+            total (int): Number of work units
+            message (str): Description of the task
+        """
+        self.total = total
+        self.completed = 0
+        self._report(message)
+
+    def advance(self, message: str = "", units: int = 1):
+        """
+        Mark work units as done.
+
+        Args:
+            message (str): Description of the finished unit
+            units (int): Number of units finished
+        """
+        self.completed += units
+        self._report(message)
+
+    def _report(self, message: str):
+        if self.callback:
+            self.callback(self.fraction, message)
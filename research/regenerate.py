@@ -0,0 +1,83 @@
+"""
+Feedback-driven report regeneration - rewrites only the report sections that
+a learner's feedback refers to and keeps the rest of the report as it is.
+"""
+import asyncio
+import re
+from typing import Dict, List, Tuple
+
+from ai_tutor import arewrite_report_section, classify_report_feedback
+from research.report import REPORT_SECTIONS
+
+# Keywords that tie feedback to a section; matched against the lower-cased feedback
+SECTION_KEYWORDS: Dict[str, List[str]] = {
+    "executive_summary": ["summary", "overview", "shorter", "concise"],
+    "introduction": ["introduction", "intro", "background", "basics", "definition", "historical context"],
+    "core_concepts": ["core concept", "concepts", "principle", "fundamental", "foundation", "theory", "theoretical"],
+    "detailed_knowledge": ["detailed knowledge", "knowledge area", "history", "historical development", "methodolog", "tools", "technolog", "in-depth", "deeper"],
+    "practical_applications": ["practical", "application", "real-world", "real world", "case stud", "industry", "use case"],
+    "advanced_topics": ["advanced", "cutting edge", "cutting-edge", "emerging", "trend", "future"],
+    "learning_activities": ["activit", "exercise", "practice", "reflection", "discussion", "hands-on", "hands on"],
+    "recommended_resources": ["resource", "book", "article", "video", "tutorial", "course", "reading"],
+    "references": ["reference", "citation", "source", "cite"],
+}
+
+# Sections that feedback can rewrite, in document order
+EDITABLE_SECTIONS = [name for name, _, _ in REPORT_SECTIONS if name in SECTION_KEYWORDS]
+
+def classify_feedback(feedback: str) -> List[str]:
+    """
+    Find the report sections a piece of feedback refers to.
+
+    Keywords are tried first; the LLM is only asked when none match.
+
+    Args:
+        feedback (str): The learner's feedback on the report
+
+    Returns:
+        List[str]: Affected section names in document order, or an empty list
+        if no section could be identified
+    """
+    text = " ".join(feedback.lower().split())
+    matched = [
+        name for name in EDITABLE_SECTIONS
+        if any(re.search(r"\b" + re.escape(keyword), text) for keyword in SECTION_KEYWORDS[name])
+    ]
+    if matched:
+        return matched
+    return classify_report_feedback(feedback, EDITABLE_SECTIONS)
+
+def regenerate_report(sections: Dict[str, str], topic: str, feedback: str) -> Tuple[Dict[str, str], List[str], List[str]]:
+    """
+    Rewrite the sections of a report that the feedback refers to.
+
+    The affected sections are rewritten concurrently; all other sections are
+    reused unchanged. A section whose rewrite fails keeps its current text.
+
+    Args:
+        sections (Dict[str, str]): Current section Markdown keyed by section name
+        topic (str): The learning topic
+        feedback (str): The learner's feedback on the report
+
+    Returns:
+        Tuple[Dict[str, str], List[str], List[str]]: The updated sections, the
+        names of the sections whose text changed, and the names of the
+        sections that could not be rewritten. Both lists are empty if the
+        feedback could not be tied to any section.
+    """
+    affected = [name for name in classify_feedback(feedback) if name in sections]
+
+    async def rewrite_all():
+        return await asyncio.gather(*(
+            arewrite_report_section(topic, sections[name], feedback) for name in affected
+        ))
+
+    updated = dict(sections)
+    changed, failed = [], []
+    for name, text in zip(affected, asyncio.run(rewrite_all())):
+        if text is None:
+            failed.append(name)
+        elif text != sections[name]:
+            updated[name] = text
+            changed.append(name)
+    return updated, changed, failed
@@ -1,29 +1,23 @@
 import random
 import time
 from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
 
-def generate_report(topic, objective, preferences, web_results, academic_results, video_results):
-    """
-    Generates a comprehensive, structured educational report based on gathered research
-    and user preferences.
-    
-    Args:
-        topic (str): The learning topic
-        objective (str): User's learning objectives
-        preferences (dict): User's learning preferences and interests
-        web_results (list): Web content research results
-        academic_results (list): Academic research results
-        video_results (list): Video transcript research results
-        
-    Returns:
-        str: Formatted report in Markdown
-    """
-    # Generate a unique report ID for reference
-    report_id = f"LR-{int(time.time())}"
-    now = datetime.now().strftime("%Y-%m-%d %H:%M")
-    
-    # Start building the report with a header
-    report = f"""
+from research.progress import ProgressReporter
+from telemetry import span
+
+def _has_items(results) -> bool:
+    return bool(results) and len(results) > 0 and isinstance(results[0], dict)
+
+# ---------------------------------------------------------------------------
+# Section builders
+#
+# Each builder appends its Markdown to `out` and depends only on the inputs
+# it is declared with in REPORT_SECTIONS.
+# ---------------------------------------------------------------------------
+
+def _section_header(out: List[str], topic, objective, report_id, now):
+    out.append(f"""
 # 📚 Personalized Learning Report: {topic}
 
 **Report ID:** {report_id}  
@@ -34,29 +28,30 @@ def generate_report(topic, objective, preferences, web_results, academic_results
 {objective}
 
 ## 👤 Personalized Learning Profile
-"""
+""")
 
+def _section_profile(out: List[str], preferences):
     # Add user preferences to the report
     if isinstance(preferences, dict):
         for key, value in preferences.items():
             formatted_key = key.replace('_', ' ').title()
-            report += f"- **{formatted_key}:** {value}\n"
-    
-    # Executive Summary section
-    report += """
+            out.append(f"- **{formatted_key}:** {value}\n")
+
+def _section_executive_summary(out: List[str], topic, preferences):
+    out.append("""
 ## 📋 Executive Summary
 
-"""
+""")
     # Generate a simulated executive summary
-    report += f"""This personalized learning guide on *{topic}* is designed to align with your specific learning objectives and preferences. Based on extensive research from academic sources, web content, and educational videos, this report provides a structured learning path from fundamental concepts to advanced applications.
+    out.append(f"""This personalized learning guide on *{topic}* is designed to align with your specific learning objectives and preferences. Based on extensive research from academic sources, web content, and educational videos, this report provides a structured learning path from fundamental concepts to advanced applications.
 
 The material is organized to accommodate your indicated knowledge level and preferred learning style, with emphasis on {'practical examples' if 'practical' in str(preferences).lower() else 'theoretical foundations'} as requested. Key concepts are explained using {'visual aids' if 'visual' in str(preferences).lower() else 'detailed descriptions'}, and the progression follows a logical flow to build understanding incrementally.
 
 This report includes curated resources from {'academic literature' if 'academic' in str(preferences).lower() else 'practical tutorials'} and {'video content' if 'video' in str(preferences).lower() else 'text-based resources'} based on your preferences, with recommended activities to reinforce learning.
-"""
+""")
 
-    # Table of Contents
-    report += """
+def _section_table_of_contents(out: List[str], topic):
+    out.append("""
 ## 📑 Table of Contents
 1. [Introduction to {0}](#introduction)
 2. [Core Concepts and Principles](#core-concepts)
@@ -66,23 +61,23 @@ This report includes curated resources from {'academic literature' if 'academic'
 6. [Learning Activities](#learning-activities)
 7. [Recommended Resources](#recommended-resources)
 8. [References and Citations](#references)
-""".format(topic)
+""".format(topic))
 
-    # Introduction Section
-    report += f"""
+def _section_introduction(out: List[str], topic, web_results):
+    out.append(f"""
 ## 1️⃣ Introduction to {topic} <a name="introduction"></a>
 
-"""
+""")
     # Select content from web results for introduction
-    if web_results and len(web_results) > 0 and isinstance(web_results[0], dict):
+    if _has_items(web_results):
         intro_content = next((item for item in web_results if "fundamentals" in item["title"].lower() or "introduction" in item["title"].lower()), web_results[0])
-        report += f"{intro_content['summary']}\n\n"
-        report += f"*Source: [{intro_content['title']}]({intro_content['url']})*\n\n"
+        out.append(f"{intro_content['summary']}\n\n")
+        out.append(f"*Source: [{intro_content['title']}]({intro_content['url']})*\n\n")
     else:
-        report += f"An introduction to {topic} covering the basic definitions, key concepts, and historical context.\n\n"
+        out.append(f"An introduction to {topic} covering the basic definitions, key concepts, and historical context.\n\n")
 
     # Visualization placeholder
-    report += f"""
+    out.append(f"""
 ### Visual Overview: {topic} Concept Map
 
 ```
@@ -102,21 +97,21 @@ This report includes curated resources from {'academic literature' if 'academic'
 +------------------+        +------------------+        +------------------+
 ```
 
-"""
+""")
 
-    # Core Concepts section
-    report += f"""
+def _section_core_concepts(out: List[str], topic, academic_results):
+    out.append(f"""
 ## 2️⃣ Core Concepts and Principles <a name="core-concepts"></a>
 
 The following core concepts form the foundation of {topic}:
 
-"""
+""")
     # Include academic content for core concepts
-    if academic_results and len(academic_results) > 0 and isinstance(academic_results[0], dict):
+    if _has_items(academic_results):
         theoretical_paper = next((item for item in academic_results if "theoretical" in item["title"].lower() or "foundations" in item["title"].lower()), academic_results[0])
-        report += f"According to {theoretical_paper['authors']} ({theoretical_paper['year']}), the theoretical foundations of {topic} include the following key principles:\n\n"
-        report += f"{theoretical_paper['summary']}\n\n"
-        
+        out.append(f"According to {theoretical_paper['authors']} ({theoretical_paper['year']}), the theoretical foundations of {topic} include the following key principles:\n\n")
+        out.append(f"{theoretical_paper['summary']}\n\n")
+
         # Add a simulated list of core concepts
         core_concepts = [
             f"**Foundational Principle 1**: A primary concept within {topic} that establishes the basic framework.",
@@ -124,21 +119,21 @@ The following core concepts form the foundation of {topic}:
             f"**Conceptual Framework**: The theoretical structure that organizes the various elements of {topic}.",
             f"**Key Relationships**: How different aspects of {topic} interact and influence each other."
         ]
-        
+
         for concept in core_concepts:
-            report += f"- {concept}\n"
-            
-        report += f"\n*Source: [{theoretical_paper['title']}] {theoretical_paper['journal']}, {theoretical_paper['year']}. DOI: {theoretical_paper['doi']}*\n\n"
+            out.append(f"- {concept}\n")
+
+        out.append(f"\n*Source: [{theoretical_paper['title']}] {theoretical_paper['journal']}, {theoretical_paper['year']}. DOI: {theoretical_paper['doi']}*\n\n")
     else:
-        report += f"This section would outline the core theoretical principles and concepts that form the foundation of {topic}.\n\n"
+        out.append(f"This section would outline the core theoretical principles and concepts that form the foundation of {topic}.\n\n")
 
-    # Detailed Knowledge Areas section
-    report += f"""
+def _section_detailed_knowledge(out: List[str], topic, web_results, video_results):
+    out.append(f"""
 ## 3️⃣ Detailed Knowledge Areas <a name="detailed-knowledge"></a>
 
 Based on current research and educational materials, {topic} encompasses several key knowledge areas:
 
-"""
+""")
     # Create simulated knowledge areas with content from our sources
     knowledge_areas = [
         {
@@ -158,43 +153,43 @@ Based on current research and educational materials, {topic} encompasses several
             "content": f"This area focuses on the practical tools, technologies, and resources commonly used in {topic}."
         }
     ]
-    
+
     for i, area in enumerate(knowledge_areas):
-        report += f"### 3.{i+1} {area['title']}\n\n"
-        report += f"{area['content']}\n\n"
-        
+        out.append(f"### 3.{i+1} {area['title']}\n\n")
+        out.append(f"{area['content']}\n\n")
+
         # Add some simulated content from our research sources
-        if web_results and len(web_results) > 0 and isinstance(web_results[0], dict):
+        if _has_items(web_results):
             web_item = web_results[i % len(web_results)]
-            report += f"From web resources: {web_item['summary']}\n\n"
-            
-        if i < 2 and video_results and len(video_results) > 0 and isinstance(video_results[0], dict):
+            out.append(f"From web resources: {web_item['summary']}\n\n")
+
+        if i < 2 and _has_items(video_results):
             video_item = video_results[i % len(video_results)]
-            report += f"**Video Insight:** {video_item['transcript_summary']}\n\n"
-            report += f"*Source: [{video_item['title']}]({video_item['url']}) by {video_item['creator']} on {video_item['platform']}*\n\n"
-            
+            out.append(f"**Video Insight:** {video_item['transcript_summary']}\n\n")
+            out.append(f"*Source: [{video_item['title']}]({video_item['url']}) by {video_item['creator']} on {video_item['platform']}*\n\n")
+
             # Add key timestamps from the video
-            report += "**Key video segments:**\n\n"
+            out.append("**Key video segments:**\n\n")
             for timestamp, description in list(video_item['key_timestamps'].items())[:3]:
-                report += f"- [{timestamp}] {description}\n"
-            report += "\n"
+                out.append(f"- [{timestamp}] {description}\n")
+            out.append("\n")
 
-    # Practical Applications section
-    report += f"""
+def _section_practical_applications(out: List[str], topic, web_results):
+    out.append(f"""
 ## 4️⃣ Practical Applications <a name="practical-applications"></a>
 
 {topic} has numerous practical applications across various fields:
 
-"""
+""")
     # Add practical applications from our sources
-    if web_results and len(web_results) > 0 and isinstance(web_results[0], dict):
+    if _has_items(web_results):
         practical_article = next((item for item in web_results if "practical" in item["title"].lower() or "applications" in item["title"].lower()), None)
         if practical_article:
-            report += f"{practical_article['summary']}\n\n"
-            report += f"*Source: [{practical_article['title']}]({practical_article['url']})*\n\n"
-    
+            out.append(f"{practical_article['summary']}\n\n")
+            out.append(f"*Source: [{practical_article['title']}]({practical_article['url']})*\n\n")
+
     # Add case studies
-    report += f"""
+    out.append(f"""
 ### Case Studies
 
 1. **Case Study 1: {topic} in Healthcare**
@@ -212,36 +207,36 @@ Based on current research and educational materials, {topic} encompasses several
    - Solution: [How {topic} was applied]
    - Results: [Outcomes and benefits]
 
-"""
+""")
 
-    # Advanced Topics section
-    report += f"""
+def _section_advanced_topics(out: List[str], topic, academic_results, video_results):
+    out.append(f"""
 ## 5️⃣ Advanced Topics <a name="advanced-topics"></a>
 
 For learners seeking deeper knowledge, these advanced topics represent the cutting edge of {topic}:
 
-"""
+""")
     # Add advanced topics from academic sources
-    if academic_results and len(academic_results) > 0 and isinstance(academic_results[0], dict):
+    if _has_items(academic_results):
         advanced_paper = next((item for item in academic_results if "advanced" in item["title"].lower() or "emerging" in item["title"].lower()), None)
         if advanced_paper:
-            report += f"According to research by {advanced_paper['authors']} ({advanced_paper['year']}), emerging trends in {topic} include:\n\n"
-            report += f"{advanced_paper['summary']}\n\n"
-            
+            out.append(f"According to research by {advanced_paper['authors']} ({advanced_paper['year']}), emerging trends in {topic} include:\n\n")
+            out.append(f"{advanced_paper['summary']}\n\n")
+
             if 'keywords' in advanced_paper:
-                report += "**Keywords:** " + ", ".join(advanced_paper['keywords']) + "\n\n"
-                
-            report += f"*Source: [{advanced_paper['title']}] {advanced_paper['journal']}, {advanced_paper['year']}. DOI: {advanced_paper['doi']}*\n\n"
-    
+                out.append("**Keywords:** " + ", ".join(advanced_paper['keywords']) + "\n\n")
+
+            out.append(f"*Source: [{advanced_paper['title']}] {advanced_paper['journal']}, {advanced_paper['year']}. DOI: {advanced_paper['doi']}*\n\n")
+
     # Add future directions
-    if video_results and len(video_results) > 0 and isinstance(video_results[0], dict):
+    if _has_items(video_results):
         future_video = next((item for item in video_results if "future" in item["title"].lower() or "emerging" in item["title"].lower()), None)
         if future_video:
-            report += f"**Future Directions:** {future_video['transcript_summary']}\n\n"
-            report += f"*Source: [{future_video['title']}]({future_video['url']}) by {future_video['creator']}*\n\n"
+            out.append(f"**Future Directions:** {future_video['transcript_summary']}\n\n")
+            out.append(f"*Source: [{future_video['title']}]({future_video['url']}) by {future_video['creator']}*\n\n")
 
-    # Learning Activities section
-    report += f"""
+def _section_learning_activities(out: List[str], topic):
+    out.append(f"""
 ## 6️⃣ Learning Activities <a name="learning-activities"></a>
 
 To reinforce your understanding of {topic}, consider the following activities:
@@ -261,67 +256,67 @@ To reinforce your understanding of {topic}, consider the following activities:
    - Topic 2: [Ethical considerations related to {topic}]
    - Topic 3: [Future implications of {topic} in society]
 
-"""
+""")
 
-    # Recommended Resources section
-    report += f"""
+def _section_recommended_resources(out: List[str], web_results, video_results, academic_results):
+    out.append(f"""
 ## 7️⃣ Recommended Resources <a name="recommended-resources"></a>
 
 Based on your learning preferences and objectives, here are curated resources to deepen your knowledge:
 
 ### Books and Articles
-"""
-    
+""")
+
     # Add web resources
-    if web_results and len(web_results) > 0 and isinstance(web_results[0], dict):
+    if _has_items(web_results):
         for i, resource in enumerate(web_results[:3]):
-            report += f"{i+1}. [{resource['title']}]({resource['url']}) - {resource['source']}\n"
-            report += f"   *{resource['summary']}*\n\n"
-    
-    report += f"""
+            out.append(f"{i+1}. [{resource['title']}]({resource['url']}) - {resource['source']}\n")
+            out.append(f"   *{resource['summary']}*\n\n")
+
+    out.append(f"""
 ### Video Resources
-"""
-    
+""")
+
     # Add video resources
-    if video_results and len(video_results) > 0 and isinstance(video_results[0], dict):
+    if _has_items(video_results):
         for i, resource in enumerate(video_results[:3]):
-            report += f"{i+1}. [{resource['title']}]({resource['url']}) ({resource['duration']}) - {resource['creator']}\n"
-            report += f"   *{resource['transcript_summary']}*\n\n"
-    
-    report += f"""
+            out.append(f"{i+1}. [{resource['title']}]({resource['url']}) ({resource['duration']}) - {resource['creator']}\n")
+            out.append(f"   *{resource['transcript_summary']}*\n\n")
+
+    out.append(f"""
 ### Academic Papers
-"""
-    
+""")
+
     # Add academic resources
-    if academic_results and len(academic_results) > 0 and isinstance(academic_results[0], dict):
+    if _has_items(academic_results):
         for i, resource in enumerate(academic_results[:3]):
-            report += f"{i+1}. {resource['authors']} ({resource['year']}). *{resource['title']}*. {resource['journal']}. DOI: {resource['doi']}\n"
-            report += f"   *{resource['summary']}*\n\n"
-    
-    # References and Citations section
-    report += f"""
+            out.append(f"{i+1}. {resource['authors']} ({resource['year']}). *{resource['title']}*. {resource['journal']}. DOI: {resource['doi']}\n")
+            out.append(f"   *{resource['summary']}*\n\n")
+
+def _section_references(out: List[str], web_results, academic_results, video_results, year):
+    out.append(f"""
 ## 8️⃣ References and Citations <a name="references"></a>
 
-"""
-    
+""")
+
     # Add all sources as references
-    if web_results and len(web_results) > 0 and isinstance(web_results[0], dict):
-        report += "### Web Resources\n\n"
+    if _has_items(web_results):
+        out.append("### Web Resources\n\n")
         for i, resource in enumerate(web_results):
-            report += f"{i+1}. {resource['source']} ({datetime.now().year}). \"{resource['title']}\". Retrieved from {resource['url']}\n\n"
-    
-    if academic_results and len(academic_results) > 0 and isinstance(academic_results[0], dict):
-        report += "### Academic Sources\n\n"
+            out.append(f"{i+1}. {resource['source']} ({year}). \"{resource['title']}\". Retrieved from {resource['url']}\n\n")
+
+    if _has_items(academic_results):
+        out.append("### Academic Sources\n\n")
         for i, resource in enumerate(academic_results):
-            report += f"{i+1}. {resource['authors']} ({resource['year']}). {resource['title']}. *{resource['journal']}*. DOI: {resource['doi']}\n\n"
-    
-    if video_results and len(video_results) > 0 and isinstance(video_results[0], dict):
-        report += "### Video Sources\n\n"
+            out.append(f"{i+1}. {resource['authors']} ({resource['year']}). {resource['title']}. *{resource['journal']}*. DOI: {resource['doi']}\n\n")
+
+    if _has_items(video_results):
+        out.append("### Video Sources\n\n")
         for i, resource in enumerate(video_results):
-            report += f"{i+1}. {resource['creator']} ({datetime.now().year}). \"{resource['title']}\". {resource['platform']}. Retrieved from {resource['url']}\n\n"
-    
-    # Feedback section
-    report += f"""
+            out.append(f"{i+1}. {resource['creator']} ({year}). \"{resource['title']}\". {resource['platform']}. Retrieved from {resource['url']}\n\n")
+
+def _section_footer(out: List[str], report_id, now):
+    out.append(f"""
 ---
 
 ## Feedback and Modifications
@@ -329,6 +324,121 @@ Based on your learning preferences and objectives, here are curated resources to
 This report can be modified based on your feedback. If you'd like adjustments to any section or have follow-up questions, please provide your feedback to generate an updated version.
 
 Report ID: {report_id} | Generated on: {now}
-"""
-    
-    return report
+""")
+
+# Report sections in document order: (name, builder, inputs the builder depends on)
+REPORT_SECTIONS: List[Tuple[str, Callable, Tuple[str, ...]]] = [
+    ("header", _section_header, ("topic", "objective", "report_id", "now")),
+    ("profile", _section_profile, ("preferences",)),
+    ("executive_summary", _section_executive_summary, ("topic", "preferences")),
+    ("table_of_contents", _section_table_of_contents, ("topic",)),
+    ("introduction", _section_introduction, ("topic", "web_results")),
+    ("core_concepts", _section_core_concepts, ("topic", "academic_results")),
+    ("detailed_knowledge", _section_detailed_knowledge, ("topic", "web_results", "video_results")),
+    ("practical_applications", _section_practical_applications, ("topic", "web_results")),
+    ("advanced_topics", _section_advanced_topics, ("topic", "academic_results", "video_results")),
+    ("learning_activities", _section_learning_activities, ("topic",)),
+    ("recommended_resources", _section_recommended_resources, ("web_results", "video_results", "academic_results")),
+    ("references", _section_references, ("web_results", "academic_results", "video_results", "year")),
+    ("footer", _section_footer, ("report_id", "now")),
+]
+
+def build_section(name: str, inputs: Dict) -> str:
+    """
+    Render a single report section.
+
+    Sections are plain string formatting and take microseconds to build, so
+    they are not cached; hashing the research inputs for a cache key would
+    cost more than building them.
+
+    Args:
+        name (str): The section name, as listed in REPORT_SECTIONS
+        inputs (Dict): Report inputs; only the ones the section depends on are used
+
+    Returns:
+        str: The section's Markdown
+    """
+    _, builder, input_names = next(section for section in REPORT_SECTIONS if section[0] == name)
+    with span("report_section", name):
+        out = []
+        builder(out, **{input_name: inputs.get(input_name) for input_name in input_names})
+        return "".join(out)
+
+def build_report_sections(inputs: Dict, progress: Optional[ProgressReporter] = None) -> Dict[str, str]:
+    """
+    Render every report section.
+
+    Args:
+        inputs (Dict): Report inputs (topic, objective, preferences, web_results,
+            academic_results, video_results, report_id, now, year)
+        progress (ProgressReporter, optional): Advanced by one unit per section
+
+    Returns:
+        Dict[str, str]: Section Markdown keyed by section name, in document order
+    """
+    if progress:
+        progress.start(len(REPORT_SECTIONS), "Generating report")
+
+    sections = {}
+    for name, _, _ in REPORT_SECTIONS:
+        sections[name] = build_section(name, inputs)
+        if progress:
+            progress.advance(name)
+    return sections
+
+def assemble_report(sections: Dict[str, str]) -> str:
+    """
+    Join rendered sections into the full report.
+
+    Args:
+        sections (Dict[str, str]): Section Markdown keyed by section name
+
+    Returns:
+        str: The report in Markdown
+    """
+    return "".join(sections[name] for name, _, _ in REPORT_SECTIONS if name in sections)
+
+def report_inputs(topic, objective, preferences, web_results, academic_results, video_results) -> Dict:
+    """
+    Collect the inputs for a new report, including its id and timestamp.
+
+    Returns:
+        Dict: Inputs for build_report_sections
+    """
+    return {
+        "topic": topic,
+        "objective": objective,
+        "preferences": preferences,
+        "web_results": web_results,
+        "academic_results": academic_results,
+        "video_results": video_results,
+        # Generate a unique report ID for reference
+        "report_id": f"LR-{int(time.time())}",
+        "now": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "year": datetime.now().year,
+    }
+
+def generate_report(topic, objective, preferences, web_results, academic_results, video_results,
+                    progress: Optional[ProgressReporter] = None):
+    """
+    Generates a comprehensive, structured educational report based on gathered research
+    and user preferences.
+
+    The report is assembled from independent sections, each built from only
+    the inputs it depends on.
+
+    Args:
+        topic (str): The learning topic
+        objective (str): User's learning objectives
+        preferences (dict): User's learning preferences and interests
+        web_results (list): Web content research results
+        academic_results (list): Academic research results
+        video_results (list): Video transcript research results
+        progress (ProgressReporter, optional): Advanced as each section is built;
+            leave as None for headless use
+
+    Returns:
+        str: Formatted report in Markdown
+    """
+    inputs = report_inputs(topic, objective, preferences, web_results, academic_results, video_results)
+    return assemble_report(build_report_sections(inputs, progress))
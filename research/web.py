@@ -1,9 +1,11 @@
 import requests
 from bs4 import BeautifulSoup
-import wikipedia
 import os
 from typing import Dict, List, Optional
 
+from research.cache import cached_research
+from research.wikipedia_client import wikipedia_client
+
 def is_tech_topic(topic):
     """
     Check if the topic is related to software/computer science.
@@ -18,6 +20,7 @@ def is_tech_topic(topic):
     ]
     return any(keyword in topic.lower() for keyword in tech_keywords)
 
+@cached_research("wikipedia")
 def fetch_wikipedia_content(topic: str) -> Optional[Dict]:
     """
     Fetch content from Wikipedia for the given topic.
@@ -29,34 +32,17 @@ def fetch_wikipedia_content(topic: str) -> Optional[Dict]:
         Optional[Dict]: Dictionary containing Wikipedia content or None if not found
     """
     try:
-        # Search for the topic
-        search_results = wikipedia.search(topic)
-        if not search_results:
+        # Search, page lookup and summary come back in a single request
+        article = wikipedia_client.fetch_article(topic, sentences=3, max_content=1000)
+        if not article:
             return None
-            
-        # Get the first result
-        page = wikipedia.page(search_results[0])
-        
-        # Get a summary of the content
-        summary = wikipedia.summary(search_results[0], sentences=3)
         
         return {
-            "title": page.title,
-            "source": "Wikipedia",
-            "summary": summary,
-            "url": page.url,
-            "content": page.content[:1000]  # First 1000 characters of content
-        }
-    except wikipedia.exceptions.DisambiguationError as e:
-        # If there are multiple matches, use the first one
-        page = wikipedia.page(e.options[0])
-        summary = wikipedia.summary(e.options[0], sentences=3)
-        return {
-            "title": page.title,
+            "title": article["title"],
             "source": "Wikipedia",
-            "summary": summary,
-            "url": page.url,
-            "content": page.content[:1000]
+            "summary": article["summary"],
+            "url": article["url"],
+            "content": article["content"]  # First 1000 characters of content
         }
     except Exception as e:
         print(f"Error fetching Wikipedia content: {e}")
@@ -66,6 +52,9 @@ def fetch_web_content(topic: str) -> List[Dict]:
     """
     Fetch and process web content related to the given topic.
     
+    Only the Wikipedia article is cached (and only when it was fetched); the
+    search links are built for each request from the topic as entered.
+    
     Args:
         topic (str): The topic to search for
         
@@ -0,0 +1,100 @@
+"""
+Lightweight Wikipedia client that resolves a topic to an article in a single
+MediaWiki API request over a pooled, keep-alive HTTP session.
+"""
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = "https://en.wikipedia.org/w/api.php"
+USER_AGENT = "EnhancedAITutor/1.0 (https://github.com/BhargavVenkataSai/Enhanced-AI-Tutor-System)"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class WikipediaClient:
+    """
+    Fetches article title, URL, summary and content for a topic.
+
+    The search, the page lookup and the extract are batched into one
+    `generator=search` query. Disambiguation pages are flagged through
+    `pageprops`, so the best-ranked real article is chosen from the same
+    response instead of issuing follow-up requests.
+    """
+
+    def __init__(self, api_url: str = DEFAULT_API_URL, timeout: float = 5.0,
+                 search_limit: int = 5, pool_size: int = 10):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.search_limit = search_limit
+        self.pool_size = pool_size
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        # requests.Session is not guaranteed thread-safe, so each thread keeps
+        # its own keep-alive session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            self._local.session = session
+        return session
+
+    def fetch_article(self, topic: str, sentences: int = 3, max_content: int = 1000) -> Optional[Dict]:
+        """
+        Look up the best matching article for a topic.
+
+        Args:
+            topic (str): The topic to search for
+            sentences (int): Number of sentences to keep in the summary
+            max_content (int): Maximum number of characters of content to keep
+
+        Returns:
+            Optional[Dict]: Dictionary with title, url, summary and content, or
+            None if no article matches
+        """
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "redirects": "1",
+            "generator": "search",
+            "gsrsearch": topic,
+            "gsrlimit": str(self.search_limit),
+            "gsrprop": "",
+            "prop": "extracts|info|pageprops",
+            "exintro": "1",
+            "explaintext": "1",
+            "exlimit": "max",
+            "inprop": "url",
+            "ppprop": "disambiguation",
+        }
+        response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        pages = response.json().get("query", {}).get("pages", [])
+        candidates = sorted(
+            (page for page in pages
+             if "disambiguation" not in page.get("pageprops", {}) and page.get("extract")),
+            key=lambda page: page.get("index", 0)
+        )
+        if not candidates:
+            return None
+
+        page = candidates[0]
+        extract = page["extract"].strip()
+        return {
+            "title": page["title"],
+            "url": page.get("fullurl", ""),
+            "summary": " ".join(_SENTENCE_END.split(extract)[:sentences]),
+            "content": extract[:max_content],
+        }
+
+wikipedia_client = WikipediaClient(api_url=os.getenv("WIKIPEDIA_API_URL", DEFAULT_API_URL))
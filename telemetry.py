@@ -0,0 +1,290 @@
+"""
+Telemetry Module - Tracing and metrics for the learning-journey hot paths.
+
+Research fetches, LLM calls, cache lookups and report section builds are
+wrapped in spans. Every span is recorded in a process-wide metrics registry
+(exported in the Prometheus text format), optionally written as one JSON line
+to TELEMETRY_LOG_PATH, and appended to the current session's timing list when
+one is bound with bind_session.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# USD per million (prompt, completion) tokens
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4-turbo": (10.0, 30.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "gpt-3.5-turbo": (0.5, 1.5),
+}
+
+# Histogram buckets for span durations, in seconds
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Most recent spans kept per session
+SESSION_SPAN_LIMIT = 500
+
+_session_spans: contextvars.ContextVar[Optional[deque]] = contextvars.ContextVar("session_spans", default=None)
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = ['{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+             for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Metrics:
+    """Thread-safe registry of counters and histograms."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+        self._histograms: Dict[str, Dict[Tuple, List]] = {}
+
+    def describe(self, name: str, kind: str, text: str):
+        self._help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1.0, /, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, /, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # [bucket counts..., count, sum]
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(self.buckets) + [0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics text
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._render_header(lines, name, "counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                self._render_header(lines, name, "histogram")
+                for labels, state in sorted(series.items()):
+                    for bound, count in zip(self.buckets, state):
+                        le = 'le="{:g}"'.format(bound)
+                        lines.append(f"{name}_bucket{_format_labels(labels, le)} {count}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {state[-2]}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {state[-2]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {state[-1]:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def _render_header(self, lines: List[str], name: str, kind: str):
+        _, text = self._help.get(name, (kind, ""))
+        if text:
+            lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+metrics = Metrics()
+metrics.describe("tutor_span_duration_seconds", "histogram", "Duration of traced operations.")
+metrics.describe("tutor_cache_requests_total", "counter", "Cache lookups by cache and result.")
+metrics.describe("tutor_llm_tokens_total", "counter", "LLM tokens used by model, route and token type.")
+metrics.describe("tutor_llm_cost_usd_total", "counter", "Estimated LLM cost in US dollars by model and route.")
+
+# Structured JSON log, one line per span; disabled unless TELEMETRY_LOG_PATH is set
+logger = logging.getLogger("tutor.telemetry")
+logger.propagate = False
+if os.getenv("TELEMETRY_LOG_PATH"):
+    _handler = logging.FileHandler(os.getenv("TELEMETRY_LOG_PATH"))
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+class Span:
+    """A timed operation; attributes added while it is open are recorded with it."""
+
+    def __init__(self, kind: str, name: str, attributes: Dict):
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.status = "ok"
+        self.start = time.time()
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "status": self.status,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            **self.attributes,
+        }
+
+@contextmanager
+def span(kind: str, name: str, **attributes) -> Iterator[Span]:
+    """
+    Time an operation and record it.
+
+    Args:
+        kind (str): Operation type, e.g. "research", "llm", "cache", "report_section"
+        name (str): Operation name within its kind
+        **attributes: Extra fields for the JSON log and session timings
+
+    Yields:
+        Span: The open span; call span.set(...) to attach more attributes
+    """
+    current = Span(kind, name, attributes)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.set(error=e.__class__.__name__)
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        record(current)
+
+def record(current: Span):
+    metrics.observe("tutor_span_duration_seconds", current.duration,
+                    kind=current.kind, name=current.name, status=current.status)
+    spans = _session_spans.get()
+    if spans is not None or logger.isEnabledFor(logging.INFO):
+        entry = current.to_dict()
+        if spans is not None:
+            spans.append(entry)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(entry, default=str))
+
+def record_cache(cache: str, hit: bool):
+    metrics.inc("tutor_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the cost of an LLM call from its token counts.
+
+    Args:
+        model (str): The model name
+        prompt_tokens (int): Prompt tokens used
+        completion_tokens (int): Completion tokens used
+
+    Returns:
+        float: Estimated cost in US dollars, 0.0 for unknown models
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        # Dated snapshots (e.g. gpt-4o-2024-08-06) share their family's price
+        family = max((name for name in MODEL_PRICES if model.startswith(name + "-")), key=len, default=None)
+        prices = MODEL_PRICES.get(family, (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+def record_usage(current: Span, model: str, usage) -> None:
+    """
+    Record token counts and cost from an OpenAI usage object on a span.
+
+    Args:
+        current (Span): The LLM call's span, named after its route
+        model (str): The model name
+        usage: The response's usage object, or None if it was not reported
+    """
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    cost = llm_cost(model, prompt_tokens, completion_tokens)
+    metrics.inc("tutor_llm_tokens_total", prompt_tokens, model=model, route=current.name, type="prompt")
+    metrics.inc("tutor_llm_tokens_total", completion_tokens, model=model, route=current.name, type="completion")
+    metrics.inc("tutor_llm_cost_usd_total", cost, model=model, route=current.name)
+    current.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, cost_usd=round(cost, 6))
+
+def bind_session(spans: Optional[deque]) -> contextvars.Token:
+    """
+    Collect the spans recorded in this context into a session's list.
+
+    Args:
+        spans (deque, optional): The session's span list, or None to stop collecting
+
+    Returns:
+        contextvars.Token: Token for restoring the previous binding
+    """
+    return _session_spans.set(spans)
+
+def unbind_session(token: contextvars.Token):
+    """Restore the session binding that was active before bind_session."""
+    _session_spans.reset(token)
+
+def new_session_spans() -> deque:
+    return deque(maxlen=SESSION_SPAN_LIMIT)
+
+def current_session_spans() -> Optional[deque]:
+    return _session_spans.get()
+
+def bound(coro):
+    """
+    Wrap a coroutine so that it runs with the caller's context variables (the
+    bound session, the current user) when it is run on another thread's event loop.
+    """
+    context = contextvars.copy_context()
+
+    async def run():
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+    return run()
+
+def summarize(spans: List[Dict]) -> List[Dict]:
+    """
+    Aggregate session spans by kind and name.
+
+    Args:
+        spans (List[Dict]): Recorded spans
+
+    Returns:
+        List[Dict]: One row per (kind, name) with count, total and max milliseconds,
+        sorted by total time
+    """
+    rows: Dict[Tuple[str, str], Dict] = {}
+    for entry in spans:
+        row = rows.setdefault((entry["kind"], entry["name"]), {
+            "kind": entry["kind"], "name": entry["name"], "count": 0, "errors": 0,
+            "total_ms": 0.0, "max_ms": 0.0, "tokens": 0, "cost_usd": 0.0,
+        })
+        row["count"] += 1
+        row["errors"] += entry["status"] != "ok"
+        row["total_ms"] += entry["duration_ms"]
+        row["max_ms"] = max(row["max_ms"], entry["duration_ms"])
+        row["tokens"] += entry.get("prompt_tokens", 0) + entry.get("completion_tokens", 0)
+        row["cost_usd"] += entry.get("cost_usd", 0.0)
+    return sorted(rows.values(), key=lambda row: row["total_ms"], reverse=True)